@@ -1,5 +1,6 @@
 # Add these imports at the top of settings.py
 import os
+import sys
 from pathlib import Path
 import dj_database_url
 from decouple import config
@@ -13,6 +14,9 @@ SECRET_KEY = config('SECRET_KEY', default='your-default-secret-key-for-developme
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = config('DEBUG', default=False, cast=bool)
 
+# True under `manage.py test`
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 # Security redirect - ONLY when not in debug
 if not DEBUG:
     SECURE_SSL_REDIRECT = config("SECURE_SSL_REDIRECT", default=True, cast=bool)
@@ -35,9 +39,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'recipes.profiling.SamplingProfilerMiddleware',  # Only active with PROFILE_REQUESTS
+    'recipes.memory.MemoryTrackingMiddleware',  # Only active with MEMORY_TRACKING
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise
+    'recipes.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'recipes.routers.PrimaryPinningMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -51,8 +59,14 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compiled templates are kept in memory for the life of the worker
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -65,12 +79,152 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'bookstore.wsgi.application'
 
+# Compile all recipe templates when a worker starts (see bookstore/wsgi.py)
+TEMPLATE_WARMUP = config('TEMPLATE_WARMUP', default=True, cast=bool)
+
 # Database
+# Connections are kept open for DB_CONN_MAX_AGE seconds (0 closes them after every request)
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
 DATABASES = {
     'default': dj_database_url.config(
-        default=config('DATABASE_URL', default='sqlite:///' + str(BASE_DIR / 'db.sqlite3'))
+        default=config('DATABASE_URL', default='sqlite:///' + str(BASE_DIR / 'db.sqlite3')),
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+    )
+}
+
+# Optional read replica: recipe read views read from it, writes and a session's
+# reads shortly after its own writes stay on the primary (see recipes/routers.py)
+REPLICA_DATABASE_URL = config('REPLICA_DATABASE_URL', default='')
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        REPLICA_DATABASE_URL,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
     )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['recipes.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Native connection pooling needs PostgreSQL with psycopg 3 and psycopg_pool.
+# Without them (e.g. psycopg2) the persistent connections above are used instead.
+if DB_POOL and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    try:
+        import psycopg  # noqa: F401
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        }
+
+# Cache: 'locmem' (default), 'file' or 'redis' (needs the redis package and REDIS_URL)
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('REDIS_URL', default='redis://127.0.0.1:6379/0'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Cached sessions and users are only safe with a cache every worker shares: with the
+# per-process locmem cache a logout, deactivation or password change would only reach
+# the worker that handled it. (The login rate limits are also counted per worker then.)
+SHARED_CACHE = CACHE_BACKEND in ('redis', 'file')
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = config(
+    'SESSION_ENGINE',
+    default='django.contrib.sessions.backends.cached_db' if SHARED_CACHE else 'django.contrib.sessions.backends.db',
+)
+
+# Load the logged-in user from the cache instead of the database on every request
+AUTHENTICATION_BACKENDS = [
+    'recipes.backends.CachedModelBackend' if SHARED_CACHE else 'django.contrib.auth.backends.ModelBackend'
+]
+USER_CACHE_TIMEOUT = config('USER_CACHE_TIMEOUT', default=300, cast=int)
+
+# Opt-in SQLite tuning for small deployments running several gunicorn workers.
+# The pragmas are applied to every new connection (see recipes/signals.py);
+# benchmark_sqlite compares SQLITE_TUNED_PRAGMAS with the defaults.
+SQLITE_TUNING = config('SQLITE_TUNING', default=False, cast=bool)
+SQLITE_TUNED_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=268435456, cast=int),
+    'cache_size': config('SQLITE_CACHE_SIZE', default=-64000, cast=int),
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+}
+SQLITE_PRAGMAS = SQLITE_TUNED_PRAGMAS if SQLITE_TUNING else {}
+if SQLITE_TUNING and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Take the write lock up front so busy_timeout applies instead of failing on lock upgrade
+    DATABASES['default'].setdefault('OPTIONS', {})['transaction_mode'] = 'IMMEDIATE'
+
+# Login throttling: failed attempts allowed per IP and per username in a sliding window
+LOGIN_RATE_LIMIT_ENABLED = config('LOGIN_RATE_LIMIT_ENABLED', default=True, cast=bool)
+LOGIN_RATE_LIMIT_PER_IP = config('LOGIN_RATE_LIMIT_PER_IP', default=20, cast=int)
+LOGIN_RATE_LIMIT_PER_USERNAME = config('LOGIN_RATE_LIMIT_PER_USERNAME', default=5, cast=int)
+LOGIN_RATE_LIMIT_WINDOW = config('LOGIN_RATE_LIMIT_WINDOW', default=300, cast=int)
+# Number of reverse proxies in front of the app (e.g. 1 on Heroku) for reading X-Forwarded-For
+RATE_LIMIT_PROXY_COUNT = config('RATE_LIMIT_PROXY_COUNT', default=0, cast=int)
+
+# Signup username availability checks (seconds to cache an answer, checks per IP per minute)
+USERNAME_CHECK_CACHE_TIMEOUT = config('USERNAME_CHECK_CACHE_TIMEOUT', default=30, cast=int)
+USERNAME_CHECK_RATE_LIMIT = config('USERNAME_CHECK_RATE_LIMIT', default=60, cast=int)
+
+# Password hashing profile: 'pbkdf2' (default), 'argon2' (needs argon2-cffi) or 'scrypt'.
+# Hashes made with any other listed hasher, or with different cost settings,
+# are upgraded to the current profile on the user's next successful login.
+PASSWORD_HASHER_PROFILE = config('PASSWORD_HASHER_PROFILE', default='pbkdf2')
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=1000000, cast=int)
+PASSWORD_ARGON2_TIME_COST = config('PASSWORD_ARGON2_TIME_COST', default=2, cast=int)
+PASSWORD_ARGON2_MEMORY_COST = config('PASSWORD_ARGON2_MEMORY_COST', default=102400, cast=int)
+PASSWORD_SCRYPT_WORK_FACTOR = config('PASSWORD_SCRYPT_WORK_FACTOR', default=2 ** 14, cast=int)
+
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'recipes.hashers.ConfigurablePBKDF2PasswordHasher',
+    'argon2': 'recipes.hashers.ConfigurableArgon2PasswordHasher',
+    'scrypt': 'recipes.hashers.ConfigurableScryptPasswordHasher',
 }
+if PASSWORD_HASHER_PROFILE == 'argon2':
+    try:
+        import argon2  # noqa: F401
+    except ImportError:
+        PASSWORD_HASHER_PROFILE = 'pbkdf2'
+elif PASSWORD_HASHER_PROFILE == 'scrypt':
+    import hashlib
+    if not hasattr(hashlib, 'scrypt'):
+        PASSWORD_HASHER_PROFILE = 'pbkdf2'
+if PASSWORD_HASHER_PROFILE not in PASSWORD_HASHER_CLASSES:
+    PASSWORD_HASHER_PROFILE = 'pbkdf2'
+
+# The first hasher is used for new hashes; the rest can still verify old ones
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER_PROFILE]] + [
+    hasher for profile, hasher in PASSWORD_HASHER_CLASSES.items() if profile != PASSWORD_HASHER_PROFILE
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -89,7 +243,19 @@ USE_TZ = True
 # Static files
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Hashed file names with gzip and Brotli copies are generated by collectstatic;
+# WhiteNoise serves the hashed files with far-future immutable cache headers.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'recipes.storage.RecipeStaticFilesStorage',
+    },
+}
+# A file missing from the manifest is an error in production, where it means collectstatic
+# was skipped. Debug runs and the test suite fall back to the unhashed URL instead.
+WHITENOISE_MANIFEST_STRICT = config('WHITENOISE_MANIFEST_STRICT', default=not (DEBUG or TESTING), cast=bool)
 
 # Media
 MEDIA_URL = '/media/'
@@ -97,6 +263,75 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Recipe search facets (seconds to keep per-filter counts cached)
+RECIPE_FACET_CACHE_TIMEOUT = config('RECIPE_FACET_CACHE_TIMEOUT', default=300, cast=int)
+
+# Response compression (Brotli when installed and accepted, otherwise gzip)
+RESPONSE_COMPRESSION_MIN_SIZE = config('RESPONSE_COMPRESSION_MIN_SIZE', default=1024, cast=int)
+RESPONSE_BROTLI_QUALITY = config('RESPONSE_BROTLI_QUALITY', default=5, cast=int)
+
+# Stream recipe list and search results in chunks of cards (?stream=1/0 overrides per request)
+RECIPE_STREAMING = config('RECIPE_STREAMING', default=False, cast=bool)
+RECIPE_STREAM_CHUNK_SIZE = config('RECIPE_STREAM_CHUNK_SIZE', default=50, cast=int)
+
+# Search chart output: 'png' (matplotlib), 'svg' (inline vector) or 'json' (client-side spec).
+# Can be overridden per request with ?chart_format=
+RECIPE_CHART_FORMAT = config('RECIPE_CHART_FORMAT', default='png')
+
+# Number of "you might also like" recipes stored per recipe (rebuild with build_similarity after changing)
+RECIPE_SIMILAR_COUNT = config('RECIPE_SIMILAR_COUNT', default=5, cast=int)
+
+# Jaccard similarity of name/ingredient/description shingles above which recipes count as duplicates
+RECIPE_DUPLICATE_THRESHOLD = config('RECIPE_DUPLICATE_THRESHOLD', default=0.8, cast=float)
+
+# Sync feed: changes younger than this many seconds are held back until in-flight
+# transactions have committed; tombstones are kept for RECIPE_DELETION_LOG_DAYS days
+RECIPE_SYNC_SETTLE_SECONDS = config('RECIPE_SYNC_SETTLE_SECONDS', default=5, cast=int)
+RECIPE_DELETION_LOG_DAYS = config('RECIPE_DELETION_LOG_DAYS', default=90, cast=int)
+
+# Detail pages, search facet counts and charts are only cached in a cache every worker
+# shares: with the per-process locmem cache a recipe save would only drop the copies
+# held by the worker that handled it, and the others would keep serving stale ones.
+RECIPE_VIEW_CACHE = config('RECIPE_VIEW_CACHE', default=SHARED_CACHE, cast=bool)
+
+# Cached recipe detail pages and rendered search charts (seconds)
+RECIPE_DETAIL_CACHE_TIMEOUT = config('RECIPE_DETAIL_CACHE_TIMEOUT', default=60, cast=int)
+RECIPE_CHART_CACHE_TIMEOUT = config('RECIPE_CHART_CACHE_TIMEOUT', default=300, cast=int)
+
+# Single-flight recomputation of expired cache entries (see recipes/singleflight.py).
+# Expired values are served stale for up to SINGLE_FLIGHT_STALE_SECONDS while one
+# request refreshes them. SINGLE_FLIGHT_CACHE_LOCK also coordinates separate worker
+# processes, which needs a shared cache (CACHE_BACKEND=redis or file).
+SINGLE_FLIGHT_STALE_SECONDS = config('SINGLE_FLIGHT_STALE_SECONDS', default=60, cast=int)
+SINGLE_FLIGHT_LOCK_TIMEOUT = config('SINGLE_FLIGHT_LOCK_TIMEOUT', default=30, cast=int)
+SINGLE_FLIGHT_CACHE_LOCK = config('SINGLE_FLIGHT_CACHE_LOCK', default=False, cast=bool)
+SINGLE_FLIGHT_BETA = config('SINGLE_FLIGHT_BETA', default=1.0, cast=float)
+
+# Memory-mapped search snapshot shared by all workers (build with build_search_snapshot).
+# Empty disables it; workers look for a rebuilt file every SEARCH_SNAPSHOT_CHECK_SECONDS.
+SEARCH_SNAPSHOT_PATH = config('SEARCH_SNAPSHOT_PATH', default='')
+SEARCH_SNAPSHOT_CHECK_SECONDS = config('SEARCH_SNAPSHOT_CHECK_SECONDS', default=10, cast=int)
+
+# Sampling profiler for slow requests (summarise with: python manage.py perf_report).
+# Requests slower than PROFILE_SLOW_REQUEST_SECONDS (0 turns this off) and a random
+# PROFILE_SAMPLE_RATE fraction of all requests are saved to PROFILE_DIR.
+PROFILE_REQUESTS = config('PROFILE_REQUESTS', default=False, cast=bool)
+PROFILE_SLOW_REQUEST_SECONDS = config('PROFILE_SLOW_REQUEST_SECONDS', default=2.0, cast=float)
+PROFILE_SAMPLE_RATE = config('PROFILE_SAMPLE_RATE', default=0.0, cast=float)
+PROFILE_INTERVAL_MS = config('PROFILE_INTERVAL_MS', default=5, cast=int)
+PROFILE_DIR = config('PROFILE_DIR', default=str(BASE_DIR / 'profiles'))
+
+# tracemalloc allocation tracking per view (staff can read it at /diagnostics/memory/).
+# Slows every request down; run a single-threaded worker while it is on.
+MEMORY_TRACKING = config('MEMORY_TRACKING', default=False, cast=bool)
+MEMORY_TRACKING_FRAMES = config('MEMORY_TRACKING_FRAMES', default=10, cast=int)
+MEMORY_TRACKING_SNAPSHOT_RATE = config('MEMORY_TRACKING_SNAPSHOT_RATE', default=0.1, cast=float)
+MEMORY_TRACKING_TOP = config('MEMORY_TRACKING_TOP', default=10, cast=int)
+
+# Admin changelist: above this many rows (by the database's own estimate) the
+# unfiltered recipe list shows an estimated total instead of running COUNT(*)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=10000, cast=int)
+
 # Login URL
 LOGIN_URL = '/login/'
 
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookstore.settings')
 
 application = get_wsgi_application()
+
+# Compile the recipe templates now rather than on each worker's first requests
+from django.conf import settings  # noqa: E402
+
+if settings.TEMPLATE_WARMUP:
+    from recipes.warmup import warm_template_cache  # noqa: E402
+    warm_template_cache()
@@ -1,13 +1,80 @@
-from django.contrib import admin
-from .models import Recipe
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .models import Recipe, RecipeSimilarity
+from .search import tokenize, words_q
+from .facets import invalidate_facet_counts
+from .cache import invalidate_recipe_details
+from .stats import rebuild_daily_stats
+from .similarity import refresh_neighbours
+
+# Ids bound per UPDATE by the bulk actions, well under SQLite's variable limit
+BULK_ACTION_BATCH = 500
+
+
+def estimated_row_count(model, using='default'):
+    """The database's own row estimate for a model's table, or None if it has none"""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s', [table]
+            )
+        elif connection.vendor == 'sqlite':
+            # Filled in by ANALYZE; the first number of each row is the table size
+            cursor.execute("SELECT name FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    estimate = int(float(str(row[0]).split()[0]))
+    # PostgreSQL reports -1 for tables that have never been analyzed
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that trusts the database's row estimate for large unfiltered lists.
+
+    Filtered querysets, and tables under ADMIN_ESTIMATED_COUNT_THRESHOLD
+    rows, are still counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('name', 'cooking_time', 'difficulty', 'created_at')
-    list_filter = ('difficulty', 'created_at')
-    search_fields = ('name', 'ingredients', 'description')
-    readonly_fields = ('difficulty', 'created_at', 'updated_at')
-    
+    list_filter = ('difficulty', 'created_at', ('duplicate_of', admin.EmptyFieldListFilter))
+    search_fields = ('name', 'ingredients')
+    search_help_text = (
+        'Matches recipes whose name or ingredient words start with every search word. '
+        'Descriptions are not searched.'
+    )
+    readonly_fields = ('difficulty', 'duplicate_of', 'created_at', 'updated_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['recompute_difficulty']
+
     fieldsets = (
         ('Basic Information', {
             'fields': ('name', 'pic')
@@ -16,11 +83,63 @@ class RecipeAdmin(admin.ModelAdmin):
             'fields': ('ingredients', 'cooking_time', 'description')
         }),
         ('Auto-calculated', {
-            'fields': ('difficulty',),
+            'fields': ('difficulty', 'duplicate_of'),
             'classes': ('collapse',)
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+    def get_queryset(self, request):
+        """Load only the columns the changelist shows (the change form needs every field)"""
+        queryset = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name == 'recipes_recipe_changelist':
+            queryset = queryset.only('pk', *self.list_display)
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search the word index instead of scanning name, ingredients and description with LIKE"""
+        words = tokenize(search_term)
+        if not words:
+            return queryset, False
+        return queryset.filter(words_q(words)), False
+
+    @admin.action(description='Recompute difficulty for selected recipes')
+    def recompute_difficulty(self, request, queryset):
+        """Re-grade the selection with one UPDATE per difficulty and batch of ids"""
+        changes = {}
+        for recipe in queryset.only('pk', 'ingredients', 'cooking_time', 'difficulty').iterator():
+            difficulty = recipe.calculate_difficulty()
+            if difficulty != recipe.difficulty:
+                changes.setdefault(difficulty, []).append(recipe.pk)
+
+        if not changes:
+            self.message_user(request, 'All selected recipes already have the right difficulty.')
+            return
+
+        changed_ids = [pk for ids in changes.values() for pk in ids]
+        now = timezone.now()
+        with transaction.atomic():
+            for difficulty, ids in changes.items():
+                for start in range(0, len(ids), BULK_ACTION_BATCH):
+                    Recipe.objects.filter(pk__in=ids[start:start + BULK_ACTION_BATCH]).update(
+                        difficulty=difficulty, updated_at=now
+                    )
+            # update() skips auto_now and the save signals that keep these in step
+            rebuild_daily_stats()
+            # Difficulty is scored, so the lists holding these recipes are stale too
+            stale = set(changed_ids)
+            for start in range(0, len(changed_ids), BULK_ACTION_BATCH):
+                stale.update(RecipeSimilarity.objects.filter(
+                    similar_id__in=changed_ids[start:start + BULK_ACTION_BATCH]
+                ).values_list('recipe_id', flat=True))
+            stale = sorted(stale)
+            for start in range(0, len(stale), BULK_ACTION_BATCH):
+                refresh_neighbours(stale[start:start + BULK_ACTION_BATCH])
+            invalidate_facet_counts()
+            invalidate_recipe_details(changed_ids)
+        self.message_user(
+            request, f'Updated the difficulty of {len(changed_ids)} recipe(s).', messages.SUCCESS
+        )
@@ -0,0 +1,267 @@
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import wraps
+from django.conf import settings
+from django.db.models import Q, Max
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from django.views.decorators.http import require_GET
+from .models import Recipe, RecipeDeletion, RecipeDeletionPrune
+from .routers import read_from_replica
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+API_FIELDS = (
+    'id', 'name', 'ingredients', 'cooking_time', 'difficulty',
+    'description', 'pic', 'created_at', 'updated_at',
+)
+
+
+class BadRequest(ValueError):
+    """Invalid API parameters, reported to the client as a 400"""
+
+
+def error(message, status):
+    """JSON error response in the same shape as the other JSON views"""
+    return JsonResponse({'error': message}, status=status)
+
+
+def api_view(view):
+    """Session-authenticated GET-only JSON view that turns BadRequest into a 400"""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error('Authentication required', 401)
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as exc:
+            return error(str(exc), 400)
+    return read_from_replica(wrapper)
+
+
+def requested_fields(request):
+    """Fields named in ?fields=, or every API field"""
+    value = request.GET.get('fields', '').strip()
+    if not value:
+        return list(API_FIELDS)
+    fields = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in API_FIELDS]
+    if unknown:
+        raise BadRequest(f'Unknown field(s): {", ".join(unknown)}')
+    return fields
+
+
+def requested_limit(request):
+    """Page size from ?limit=, capped at MAX_LIMIT"""
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise BadRequest('limit must be a number')
+    if limit < 1:
+        raise BadRequest('limit must be positive')
+    return min(limit, MAX_LIMIT)
+
+
+def encode_cursor(value):
+    """Opaque cursor for a position in a listing"""
+    return urlsafe_base64_encode(force_bytes(value))
+
+
+def decode_cursor(cursor):
+    """The position stored in an opaque cursor"""
+    try:
+        return force_str(urlsafe_base64_decode(cursor))
+    except (ValueError, UnicodeDecodeError):
+        raise BadRequest('Invalid cursor')
+
+
+def selected(queryset, fields):
+    """Load only the database columns behind the requested fields"""
+    return queryset.only('pk', *[name for name in fields if name != 'id'])
+
+
+def serialize(recipe, fields):
+    """JSON-ready dict of the requested fields of a recipe"""
+    data = {}
+    for name in fields:
+        value = recipe.pk if name == 'id' else getattr(recipe, name)
+        if name == 'pic':
+            value = value.url if value else None
+        elif name in ('created_at', 'updated_at'):
+            value = value.isoformat()
+        data[name] = value
+    return data
+
+
+def page_url(request, cursor):
+    """Absolute URL of the next page, keeping the other query parameters"""
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+
+@api_view
+def recipe_list(request):
+    """Recipes in id order, paginated with an opaque ?cursor="""
+    fields = requested_fields(request)
+    limit = requested_limit(request)
+    recipes = selected(Recipe.objects.order_by('pk'), fields)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            position = int(decode_cursor(cursor))
+        except ValueError:
+            raise BadRequest('Invalid cursor')
+        recipes = recipes.filter(pk__gt=position)
+
+    # One extra row tells us whether there is another page
+    page = list(recipes[:limit + 1])
+    next_url = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_url = page_url(request, encode_cursor(page[-1].pk))
+    return JsonResponse({
+        'results': [serialize(recipe, fields) for recipe in page],
+        'next': next_url,
+    })
+
+
+@api_view
+def recipe_detail(request, pk):
+    """One recipe"""
+    fields = requested_fields(request)
+    recipe = selected(Recipe.objects.filter(pk=pk), fields).first()
+    if recipe is None:
+        return error('Not found', 404)
+    return JsonResponse(serialize(recipe, fields))
+
+
+@api_view
+def recipe_batch(request):
+    """Several recipes by ?ids=1,2,3 in one query; unknown ids are listed under 'missing'"""
+    fields = requested_fields(request)
+    try:
+        ids = list(dict.fromkeys(int(value) for value in request.GET.get('ids', '').split(',') if value.strip()))
+    except ValueError:
+        raise BadRequest('ids must be a comma-separated list of numbers')
+    if not ids:
+        raise BadRequest('ids is required')
+    if len(ids) > MAX_LIMIT:
+        raise BadRequest(f'At most {MAX_LIMIT} ids per request')
+
+    recipes = selected(Recipe.objects.all(), fields).in_bulk(ids)
+    return JsonResponse({
+        'results': [serialize(recipes[pk], fields) for pk in ids if pk in recipes],
+        'missing': [pk for pk in ids if pk not in recipes],
+    })
+
+
+def decode_sync_cursor(cursor):
+    """(updated_at, pk, deletion id) position stored in a sync cursor"""
+    try:
+        position = json.loads(decode_cursor(cursor))
+        return datetime.fromisoformat(position['t']), int(position['p']), int(position['d'])
+    except (ValueError, KeyError, TypeError):
+        raise BadRequest('Invalid cursor')
+
+
+def encode_sync_cursor(updated_at, pk, deletion_id):
+    """Opaque sync cursor for a keyset position and the last tombstone seen"""
+    return encode_cursor(json.dumps({'t': updated_at.isoformat(), 'p': pk, 'd': deletion_id}))
+
+
+def sync_position(request):
+    """
+    Where a client's last sync stopped.
+
+    Without a cursor the client has nothing yet: every recipe is sent and
+    tombstones logged so far are skipped.
+    """
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return decode_sync_cursor(cursor)
+    last_deletion = RecipeDeletion.objects.aggregate(last=Max('id'))['last'] or 0
+    # The log may have been pruned empty; ids are never reused, so start past the pruned ones
+    return datetime.min.replace(tzinfo=dt_timezone.utc), 0, max(last_deletion, pruned_through())
+
+
+def pruned_through():
+    """Highest tombstone id removed from the log by prune_deletions, 0 if none was"""
+    return RecipeDeletionPrune.objects.values_list('pruned_through', flat=True).first() or 0
+
+
+def tombstones_pruned(deletion_id):
+    """True if tombstones after `deletion_id` have already been pruned from the log"""
+    return pruned_through() > deletion_id
+
+
+def changed_since(updated_at, pk, settled_before):
+    """Recipes saved after a keyset position, oldest first"""
+    return Recipe.objects.filter(
+        Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, pk__gt=pk),
+        updated_at__lte=settled_before,
+    ).order_by('updated_at', 'pk')
+
+
+def deleted_since(deletion_id, settled_before):
+    """Tombstones logged after a deletion id, oldest first"""
+    return RecipeDeletion.objects.filter(
+        pk__gt=deletion_id, deleted_at__lte=settled_before
+    ).order_by('pk')
+
+
+@api_view
+def recipe_changes(request):
+    """
+    Recipes changed and deleted since ?cursor=, for incremental sync.
+
+    Returns a page of changed recipes and deleted ids plus the cursor to
+    send next time; keep fetching while has_more is true. With ?stream=1
+    every change is streamed as JSON lines instead, ending with the cursor.
+    A 410 means tombstones the client needs were pruned: sync from scratch.
+    """
+    fields = requested_fields(request)
+    updated_at, pk, deletion_id = sync_position(request)
+    if tombstones_pruned(deletion_id):
+        return error('Cursor too old, sync again without a cursor', 410)
+    settled_before = timezone.now() - timedelta(seconds=settings.RECIPE_SYNC_SETTLE_SECONDS)
+    # updated_at is needed for the cursor even if the client did not ask for it
+    recipes = selected(changed_since(updated_at, pk, settled_before), [*fields, 'updated_at'])
+    deletions = deleted_since(deletion_id, settled_before)
+
+    if request.GET.get('stream') == '1':
+        return StreamingHttpResponse(
+            stream_changes(recipes, deletions, fields, (updated_at, pk, deletion_id)),
+            content_type='application/x-ndjson',
+        )
+
+    limit = requested_limit(request)
+    changed = list(recipes[:limit + 1])
+    deleted = list(deletions.values_list('pk', 'recipe_id')[:limit + 1])
+    has_more = len(changed) > limit or len(deleted) > limit
+    changed, deleted = changed[:limit], deleted[:limit]
+    if changed:
+        updated_at, pk = changed[-1].updated_at, changed[-1].pk
+    if deleted:
+        deletion_id = deleted[-1][0]
+    return JsonResponse({
+        'changed': [serialize(recipe, fields) for recipe in changed],
+        'deleted': [recipe_id for log_id, recipe_id in deleted],
+        'cursor': encode_sync_cursor(updated_at, pk, deletion_id),
+        'has_more': has_more,
+    })
+
+
+def stream_changes(recipes, deletions, fields, position):
+    """JSON lines for every change, then one line with the next cursor"""
+    updated_at, pk, deletion_id = position
+    for recipe in recipes.iterator(chunk_size=500):
+        updated_at, pk = recipe.updated_at, recipe.pk
+        yield json.dumps({'changed': serialize(recipe, fields)}) + '\n'
+    for deletion_id, recipe_id in deletions.values_list('pk', 'recipe_id').iterator(chunk_size=500):
+        yield json.dumps({'deleted': recipe_id}) + '\n'
+    yield json.dumps({'cursor': encode_sync_cursor(updated_at, pk, deletion_id)}) + '\n'
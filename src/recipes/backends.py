@@ -0,0 +1,31 @@
+import hashlib
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def user_cache_key(user_id):
+    return f'recipes:user:{user_id}'
+
+
+def username_cache_key(username):
+    return f'recipes:username-available:{hashlib.sha256(username.encode("utf-8")).hexdigest()}'
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that loads the session's user from the cache.
+
+    Authentication itself is unchanged; only the per-request `get_user`
+    lookup done by AuthenticationMiddleware is served from the cache.
+    Cached users are dropped whenever the User row is saved or deleted.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
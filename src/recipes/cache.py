@@ -0,0 +1,11 @@
+from django.core.cache import cache
+
+
+def detail_cache_key(pk):
+    """Cache key of a recipe's detail page data (dropped when the recipe changes)"""
+    return f'recipes:detail:{pk}'
+
+
+def invalidate_recipe_details(pks):
+    """Drop the cached detail page data of the given recipes"""
+    cache.delete_many([detail_cache_key(pk) for pk in pks])
@@ -0,0 +1,267 @@
+import base64
+import math
+import threading
+from contextlib import contextmanager
+from io import BytesIO
+import matplotlib
+from django.utils.html import escape
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Same palette and canvas size (10x6 inches at 100 dpi) as the matplotlib charts
+COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+          '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+WIDTH = 1000
+HEIGHT = 600
+MARGIN_LEFT = 80
+MARGIN_RIGHT = 30
+MARGIN_TOP = 60
+MARGIN_BOTTOM = 130
+
+
+def _num(value):
+    """Format a coordinate compactly"""
+    return f'{value:.1f}'.rstrip('0').rstrip('.')
+
+
+def _text(x, y, label, size=14, anchor='middle', extra=''):
+    return (f'<text x="{_num(x)}" y="{_num(y)}" font-size="{size}" '
+            f'text-anchor="{anchor}"{extra}>{escape(label)}</text>')
+
+
+def _nice_ticks(max_value, count=5):
+    """Evenly spaced y-axis ticks covering 0..max_value"""
+    if max_value <= 0:
+        return [0, 1]
+    raw_step = max_value / count
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    for multiplier in (1, 2, 5, 10):
+        step = multiplier * magnitude
+        if step >= raw_step:
+            break
+    if step < 1:
+        step = 1
+    ticks = []
+    tick = 0
+    while tick < max_value + step:
+        ticks.append(tick)
+        tick += step
+    return ticks
+
+
+def _axes(parts, ticks, xlabel, ylabel, grid=False):
+    """Draw y ticks, axis lines and axis labels; return the y scale"""
+    plot_height = HEIGHT - MARGIN_TOP - MARGIN_BOTTOM
+    plot_right = WIDTH - MARGIN_RIGHT
+    top = ticks[-1]
+
+    def y_pos(value):
+        return MARGIN_TOP + plot_height - (value / top) * plot_height
+
+    for tick in ticks:
+        y = y_pos(tick)
+        if grid:
+            parts.append(f'<line x1="{MARGIN_LEFT}" y1="{_num(y)}" x2="{plot_right}" '
+                         f'y2="{_num(y)}" stroke="#000" stroke-opacity="0.15"/>')
+        parts.append(_text(MARGIN_LEFT - 8, y + 5, f'{tick:g}', 12, 'end'))
+    bottom = MARGIN_TOP + plot_height
+    parts.append(f'<path d="M{MARGIN_LEFT} {MARGIN_TOP}V{bottom}H{plot_right}" '
+                 f'fill="none" stroke="#000"/>')
+    if xlabel:
+        parts.append(_text((MARGIN_LEFT + plot_right) / 2, HEIGHT - 15, xlabel))
+    if ylabel:
+        parts.append(_text(20, MARGIN_TOP + plot_height / 2, ylabel, 14, 'middle',
+                           f' transform="rotate(-90 20 {_num(MARGIN_TOP + plot_height / 2)})"'))
+    return y_pos
+
+
+def _x_label(parts, x, label):
+    """Category label under the x axis, rotated 45 degrees like the PNG charts"""
+    y = HEIGHT - MARGIN_BOTTOM + 18
+    parts.append(_text(x, y, label, 12, 'end',
+                       f' transform="rotate(-45 {_num(x)} {_num(y)})"'))
+
+
+def _bar(parts, data, kwargs):
+    values = data['values']
+    ticks = _nice_ticks(max(values, default=0))
+    y_pos = _axes(parts, ticks, kwargs.get('xlabel', ''), kwargs.get('ylabel', ''))
+    plot_width = WIDTH - MARGIN_LEFT - MARGIN_RIGHT
+    slot = plot_width / max(len(values), 1)
+    bottom = y_pos(0)
+    for index, (label, value) in enumerate(zip(data['labels'], values)):
+        x = MARGIN_LEFT + slot * index + slot * 0.1
+        top = y_pos(value)
+        parts.append(f'<rect x="{_num(x)}" y="{_num(top)}" width="{_num(slot * 0.8)}" '
+                     f'height="{_num(bottom - top)}" fill="{COLORS[0]}"/>')
+        _x_label(parts, x + slot * 0.4, str(label))
+
+
+def _pie(parts, data, kwargs):
+    values = data['values']
+    total = sum(values)
+    cx, cy = WIDTH / 2, (HEIGHT + MARGIN_TOP) / 2
+    radius = min(WIDTH, HEIGHT - MARGIN_TOP) / 2 - 60
+    # Start at 12 o'clock and go counter-clockwise, as matplotlib's startangle=90
+    angle = math.pi / 2
+    for index, (label, value) in enumerate(zip(data['labels'], values)):
+        if not total or not value:
+            continue
+        sweep = 2 * math.pi * value / total
+        color = COLORS[index % len(COLORS)]
+        if value == total:
+            parts.append(f'<circle cx="{_num(cx)}" cy="{_num(cy)}" r="{_num(radius)}" fill="{color}"/>')
+        else:
+            x1 = cx + radius * math.cos(angle)
+            y1 = cy - radius * math.sin(angle)
+            x2 = cx + radius * math.cos(angle + sweep)
+            y2 = cy - radius * math.sin(angle + sweep)
+            large_arc = 1 if sweep > math.pi else 0
+            parts.append(f'<path d="M{_num(cx)} {_num(cy)}L{_num(x1)} {_num(y1)}'
+                         f'A{_num(radius)} {_num(radius)} 0 {large_arc} 0 {_num(x2)} {_num(y2)}Z" '
+                         f'fill="{color}"/>')
+        middle = angle + sweep / 2
+        parts.append(_text(cx + radius * 0.6 * math.cos(middle),
+                           cy - radius * 0.6 * math.sin(middle) + 5,
+                           f'{100 * value / total:.1f}%'))
+        anchor = 'start' if math.cos(middle) >= 0 else 'end'
+        parts.append(_text(cx + radius * 1.1 * math.cos(middle),
+                           cy - radius * 1.1 * math.sin(middle) + 5,
+                           str(label), 14, anchor))
+        angle += sweep
+
+
+def _line(parts, data, kwargs):
+    values = data['values']
+    ticks = _nice_ticks(max(values, default=0))
+    y_pos = _axes(parts, ticks, kwargs.get('xlabel', ''), kwargs.get('ylabel', ''), grid=True)
+    plot_width = WIDTH - MARGIN_LEFT - MARGIN_RIGHT
+    slot = plot_width / max(len(values), 1)
+    points = []
+    for index, (label, value) in enumerate(zip(data['labels'], values)):
+        x = MARGIN_LEFT + slot * (index + 0.5)
+        points.append(f'{_num(x)},{_num(y_pos(value))}')
+        _x_label(parts, x, str(label))
+    parts.append(f'<polyline points="{" ".join(points)}" fill="none" '
+                 f'stroke="{COLORS[0]}" stroke-width="2"/>')
+    for point in points:
+        x, y = point.split(',')
+        parts.append(f'<circle cx="{x}" cy="{y}" r="4" fill="{COLORS[0]}"/>')
+
+
+RENDERERS = {
+    'bar': _bar,
+    'pie': _pie,
+    'line': _line,
+}
+
+
+def render_svg(chart_type, data, **kwargs):
+    """Render a bar, pie or line chart straight to an SVG string"""
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {WIDTH} {HEIGHT}" '
+        f'font-family="sans-serif" role="img">',
+        f'<rect width="{WIDTH}" height="{HEIGHT}" fill="#fff"/>',
+    ]
+    title = kwargs.get('title', '')
+    if title:
+        parts.append(_text(WIDTH / 2, 35, title, 20))
+    RENDERERS[chart_type](parts, data, kwargs)
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def render_spec(chart_type, data, **kwargs):
+    """Describe a chart as a JSON-serialisable spec for client-side rendering"""
+    return {
+        'type': chart_type,
+        'title': kwargs.get('title', ''),
+        'xlabel': kwargs.get('xlabel', ''),
+        'ylabel': kwargs.get('ylabel', ''),
+        'labels': [str(label) for label in data['labels']],
+        'values': [int(value) if float(value).is_integer() else float(value)
+                   for value in data['values']],
+    }
+
+
+
+class FigurePool:
+    """
+    Per-thread matplotlib figures that are cleared and reused between renders.
+
+    Uses the object-oriented Figure/FigureCanvasAgg API only, so no pyplot
+    global state is shared between threads.
+    """
+
+    def __init__(self, figsize=(10, 6)):
+        self.figsize = figsize
+        self._local = threading.local()
+        self._subplot_defaults = {
+            name: matplotlib.rcParams[f'figure.subplot.{name}']
+            for name in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')
+        }
+
+    def _create(self):
+        figure = Figure(figsize=self.figsize)
+        FigureCanvasAgg(figure)
+        axes = figure.add_subplot()
+        return figure, axes
+
+    @contextmanager
+    def acquire(self):
+        """Yield this thread's (figure, axes), cleared for a fresh chart"""
+        if getattr(self._local, 'in_use', False):
+            # Nested render in the same thread: use a throwaway figure
+            yield self._create()
+            return
+        entry = getattr(self._local, 'entry', None)
+        if entry is None:
+            entry = self._local.entry = self._create()
+        self._local.in_use = True
+        try:
+            yield entry
+        finally:
+            figure, axes = entry
+            # clear() keeps some state that pie charts change
+            axes.clear()
+            axes.set_aspect('auto')
+            axes.set_frame_on(True)
+            figure.subplots_adjust(**self._subplot_defaults)
+            self._local.in_use = False
+
+
+figure_pool = FigurePool()
+
+
+def render_png(chart_type, data, pool=None, **kwargs):
+    """Render a chart with matplotlib and return it as a base64 encoded PNG"""
+    with (pool or figure_pool).acquire() as (figure, axes):
+        if chart_type == 'bar':
+            axes.bar(data['labels'], data['values'])
+            axes.set_xlabel(kwargs.get('xlabel', ''))
+            axes.set_ylabel(kwargs.get('ylabel', ''))
+            axes.set_title(kwargs.get('title', ''))
+            for label in axes.get_xticklabels():
+                label.set_rotation(45)
+                label.set_ha('right')
+
+        elif chart_type == 'pie':
+            axes.pie(data['values'], labels=data['labels'], autopct='%1.1f%%', startangle=90)
+            axes.set_title(kwargs.get('title', ''))
+            axes.axis('equal')
+
+        elif chart_type == 'line':
+            axes.plot(data['labels'], data['values'], marker='o', linewidth=2, markersize=8)
+            axes.set_xlabel(kwargs.get('xlabel', ''))
+            axes.set_ylabel(kwargs.get('ylabel', ''))
+            axes.set_title(kwargs.get('title', ''))
+            for label in axes.get_xticklabels():
+                label.set_rotation(45)
+                label.set_ha('right')
+            axes.grid(True, alpha=0.3)
+
+        figure.tight_layout()
+
+        buffer = BytesIO()
+        figure.savefig(buffer, format='png')
+        return base64.b64encode(buffer.getvalue()).decode('utf-8')
@@ -0,0 +1,188 @@
+import hashlib
+import zlib
+from collections import defaultdict
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from .search import tokenize
+
+SHINGLE_SIZE = 3
+# 16 bands of 4 rows: pairs above ~0.5 Jaccard similarity almost always share a band
+BANDS = 16
+ROWS_PER_BAND = 4
+NUM_HASHES = BANDS * ROWS_PER_BAND
+MERSENNE_PRIME = (1 << 31) - 1
+
+_random = np.random.default_rng(20240611)
+_HASH_A = _random.integers(1, MERSENNE_PRIME, NUM_HASHES, dtype=np.uint64)
+_HASH_B = _random.integers(0, MERSENNE_PRIME, NUM_HASHES, dtype=np.uint64)
+
+FIELDS = ('pk', 'name', 'ingredients', 'description')
+
+
+def shingles(recipe):
+    """Hashed word shingles of a recipe's name, ingredients and description"""
+    words = tokenize(' '.join([recipe.name, recipe.ingredients, recipe.description]))
+    if len(words) <= SHINGLE_SIZE:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = [' '.join(words[index:index + SHINGLE_SIZE]) for index in range(len(words) - SHINGLE_SIZE + 1)]
+    return {zlib.crc32(gram.encode()) for gram in grams}
+
+
+def jaccard(first, second):
+    """Jaccard similarity of two shingle sets"""
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def minhash(shingle_set):
+    """MinHash signature of a shingle set (NUM_HASHES values)"""
+    if not shingle_set:
+        return np.full(NUM_HASHES, MERSENNE_PRIME, dtype=np.uint64)
+    values = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+    hashed = (_HASH_A[:, None] * values[None, :] + _HASH_B[:, None]) % MERSENNE_PRIME
+    return hashed.min(axis=1)
+
+
+def band_buckets(signature, bands=BANDS, rows_per_band=ROWS_PER_BAND):
+    """One bucket id per LSH band; recipes sharing any (band, bucket) are candidates"""
+    buckets = []
+    for band in range(bands):
+        rows = signature[band * rows_per_band:(band + 1) * rows_per_band]
+        digest = hashlib.blake2b(rows.tobytes(), digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, 'big', signed=True)))
+    return buckets
+
+
+def find_duplicate_clusters(recipes, threshold=None):
+    """
+    Group near-identical recipes; returns clusters as sorted lists of pks.
+
+    Every recipe is hashed once into LSH buckets, and only recipes sharing
+    a bucket are compared exactly, so the work grows roughly linearly with
+    the number of recipes.
+    """
+    if threshold is None:
+        threshold = settings.RECIPE_DUPLICATE_THRESHOLD
+    shingle_sets = {}
+    buckets = defaultdict(list)
+    for recipe in recipes:
+        shingle_sets[recipe.pk] = shingles(recipe)
+        if shingle_sets[recipe.pk]:
+            for bucket in band_buckets(minhash(shingle_sets[recipe.pk])):
+                buckets[bucket].append(recipe.pk)
+
+    parent = {}
+
+    def root(pk):
+        while parent.get(pk, pk) != pk:
+            pk = parent[pk]
+        return pk
+
+    checked = set()
+    for members in buckets.values():
+        for index, first in enumerate(members):
+            for second in members[index + 1:]:
+                pair = (first, second)
+                if pair in checked:
+                    continue
+                checked.add(pair)
+                if jaccard(shingle_sets[first], shingle_sets[second]) >= threshold:
+                    first_root, second_root = root(first), root(second)
+                    if first_root != second_root:
+                        parent[max(first_root, second_root)] = min(first_root, second_root)
+
+    clusters = defaultdict(list)
+    for pk in parent:
+        clusters[root(pk)].append(pk)
+    for pk, members in clusters.items():
+        if pk not in members:
+            members.append(pk)
+    return sorted(sorted(members) for members in clusters.values())
+
+
+def merge_cluster(pks):
+    """
+    Keep the oldest recipe of a cluster and delete the rest; returns the kept recipe.
+
+    A missing picture on the kept recipe is taken from a duplicate.
+    """
+    from .models import Recipe
+    recipes = list(Recipe.objects.filter(pk__in=pks).order_by('pk'))
+    keep, duplicates = recipes[0], recipes[1:]
+    with transaction.atomic():
+        pic = None
+        if not keep.pic:
+            pic = next((duplicate.pic.name for duplicate in duplicates if duplicate.pic), None)
+        for duplicate in duplicates:
+            duplicate.delete()
+        if pic:
+            # Saved after the deletes, so the save signals no longer see the duplicates
+            keep.pic = pic
+            keep.save(update_fields=['pic', 'updated_at'])
+    return keep
+
+
+def index_recipe_signature(recipe, band_model=None):
+    """Replace one recipe's LSH bucket rows; returns its shingle set"""
+    if band_model is None:
+        from .models import RecipeSignatureBand as band_model
+    shingle_set = shingles(recipe)
+    band_model.objects.filter(recipe_id=recipe.pk).delete()
+    if shingle_set:
+        band_model.objects.bulk_create([
+            band_model(recipe_id=recipe.pk, band=band, bucket=bucket)
+            for band, bucket in band_buckets(minhash(shingle_set))
+        ])
+    return shingle_set
+
+
+def rebuild_signature_index(recipe_model=None, band_model=None):
+    """Recompute every recipe's LSH bucket rows; returns the number of rows written"""
+    if recipe_model is None:
+        from .models import Recipe as recipe_model
+    if band_model is None:
+        from .models import RecipeSignatureBand as band_model
+    rows = []
+    for recipe in recipe_model.objects.only(*FIELDS).iterator(chunk_size=1000):
+        shingle_set = shingles(recipe)
+        if shingle_set:
+            rows.extend(
+                band_model(recipe_id=recipe.pk, band=band, bucket=bucket)
+                for band, bucket in band_buckets(minhash(shingle_set))
+            )
+    with transaction.atomic():
+        band_model.objects.all().delete()
+        band_model.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def flag_duplicate(recipe):
+    """
+    Point a saved recipe's duplicate_of at its closest near-duplicate, or clear it.
+
+    Only recipes sharing an LSH bucket with it are compared.
+    """
+    from django.db.models import Q
+    from .models import Recipe, RecipeSignatureBand
+    with transaction.atomic():
+        shingle_set = index_recipe_signature(recipe)
+        same_bucket = Q()
+        for row in RecipeSignatureBand.objects.filter(recipe_id=recipe.pk):
+            same_bucket |= Q(band=row.band, bucket=row.bucket)
+        best, best_score = None, settings.RECIPE_DUPLICATE_THRESHOLD
+        if same_bucket:
+            candidate_ids = (
+                RecipeSignatureBand.objects.filter(same_bucket)
+                .exclude(recipe_id=recipe.pk).values('recipe_id')
+            )
+            for candidate in Recipe.objects.filter(pk__in=candidate_ids).only(*FIELDS).order_by('pk'):
+                score = jaccard(shingle_set, shingles(candidate))
+                if score >= best_score and (best is None or score > best_score):
+                    best, best_score = candidate.pk, score
+        if recipe.duplicate_of_id != best:
+            Recipe.objects.filter(pk=recipe.pk).update(duplicate_of=best)
+            recipe.duplicate_of_id = best
+    return best
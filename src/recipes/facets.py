@@ -0,0 +1,80 @@
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Count
+from .forms import DIFFICULTY_CHOICES, COOKING_TIME_CHOICES
+
+FACET_CACHE_VERSION_KEY = 'recipes:facets:version'
+
+
+def _difficulty_q(difficulty):
+    """Q object for a difficulty choice ('' means any difficulty)"""
+    return Q(difficulty=difficulty) if difficulty else Q()
+
+
+def _cooking_time_q(cooking_time):
+    """Q object for a cooking time choice ('' means any time)"""
+    return Q(cooking_time__lte=int(cooking_time)) if cooking_time else Q()
+
+
+def _cache_key(recipe_name, ingredient, difficulty, cooking_time, fuzzy, query):
+    """Build the cache key for one filter combination"""
+    version = cache.get_or_set(FACET_CACHE_VERSION_KEY, 1, None)
+    filters = json.dumps([recipe_name.lower(), ingredient.lower(), difficulty, cooking_time, bool(fuzzy), query])
+    # Names, ingredients and queries are free text; hash them to keep keys short and memcached-safe
+    return f'recipes:facets:{version}:{hashlib.sha256(filters.encode()).hexdigest()}'
+
+
+def invalidate_facet_counts():
+    """Drop every cached facet count by bumping the cache version"""
+    try:
+        cache.incr(FACET_CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(FACET_CACHE_VERSION_KEY, 1, None)
+
+
+def get_facet_counts(recipes, recipe_name='', ingredient='', difficulty='', cooking_time='', fuzzy=False, query=''):
+    """
+    Return result counts for every difficulty and cooking time option.
+
+    `recipes` must already be filtered by name, ingredient and advanced
+    `query` (`fuzzy` says whether that was a typo-tolerant match). Each facet
+    is counted with the other facet's current selection applied, so the
+    number next to an option is what selecting it would return. All
+    counts come from a single conditional-aggregation query.
+    """
+    difficulty_keys = [key for key, label in DIFFICULTY_CHOICES]
+    cooking_time_keys = [key for key, label in COOKING_TIME_CHOICES]
+    if difficulty not in difficulty_keys:
+        difficulty = ''
+    if cooking_time not in cooking_time_keys:
+        cooking_time = ''
+
+    key = None
+    if settings.RECIPE_VIEW_CACHE:
+        key = _cache_key(recipe_name, ingredient, difficulty, cooking_time, fuzzy, query)
+        counts = cache.get(key)
+        if counts is not None:
+            return counts
+
+    aggregates = {}
+    for index, option in enumerate(difficulty_keys):
+        condition = _difficulty_q(option) & _cooking_time_q(cooking_time)
+        aggregates[f'difficulty_{index}'] = Count('pk', filter=condition)
+    for index, option in enumerate(cooking_time_keys):
+        condition = _cooking_time_q(option) & _difficulty_q(difficulty)
+        aggregates[f'cooking_time_{index}'] = Count('pk', filter=condition)
+
+    result = recipes.aggregate(**aggregates)
+    counts = {
+        'difficulty': {
+            option: result[f'difficulty_{index}'] for index, option in enumerate(difficulty_keys)
+        },
+        'cooking_time': {
+            option: result[f'cooking_time_{index}'] for index, option in enumerate(cooking_time_keys)
+        },
+    }
+    if key is not None:
+        cache.set(key, counts, settings.RECIPE_FACET_CACHE_TIMEOUT)
+    return counts
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 
 DIFFICULTY_CHOICES = [
     ('', 'All'),
@@ -17,6 +18,8 @@ COOKING_TIME_CHOICES = [
     ('60', 'Less than 60 minutes'),
 ]
 
+USERNAME_TAKEN_MESSAGE = 'This username is already taken.'
+
 class LoginForm(forms.Form):
     username = forms.CharField(
         max_length=150,
@@ -62,13 +65,6 @@ class SignupForm(forms.Form):
         })
     )
     
-    def clean_username(self):
-        """Check if username already exists"""
-        username = self.cleaned_data.get('username')
-        if User.objects.filter(username=username).exists():
-            raise ValidationError('This username is already taken.')
-        return username
-    
     def clean(self):
         """Check if passwords match"""
         cleaned_data = super().clean()
@@ -79,6 +75,24 @@ class SignupForm(forms.Form):
             raise ValidationError('Passwords do not match.')
         
         return cleaned_data
+    
+    def save(self):
+        """
+        Create the user, relying on the unique username constraint.
+        
+        Returns None and adds a username error if the name is taken, including
+        when a concurrent signup claims it first.
+        """
+        try:
+            with transaction.atomic():
+                return User.objects.create_user(
+                    username=self.cleaned_data['username'],
+                    email=self.cleaned_data.get('email'),
+                    password=self.cleaned_data['password1']
+                )
+        except IntegrityError:
+            self.add_error('username', USERNAME_TAKEN_MESSAGE)
+            return None
 
 class RecipeSearchForm(forms.Form):
     recipe_name = forms.CharField(
@@ -115,10 +129,37 @@ class RecipeSearchForm(forms.Form):
         })
     )
     
+    q = forms.CharField(
+        max_length=500,
+        required=False,
+        widget=forms.TextInput(attrs={
+            'placeholder': 'e.g. ingredient:(chicken AND garlic) -nuts time:<30 difficulty:Easy|Medium',
+            'class': 'search-input'
+        })
+    )
+    
+    fuzzy = forms.BooleanField(
+        required=False,
+        initial=False,
+        widget=forms.CheckboxInput(attrs={
+            'class': 'chart-checkbox'
+        })
+    )
+    
     show_chart = forms.BooleanField(
         required=False,
         initial=False,
         widget=forms.CheckboxInput(attrs={
             'class': 'chart-checkbox'
         })
-    )
\ No newline at end of file
+    )
+    
+    def apply_facet_counts(self, counts):
+        """Show the number of matching recipes next to each dropdown option"""
+        for field_name in ('difficulty', 'cooking_time'):
+            field = self.fields[field_name]
+            field_counts = counts.get(field_name, {})
+            field.choices = [
+                (value, f'{label} ({field_counts[value]})' if value in field_counts else label)
+                for value, label in field.choices
+            ]
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+# The cost parameters are read from settings on every use, so changing a
+# setting makes must_update() flag older hashes, and Django re-hashes them
+# the next time the user logs in successfully.
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with the iteration count from PASSWORD_PBKDF2_ITERATIONS"""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class ConfigurableArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id with time and memory cost from PASSWORD_ARGON2_TIME_COST / _MEMORY_COST"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+
+class ConfigurableScryptPasswordHasher(ScryptPasswordHasher):
+    """Scrypt with the work factor from PASSWORD_SCRYPT_WORK_FACTOR"""
+
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
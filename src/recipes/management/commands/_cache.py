@@ -0,0 +1,17 @@
+import uuid
+from django.test.utils import override_settings
+
+
+def private_cache():
+    """
+    Settings override giving a command its own in-memory default cache.
+
+    Commands that clear the cache between runs use it so they never wipe
+    the sessions, rate limits and cached pages of the configured cache.
+    """
+    return override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'benchmark-{uuid.uuid4().hex}',
+        }
+    })
@@ -0,0 +1,37 @@
+from wsgiref.util import setup_testing_defaults
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import CommandError
+from django.test import Client
+
+
+def login_cookie(username, password):
+    """Create a user and return a session cookie header for them"""
+    User.objects.create_user(username=username, password=password)
+    client = Client()
+    client.login(username=username, password=password)
+    return f'sessionid={client.cookies["sessionid"].value}'
+
+
+def make_requester(cookie):
+    """
+    Return a function that runs GET requests through the full WSGI handler.
+
+    Unlike the test Client, this fires request_started/request_finished, so
+    connection handling behaves as it does under gunicorn.
+    """
+    handler = WSGIHandler()
+
+    def start_response(status, headers):
+        if not status.startswith('200'):
+            raise CommandError(f'request returned {status}')
+
+    def request(path):
+        environ = {'PATH_INFO': path, 'HTTP_HOST': 'testserver', 'HTTP_COOKIE': cookie}
+        setup_testing_defaults(environ)
+        response = handler(environ, start_response)
+        body = b''.join(response)
+        response.close()
+        return body
+
+    return request
@@ -0,0 +1,56 @@
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from recipes.charts import FigurePool, render_png
+from recipes.management.commands.benchmark_charts import sample_charts
+
+
+class Command(BaseCommand):
+    help = 'Compare fresh-figure and pooled-figure PNG chart rendering under concurrent threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent rendering threads')
+        parser.add_argument('--renders', type=int, default=10, help='Chart sets rendered per thread')
+        parser.add_argument('--days', type=int, default=30, help='Points on the growth line chart')
+
+    def handle(self, *args, **options):
+        charts = sample_charts(options['days'])
+        shared_pool = FigurePool()
+
+        def fresh_pool():
+            # A pool used once is equivalent to creating a new figure per chart
+            return FigurePool()
+
+        def pooled():
+            return shared_pool
+
+        def worker(get_pool):
+            for _ in range(options['renders']):
+                for chart_type, data, kwargs in charts:
+                    render_png(chart_type, data, pool=get_pool(), **kwargs)
+
+        def run(get_pool):
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                for future in [executor.submit(worker, get_pool) for _ in range(options['threads'])]:
+                    future.result()
+
+        total = options['threads'] * options['renders'] * len(charts)
+        self.stdout.write(f'{total} charts on {options["threads"]} threads')
+        self.stdout.write(f'{"mode":<8}{"ms/chart":>12}{"peak KiB":>12}{"alloc blocks":>14}')
+        for name, get_pool in (('fresh', fresh_pool), ('pooled', pooled)):
+            run(get_pool)  # warm up fonts and caches
+
+            start = time.perf_counter()
+            run(get_pool)
+            elapsed = (time.perf_counter() - start) * 1000 / total
+
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            run(get_pool)
+            after = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+
+            self.stdout.write(f'{name:<8}{elapsed:>12.2f}{peak / 1024:>12.0f}{blocks:>14}')
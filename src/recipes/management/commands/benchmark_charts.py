@@ -0,0 +1,54 @@
+import json
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from recipes.views import render_chart, CHART_FORMATS
+
+
+def sample_charts(days):
+    """Chart inputs shaped like the ones recipe_search builds"""
+    start = date(2024, 1, 1)
+    return [
+        ('bar', {
+            'labels': ['Easy', 'Medium', 'Intermediate', 'Hard'],
+            'values': [12, 30, 25, 8],
+        }, {'title': 'Recipe Difficulty Distribution', 'xlabel': 'Difficulty Level',
+            'ylabel': 'Number of Recipes'}),
+        ('pie', {
+            'labels': ['Quick (<10 min)', 'Medium (10-30 min)', 'Long (30-60 min)', 'Very Long (>60 min)'],
+            'values': [10, 35, 20, 10],
+        }, {'title': 'Recipes by Cooking Time'}),
+        ('line', {
+            'labels': [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)],
+            'values': [i + 1 for i in range(days)],
+        }, {'title': 'Recipe Collection Growth', 'xlabel': 'Date Added', 'ylabel': 'Total Recipes'}),
+    ]
+
+
+def payload_size(chart_format, payload):
+    """Bytes the chart adds to the HTML response"""
+    if chart_format == 'json':
+        payload = json.dumps(payload, separators=(',', ':'))
+    return len(payload.encode('utf-8'))
+
+
+class Command(BaseCommand):
+    help = 'Compare render time and payload size of the search chart backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Renders per chart and format')
+        parser.add_argument('--days', type=int, default=60, help='Points on the growth line chart')
+
+    def handle(self, *args, **options):
+        charts = sample_charts(options['days'])
+        self.stdout.write(f'{"format":<8}{"chart":<8}{"ms/render":>12}{"bytes":>12}')
+        for chart_format in CHART_FORMATS:
+            for chart_type, data, kwargs in charts:
+                start = time.perf_counter()
+                for _ in range(options['repeat']):
+                    payload = render_chart(chart_format, chart_type, data, **kwargs)
+                elapsed = (time.perf_counter() - start) * 1000 / options['repeat']
+                self.stdout.write(
+                    f'{chart_format:<8}{chart_type:<8}{elapsed:>12.2f}'
+                    f'{payload_size(chart_format, payload):>12}'
+                )
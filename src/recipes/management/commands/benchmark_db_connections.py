@@ -0,0 +1,72 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+from ._wsgi import login_cookie, make_requester
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure requests/sec on recipe_list with a new connection per request, '
+        'persistent connections and (PostgreSQL + psycopg 3 only) native pooling. '
+        'Point DATABASE_URL at a local PostgreSQL to see realistic connection costs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per profile')
+
+    def profiles(self):
+        yield 'per-request', {'CONN_MAX_AGE': 0}, False
+        yield 'persistent', {'CONN_MAX_AGE': 600}, False
+        if connection.vendor == 'postgresql':
+            try:
+                import psycopg_pool  # noqa: F401
+            except ImportError:
+                self.stdout.write('pool: skipped (psycopg 3 and psycopg_pool are not installed)')
+            else:
+                yield 'pool', {'CONN_MAX_AGE': 0}, True
+
+    def handle(self, *args, **options):
+        with override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False):
+            cookie = login_cookie('benchmark-user', 'benchmark-password')
+            try:
+                self.run(options['requests'], cookie)
+            finally:
+                User.objects.filter(username='benchmark-user').delete()
+
+    def run(self, count, cookie):
+        get = make_requester(cookie)
+        path = reverse('recipes:list')
+        original = dict(connection.settings_dict)
+        original_options = dict(original.get('OPTIONS', {}))
+
+        def request():
+            # The handler fires request_finished, which closes expired connections
+            get(path)
+
+        self.stdout.write(f'{"profile":<14}{"requests/sec":>14}')
+        for name, overrides, pooled in self.profiles():
+            connection.close()
+            connection.settings_dict.update(overrides)
+            options = dict(original_options)
+            if pooled:
+                options['pool'] = True
+            else:
+                options.pop('pool', None)
+            connection.settings_dict['OPTIONS'] = options
+
+            request()  # warm up
+            start = time.perf_counter()
+            for _ in range(count):
+                request()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'{name:<14}{count / elapsed:>14.1f}')
+
+            connection.close()
+            if pooled:
+                connection.close_pool()
+
+        connection.settings_dict.update(original)
+        connection.settings_dict['OPTIONS'] = original_options
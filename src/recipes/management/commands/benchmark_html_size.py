@@ -0,0 +1,57 @@
+import re
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+from recipes.models import Recipe
+
+STYLESHEET_LINK = re.compile(r'\s*<link rel="stylesheet" href="([^"]+)">')
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare HTML bytes per page with stylesheets linked versus inlined as <style> blocks'
+
+    def handle(self, *args, **options):
+        # Everything runs in a transaction that is rolled back at the end
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False):
+                self.run()
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self):
+        User.objects.create_user(username='benchmark-user', password='benchmark-password')
+        recipe = Recipe.objects.create(name='Benchmark Toast', ingredients='bread, butter', cooking_time=5)
+        pages = {
+            'home': reverse('recipes:home'),
+            'login': reverse('recipes:login'),
+            'signup': reverse('recipes:signup'),
+            'about': reverse('recipes:about'),
+            'list': reverse('recipes:list'),
+            'detail': reverse('recipes:detail', args=[recipe.pk]),
+            'search': reverse('recipes:search'),
+        }
+        client = Client()
+        client.login(username='benchmark-user', password='benchmark-password')
+
+        self.stdout.write(f'{"page":<8}{"inline CSS":>12}{"linked CSS":>12}{"saved":>8}')
+        for name, url in pages.items():
+            html = client.get(url).content.decode('utf-8')
+            linked = len(html.encode('utf-8'))
+            inline = len(STYLESHEET_LINK.sub('', html).encode('utf-8'))
+            for href in STYLESHEET_LINK.findall(html):
+                static_name = href.split(settings.STATIC_URL, 1)[1]
+                path = finders.find(static_name) or staticfiles_storage.path(static_name)
+                with open(path, 'rb') as stylesheet:
+                    inline += len(stylesheet.read())
+            self.stdout.write(f'{name:<8}{inline:>12}{linked:>12}{1 - linked / inline:>8.0%}')
@@ -0,0 +1,62 @@
+import logging
+import time
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from ._cache import private_cache
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure CPU time spent on a burst of failed logins with and without throttling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=200, help='Failed login POSTs per run')
+        parser.add_argument('--usernames', type=int, default=5, help='Usernames the attacker cycles through')
+
+    def handle(self, *args, **options):
+        # Everything runs in a transaction that is rolled back at the end, with a private cache
+        try:
+            with transaction.atomic(), private_cache(), override_settings(
+                ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False,
+            ):
+                self.run(options['attempts'], options['usernames'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, attempts, usernames):
+        names = [f'victim-{index}' for index in range(usernames)]
+        for name in names:
+            User.objects.create_user(username=name, password='the-real-password')
+        url = reverse('recipes:login')
+        # Every throttled attempt would otherwise log a 'Too Many Requests' warning
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        self.stdout.write(f'{attempts} failed logins over {usernames} usernames from one IP')
+        self.stdout.write(f'{"throttling":<12}{"CPU s":>8}{"ms/attempt":>12}{"hashed":>8}{"429s":>6}')
+        for enabled in (False, True):
+            cache.clear()
+            client = Client()
+            rejected = 0
+            with override_settings(LOGIN_RATE_LIMIT_ENABLED=enabled):
+                start = time.process_time()
+                for attempt in range(attempts):
+                    response = client.post(url, {
+                        'username': names[attempt % usernames],
+                        'password': f'guess-{attempt}',
+                    })
+                    rejected += response.status_code == 429
+                elapsed = time.process_time() - start
+            label = 'on' if enabled else 'off'
+            self.stdout.write(
+                f'{label:<12}{elapsed:>8.2f}{elapsed * 1000 / attempts:>12.2f}'
+                f'{attempts - rejected:>8}{rejected:>6}'
+            )
@@ -0,0 +1,64 @@
+import time
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from ._cache import private_cache
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Report login latency and throughput through login_view for each password hashing profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=10, help='Logins per profile')
+        parser.add_argument('--pbkdf2-iterations', type=int, nargs='*',
+                            default=[settings.PASSWORD_PBKDF2_ITERATIONS, 600000, 260000],
+                            help='PBKDF2 iteration counts to compare')
+
+    def profiles(self, iterations):
+        for count in iterations:
+            yield f'pbkdf2 {count}', 'pbkdf2', {'PASSWORD_PBKDF2_ITERATIONS': count}
+        yield 'scrypt', 'scrypt', {}
+        yield 'argon2', 'argon2', {}
+
+    def handle(self, *args, **options):
+        # Everything runs in a transaction that is rolled back at the end, with a private cache
+        try:
+            with transaction.atomic(), private_cache(), override_settings(
+                ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False,
+            ):
+                self.run(options['logins'], options['pbkdf2_iterations'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, logins, iterations):
+        url = reverse('recipes:login')
+        self.stdout.write(f'{"profile":<16}{"ms/login":>10}{"logins/sec":>12}')
+        for name, profile, overrides in self.profiles(iterations):
+            hashers = [settings.PASSWORD_HASHER_CLASSES[profile]] + [
+                hasher for key, hasher in settings.PASSWORD_HASHER_CLASSES.items() if key != profile
+            ]
+            with override_settings(PASSWORD_HASHERS=hashers, **overrides):
+                try:
+                    get_hasher().encode('probe', get_hasher().salt())
+                except (ValueError, AttributeError) as error:
+                    self.stdout.write(f'{name:<16}  skipped ({error})')
+                    continue
+                username = f'benchmark-{name.replace(" ", "-")}'
+                User.objects.create_user(username=username, password='benchmark-password')
+                cache.clear()
+                start = time.perf_counter()
+                for _ in range(logins):
+                    Client().post(url, {'username': username, 'password': 'benchmark-password'})
+                elapsed = time.perf_counter() - start
+            self.stdout.write(f'{name:<16}{elapsed * 1000 / logins:>10.1f}{logins / elapsed:>12.2f}')
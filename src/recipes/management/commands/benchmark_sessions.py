@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from recipes.models import Recipe
+from ._cache import private_cache
+
+PROFILES = {
+    'db': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+    },
+    'cached': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'AUTHENTICATION_BACKENDS': ['recipes.backends.CachedModelBackend'],
+    },
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Count queries per request on recipe_list and recipe_detail for db vs cached sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Requests per view and profile')
+
+    def handle(self, *args, **options):
+        # Everything runs in a transaction that is rolled back at the end, with a private cache
+        try:
+            with transaction.atomic(), private_cache():
+                self.run(options['requests'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, count):
+        User.objects.create_user(username='benchmark-user', password='benchmark-password')
+        recipe = Recipe.objects.create(name='Benchmark Toast', ingredients='bread, butter', cooking_time=5)
+        urls = {
+            'recipe_list': reverse('recipes:list'),
+            'recipe_detail': reverse('recipes:detail', args=[recipe.pk]),
+        }
+
+        self.stdout.write(f'{"profile":<8}{"view":<15}{"queries/request":>16}')
+        for profile, overrides in PROFILES.items():
+            with override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False, **overrides):
+                cache.clear()
+                client = Client()
+                client.login(username='benchmark-user', password='benchmark-password')
+                for name, url in urls.items():
+                    client.get(url)  # warm the caches
+                    with CaptureQueriesContext(connection) as queries:
+                        for _ in range(count):
+                            client.get(url)
+                    self.stdout.write(f'{profile:<8}{name:<15}{len(queries) / count:>16.1f}')
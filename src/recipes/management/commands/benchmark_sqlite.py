@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+from django.test.utils import override_settings
+from django.urls import reverse
+from recipes.models import Recipe
+from ._wsgi import login_cookie, make_requester
+
+
+def reader(cookie, paths, count, results):
+    # Requests that never ran, because the process failed first, count as errors
+    done = errors = 0
+    start = time.perf_counter()
+    try:
+        connection.close()
+        get = make_requester(cookie)
+        for index in range(count):
+            try:
+                get(paths[index % len(paths)])
+            except CommandError:
+                # The handler turns "database is locked" into a 500 response
+                errors += 1
+            done += 1
+    finally:
+        results.put(('read', count, errors + count - done, time.perf_counter() - start))
+
+
+def writer(count, results):
+    done = errors = 0
+    start = time.perf_counter()
+    try:
+        connection.close()
+        for index in range(count):
+            try:
+                Recipe.objects.create(
+                    name=f'Write {os.getpid()}-{index}', ingredients='bread, butter', cooking_time=5
+                )
+            except OperationalError:
+                errors += 1
+            done += 1
+    finally:
+        results.put(('write', count, errors + count - done, time.perf_counter() - start))
+
+
+class Command(BaseCommand):
+    help = 'Concurrent read/write benchmark of recipe views on a scratch SQLite file, default vs tuned pragmas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4, help='Reader processes')
+        parser.add_argument('--writers', type=int, default=2, help='Writer processes')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per reader')
+        parser.add_argument('--writes', type=int, default=100, help='Recipes created per writer')
+        parser.add_argument('--recipes', type=int, default=500, help='Recipes seeded before the run')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark needs an SQLite DATABASES setting')
+
+        original_name = connection.settings_dict['NAME']
+        original_options = connection.settings_dict.get('OPTIONS', {})
+        context = multiprocessing.get_context('fork')
+        self.stdout.write(f'{"profile":<9}{"reads/sec":>11}{"writes/sec":>12}{"read errs":>11}{"write errs":>12}')
+        try:
+            for profile, pragmas, transaction_mode in (
+                ('default', {}, None),
+                ('tuned', settings.SQLITE_TUNED_PRAGMAS, 'IMMEDIATE'),
+            ):
+                with tempfile.TemporaryDirectory() as directory, override_settings(
+                    SQLITE_PRAGMAS=pragmas, ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False,
+                ):
+                    connection.close()
+                    connection.settings_dict['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+                    connection.settings_dict['OPTIONS'] = (
+                        {'transaction_mode': transaction_mode} if transaction_mode else {}
+                    )
+                    self.run(profile, context, options)
+                    connection.close()
+        finally:
+            connection.settings_dict['NAME'] = original_name
+            connection.settings_dict['OPTIONS'] = original_options
+
+    def run(self, profile, context, options):
+        call_command('migrate', verbosity=0)
+        Recipe.objects.bulk_create(
+            Recipe(name=f'Recipe {index}', ingredients='eggs, milk, flour', cooking_time=index % 90,
+                   difficulty='Medium')
+            for index in range(options['recipes'])
+        )
+        cookie = login_cookie('benchmark-user', 'benchmark-password')
+        first = Recipe.objects.order_by('pk').values_list('pk', flat=True).first()
+        paths = [reverse('recipes:list')] + [
+            reverse('recipes:detail', args=[first + offset]) for offset in range(10)
+        ]
+        connection.close()
+
+        results = context.Queue()
+        processes = [
+            context.Process(target=reader, args=(cookie, paths, options['requests'], results))
+            for _ in range(options['readers'])
+        ] + [
+            context.Process(target=writer, args=(options['writes'], results))
+            for _ in range(options['writers'])
+        ]
+        for process in processes:
+            process.start()
+        totals = {'read': [0, 0, 0.0], 'write': [0, 0, 0.0]}
+        for _ in processes:
+            kind, count, errors, elapsed = results.get()
+            totals[kind][0] += count
+            totals[kind][1] += errors
+            totals[kind][2] = max(totals[kind][2], elapsed)
+        for process in processes:
+            process.join()
+
+        reads, read_errors, read_time = totals['read']
+        writes, write_errors, write_time = totals['write']
+        self.stdout.write(
+            f'{profile:<9}{reads / read_time if read_time else 0:>11.1f}'
+            f'{writes / write_time if write_time else 0:>12.1f}{read_errors:>11}{write_errors:>12}'
+        )
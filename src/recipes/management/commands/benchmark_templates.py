@@ -0,0 +1,62 @@
+import time
+from django.core.management.base import BaseCommand
+from django.template import Context, Engine, engines
+from recipes.models import Recipe
+from recipes.views import with_detail_urls
+
+# The card loop as it was before detail URLs were precomputed
+URL_TAG_CARDS = """{% for recipe in recipes %}
+    <a href="{% url 'recipes:detail' recipe.pk %}" class="recipe-card">
+        {% if recipe.pic %}
+            <img src="{{ recipe.pic.url }}" alt="{{ recipe.name }}" class="recipe-image">
+        {% else %}
+            <div class="recipe-image"></div>
+        {% endif %}
+        <div class="recipe-content">
+            <h2 class="recipe-title">{{ recipe.name }}</h2>
+            <div class="recipe-meta">
+                <span class="meta-item">⏱️ {{ recipe.cooking_time }} min</span>
+                <span class="meta-item">🥘 {{ recipe.get_ingredients_list|length }} ingredients</span>
+            </div>
+            <span class="difficulty {{ recipe.difficulty }}">{{ recipe.difficulty }}</span>
+        </div>
+    </a>
+{% endfor %}
+"""
+
+APP_DIRECTORIES = 'django.template.loaders.app_directories.Loader'
+URL_TAG_OVERRIDE = ('django.template.loaders.locmem.Loader', {'recipes/_recipe_cards.html': URL_TAG_CARDS})
+CACHED = 'django.template.loaders.cached.Loader'
+
+PROFILES = {
+    'uncached loader, {% url %} per card': [URL_TAG_OVERRIDE, APP_DIRECTORIES],
+    'cached loader, {% url %} per card': [(CACHED, [URL_TAG_OVERRIDE, APP_DIRECTORIES])],
+    'cached loader, precomputed URLs': [(CACHED, [APP_DIRECTORIES])],
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request render time of recipe_list.html with many recipe cards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=1000, help='Recipe cards on the page')
+        parser.add_argument('--repeat', type=int, default=20, help='Renders per profile')
+
+    def handle(self, *args, **options):
+        recipes = [
+            Recipe(pk=index + 1, name=f'Recipe {index}', ingredients='eggs, milk, flour, butter',
+                   cooking_time=index % 90, difficulty='Medium')
+            for index in range(options['cards'])
+        ]
+        libraries = engines['django'].engine.libraries
+
+        self.stdout.write(f'{options["cards"]} cards, {options["repeat"]} renders per profile')
+        for name, loaders in PROFILES.items():
+            engine = Engine(loaders=loaders, libraries=libraries)
+            engine.get_template('recipes/recipe_list.html')  # first load is not per-request
+            start = time.perf_counter()
+            for _ in range(options['repeat']):
+                template = engine.get_template('recipes/recipe_list.html')
+                template.render(Context({'recipes': list(with_detail_urls(recipes))}))
+            elapsed = (time.perf_counter() - start) * 1000 / options['repeat']
+            self.stdout.write(f'{name:<40}{elapsed:>10.2f} ms/render')
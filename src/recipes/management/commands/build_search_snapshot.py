@@ -0,0 +1,23 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from recipes.snapshot import build_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Write the memory-mapped search snapshot that workers load from SEARCH_SNAPSHOT_PATH'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=settings.SEARCH_SNAPSHOT_PATH,
+            help='Snapshot file to write (defaults to SEARCH_SNAPSHOT_PATH)'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path:
+            raise CommandError('Set SEARCH_SNAPSHOT_PATH or pass --path')
+        terms, postings = build_snapshot(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {path}: {terms} term(s), {postings} posting(s), {os.path.getsize(path)} bytes'
+        ))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from recipes.similarity import build_similarity_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the RecipeSimilarity neighbour table from scratch'
+
+    def handle(self, *args, **options):
+        rows = build_similarity_index()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt recipe similarity index: {rows} neighbour(s)'))
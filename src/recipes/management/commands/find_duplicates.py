@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recipes.duplicates import FIELDS, find_duplicate_clusters, merge_cluster
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Report clusters of near-duplicate recipes (MinHash/LSH over name, ingredients and description), optionally merging them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold', type=float, default=settings.RECIPE_DUPLICATE_THRESHOLD,
+            help='Shingle Jaccard similarity at which two recipes are duplicates'
+        )
+        parser.add_argument(
+            '--merge', action='store_true',
+            help='Keep the oldest recipe of every cluster and delete the others'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.only(*FIELDS).iterator(chunk_size=1000)
+        clusters = find_duplicate_clusters(recipes, options['threshold'])
+        if not clusters:
+            self.stdout.write(self.style.SUCCESS('No duplicate recipes found'))
+            return
+
+        names = dict(
+            Recipe.objects.filter(pk__in=[pk for cluster in clusters for pk in cluster])
+            .values_list('pk', 'name')
+        )
+        for cluster in clusters:
+            keep, duplicates = cluster[0], cluster[1:]
+            self.stdout.write(f'#{keep} {names[keep]}')
+            for pk in duplicates:
+                self.stdout.write(f'    duplicate #{pk} {names[pk]}')
+
+        duplicate_count = sum(len(cluster) - 1 for cluster in clusters)
+        if options['merge']:
+            for cluster in clusters:
+                merge_cluster(cluster)
+            self.stdout.write(self.style.SUCCESS(
+                f'Merged {len(clusters)} cluster(s), deleted {duplicate_count} duplicate recipe(s)'
+            ))
+        else:
+            self.stdout.write(
+                f'{len(clusters)} cluster(s), {duplicate_count} duplicate recipe(s); run with --merge to remove them'
+            )
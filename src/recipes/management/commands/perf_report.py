@@ -0,0 +1,53 @@
+import glob
+import os
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from recipes.profiling import safe_view_name, view_of_profile
+
+
+class Command(BaseCommand):
+    help = 'Summarise the hottest functions per view in the profiles written by SamplingProfilerMiddleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.PROFILE_DIR, help='Directory holding the profiles')
+        parser.add_argument('--limit', type=int, default=15, help='Functions to show per view')
+        parser.add_argument('--view', help='Only report this view (e.g. recipes:recipe_search)')
+
+    def handle(self, *args, **options):
+        paths = sorted(glob.glob(os.path.join(options['dir'], '*.collapsed')))
+        if not paths:
+            raise CommandError(f'No profiles in {options["dir"]}')
+
+        views = defaultdict(lambda: {'profiles': 0, 'samples': 0, 'self': Counter(), 'total': Counter()})
+        for path in paths:
+            view = view_of_profile(path)
+            if options['view'] and view != safe_view_name(options['view']):
+                continue
+            report = views[view]
+            report['profiles'] += 1
+            with open(path, encoding='utf-8') as handle:
+                for line in handle:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    if not stack:
+                        continue
+                    count = int(count)
+                    frames = stack.split(';')
+                    report['samples'] += count
+                    report['self'][frames[-1]] += count
+                    # Recursive functions count once per sample
+                    for label in set(frames):
+                        report['total'][label] += count
+
+        if not views:
+            raise CommandError(f'No profiles of {options["view"]} in {options["dir"]}')
+        for view, report in sorted(views.items(), key=lambda item: -item[1]['samples']):
+            samples = report['samples']
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{view}: {report["profiles"]} profile(s), {samples} sample(s)'
+            ))
+            self.stdout.write(f'  {"self":>6} {"total":>6}  function')
+            for label, count in report['self'].most_common(options['limit']):
+                self.stdout.write(
+                    f'  {count / samples:6.1%} {report["total"][label] / samples:6.1%}  {label}'
+                )
@@ -0,0 +1,32 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from recipes.models import RecipeDeletion, RecipeDeletionPrune
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than RECIPE_DELETION_LOG_DAYS (clients with older cursors must re-sync)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.RECIPE_DELETION_LOG_DAYS,
+            help='Keep tombstones from this many days'
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        stale = RecipeDeletion.objects.filter(deleted_at__lt=now - timedelta(days=options['days']))
+        with transaction.atomic():
+            # Recorded before deleting, so the feed can tell which cursors have gone stale
+            through = stale.aggregate(last=Max('id'))['last']
+            deleted = 0
+            if through is not None:
+                marker, _ = RecipeDeletionPrune.objects.select_for_update().get_or_create(pk=1)
+                marker.pruned_through = max(marker.pruned_through, through)
+                marker.pruned_at = now
+                marker.save()
+                deleted, _ = RecipeDeletion.objects.filter(pk__lte=through).delete()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} tombstone(s)'))
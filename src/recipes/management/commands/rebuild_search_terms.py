@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from recipes.search import rebuild_search_terms, rebuild_search_trigrams
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the RecipeSearchTerm word index and its SearchTrigram index from scratch'
+
+    def handle(self, *args, **options):
+        rows = rebuild_search_terms()
+        trigrams = rebuild_search_trigrams()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt recipe search terms: {rows} term(s), {trigrams} trigram(s)'
+        ))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from recipes.stats import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the RecipeDailyStats rollup table from scratch'
+
+    def handle(self, *args, **options):
+        rows = rebuild_daily_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt recipe statistics: {rows} day(s)'))
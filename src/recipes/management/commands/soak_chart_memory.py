@@ -0,0 +1,117 @@
+import gc
+import tracemalloc
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from matplotlib.figure import Figure
+from recipes.models import Recipe
+from recipes.memory import allocation_sites, resident_memory
+from recipes.views import CHART_FORMATS
+from ._cache import private_cache
+
+
+class Rollback(Exception):
+    pass
+
+
+def live_figures():
+    """Number of matplotlib figures still alive in this process"""
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, Figure))
+
+
+def settled_rss():
+    """Resident set size in bytes after a full garbage collection"""
+    gc.collect()
+    current, peak = resident_memory()
+    return current if current is not None else peak
+
+
+class Command(BaseCommand):
+    help = 'Run many charted searches and fail if resident memory or live matplotlib figures keep growing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Charted searches to run')
+        parser.add_argument('--warmup', type=int, default=20, help='Searches run before the baseline is taken')
+        parser.add_argument('--max-growth-mb', type=int, default=32, help='Allowed RSS growth after warm-up')
+        parser.add_argument('--format', choices=CHART_FORMATS, default='png', help='Chart format to request')
+        parser.add_argument(
+            '--trace', action='store_true',
+            help='Also trace allocations and list the lines that grew (several times slower)'
+        )
+
+    def handle(self, *args, **options):
+        if settled_rss() is None:
+            raise CommandError('Resident memory cannot be measured on this platform')
+        started = options['trace'] and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(settings.MEMORY_TRACKING_FRAMES)
+        # Everything runs in a transaction that is rolled back at the end, with a private cache
+        try:
+            with transaction.atomic(), private_cache():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            if started:
+                tracemalloc.stop()
+
+    def run(self, options):
+        User.objects.create_user(username='soak-user', password='soak-password')
+        for i in range(40):
+            Recipe.objects.create(
+                name=f'Soak Recipe {i}', ingredients=', '.join(f'item{j}' for j in range(i % 6 + 1)),
+                cooking_time=5 + i * 3,
+            )
+
+        with override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False):
+            client = Client()
+            client.login(username='soak-user', password='soak-password')
+            url = reverse('recipes:search')
+            params = {'show_chart': 'on', 'chart_format': options['format']}
+
+            def search(count):
+                for _ in range(count):
+                    # Charts and facet counts are cached; clear them so every search renders
+                    cache.clear()
+                    response = client.get(url, params)
+                    if response.status_code != 200:
+                        raise CommandError(f'Search returned {response.status_code}')
+                    reset_queries()
+
+            search(options['warmup'])
+            # The snapshot is taken first so its own memory is part of the baseline
+            before = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+            baseline = settled_rss()
+            baseline_figures = live_figures()
+
+            step = max(options['requests'] // 10, 1)
+            done = 0
+            self.stdout.write(f'{"searches":>10}{"RSS MB":>10}{"growth MB":>12}')
+            while done < options['requests']:
+                count = min(step, options['requests'] - done)
+                search(count)
+                done += count
+                current = settled_rss()
+                self.stdout.write(f'{done:>10}{current / 2**20:>10.1f}{(current - baseline) / 2**20:>12.1f}')
+
+            growth = settled_rss() - baseline
+            figures = live_figures() - baseline_figures
+            self.stdout.write(f'Live matplotlib figures: {figures:+d}')
+            if before is not None:
+                self.stdout.write('Allocations still held, by line:')
+                for site, size in allocation_sites(before, tracemalloc.take_snapshot()).most_common(10):
+                    self.stdout.write(f'  {size / 1024:>10.1f} KB  {site}')
+            if growth > options['max_growth_mb'] * 2**20 or figures > 0:
+                raise CommandError(
+                    f'Memory grew by {growth / 2**20:.1f} MB and {figures} figure(s) over {done} searches '
+                    f'(limit {options["max_growth_mb"]} MB)'
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f'Memory stayed bounded: {growth / 2**20:+.1f} MB over {done} searches'
+            ))
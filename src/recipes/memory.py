@@ -0,0 +1,162 @@
+import os
+import random
+import threading
+import tracemalloc
+from collections import Counter
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Allocations made by tracemalloc itself are left out of snapshots
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+_lock = threading.Lock()
+_views = {}
+
+
+def short_path(filename):
+    """A source path relative to the project or to site-packages"""
+    project = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(project):
+        return filename[len(project):]
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return filename
+
+
+def site_label(traceback):
+    """
+    'file:line' of the allocating frame, plus the project line that led to
+    it when the allocation happened inside a library (pandas, matplotlib).
+    """
+    innermost = traceback[-1]
+    label = f'{short_path(innermost.filename)}:{innermost.lineno}'
+    project = str(settings.BASE_DIR) + os.sep
+    for frame in reversed(traceback):
+        if frame.filename.startswith(project):
+            if frame is not innermost:
+                label += f' via {short_path(frame.filename)}:{frame.lineno}'
+            break
+    return label
+
+
+def allocation_sites(before, after):
+    """{site: bytes} of memory allocated between two snapshots and still held at the second"""
+    stats = after.filter_traces(SNAPSHOT_FILTERS).compare_to(
+        before.filter_traces(SNAPSHOT_FILTERS), 'traceback'
+    )
+    sites = Counter()
+    for stat in stats:
+        if stat.size_diff > 0:
+            sites[site_label(stat.traceback)] += stat.size_diff
+    return sites
+
+
+def record_request(view_name, peak, retained, sites=None):
+    """Add one request's peak and retained allocation (and its allocation sites) to its view"""
+    with _lock:
+        stats = _views.setdefault(view_name, {
+            'requests': 0, 'peak_max': 0, 'peak_total': 0, 'retained_total': 0, 'sites': Counter(),
+        })
+        stats['requests'] += 1
+        stats['peak_max'] = max(stats['peak_max'], peak)
+        stats['peak_total'] += peak
+        stats['retained_total'] += retained
+        if sites:
+            stats['sites'].update(sites)
+            # Keep a bounded number of sites so the tracker does not grow itself
+            stats['sites'] = Counter(dict(stats['sites'].most_common(settings.MEMORY_TRACKING_TOP * 5)))
+
+
+def reset_memory_stats():
+    """Forget the allocation statistics collected so far"""
+    with _lock:
+        _views.clear()
+
+
+def resident_memory():
+    """(current, peak) resident set size of this process in bytes; None where unknown"""
+    current = peak = None
+    try:
+        with open('/proc/self/statm') as handle:
+            current = int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return current, peak
+
+
+def memory_report():
+    """JSON-ready allocation statistics of this worker process, views with the highest peak first"""
+    current_rss, peak_rss = resident_memory()
+    report = {
+        'pid': os.getpid(),
+        'tracing': tracemalloc.is_tracing(),
+        'traced_bytes': tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None,
+        'rss_bytes': current_rss,
+        'max_rss_bytes': peak_rss,
+        'views': {},
+    }
+    with _lock:
+        views = sorted(_views.items(), key=lambda item: -item[1]['peak_max'])
+        for view_name, stats in views:
+            report['views'][view_name] = {
+                'requests': stats['requests'],
+                'peak_max_bytes': stats['peak_max'],
+                'peak_mean_bytes': stats['peak_total'] // stats['requests'],
+                'retained_mean_bytes': stats['retained_total'] // stats['requests'],
+                'top_sites': [
+                    {'site': site, 'bytes': size}
+                    for site, size in stats['sites'].most_common(settings.MEMORY_TRACKING_TOP)
+                ],
+            }
+    return report
+
+
+class MemoryTrackingMiddleware:
+    """
+    Record each request's peak and retained Python allocation per view with tracemalloc.
+
+    Enabled with MEMORY_TRACKING. A MEMORY_TRACKING_SNAPSHOT_RATE fraction
+    of requests also compares tracemalloc snapshots to find the lines whose
+    allocations outlive the request. tracemalloc counts the whole process,
+    so run the worker with a single thread while tracking. Staff can read
+    the results at the memory diagnostics endpoint.
+    """
+
+    def __init__(self, get_response):
+        if not settings.MEMORY_TRACKING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(settings.MEMORY_TRACKING_FRAMES)
+
+    def __call__(self, request):
+        if not tracemalloc.is_tracing():
+            return self.get_response(request)
+
+        before = None
+        if random.random() < settings.MEMORY_TRACKING_SNAPSHOT_RATE:
+            before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        start_size = tracemalloc.get_traced_memory()[0]
+        response = self.get_response(request)
+        size, peak = tracemalloc.get_traced_memory()
+
+        sites = None
+        if before is not None:
+            sites = allocation_sites(before, tracemalloc.take_snapshot())
+        match = request.resolver_match
+        record_request(match.view_name if match else 'unresolved', peak - start_size, size - start_size, sites)
+        return response
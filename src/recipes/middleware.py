@@ -0,0 +1,132 @@
+import re
+import secrets
+import struct
+import zlib
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import get_random_string
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ACCEPT_ENCODING_ITEM = re.compile(r'([a-z*]+)\s*(?:;\s*q=([0-9.]+))?', re.I)
+
+
+def negotiate_encoding(accept_encoding, allow_brotli=True):
+    """Pick 'br' or 'gzip' from an Accept-Encoding header, or None"""
+    accepted = set()
+    for item in accept_encoding.split(','):
+        match = ACCEPT_ENCODING_ITEM.match(item.strip())
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2) or 1)
+        except ValueError:
+            continue
+        if quality > 0:
+            accepted.add(match.group(1).lower())
+    if brotli is not None and allow_brotli and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def gzip_stream(chunks, max_random_bytes=0):
+    """
+    Gzip a stream, flushing after every chunk so each one reaches the client.
+
+    Like compress_string(), the header carries a random-length file name
+    against BREACH when max_random_bytes is set.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    header = bytearray(b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff')
+    if max_random_bytes:
+        header[3] = 0x08  # FNAME
+        header += get_random_string(secrets.randbelow(max_random_bytes) + 1).encode() + b'\x00'
+    yield bytes(header)
+    crc = size = 0
+    for chunk in chunks:
+        crc = zlib.crc32(chunk, crc)
+        size += len(chunk)
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush() + struct.pack('<II', crc, size & 0xffffffff)
+
+
+def brotli_stream(chunks, quality):
+    """Brotli-compress a stream, flushing after every chunk"""
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in chunks:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with Brotli or gzip, whichever the client prefers
+    (HTML is always gzipped, see below).
+
+    Works like Django's GZipMiddleware, with two differences: responses
+    smaller than RESPONSE_COMPRESSION_MIN_SIZE are left alone, and streamed
+    responses are flushed chunk by chunk so early chunks are not held back
+    in the compressor.
+    """
+
+    # Random gzip header padding against BREACH, as in GZipMiddleware
+    max_random_bytes = 100
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.RESPONSE_COMPRESSION_MIN_SIZE:
+            return response
+
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        # Brotli has no header field to pad like gzip's, so HTML, the kind of
+        # page BREACH goes after, is only ever gzipped with random padding
+        html = response.get('Content-Type', '').startswith('text/html')
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), allow_brotli=not html)
+        if encoding is None or (response.streaming and response.is_async):
+            return response
+
+        if response.streaming:
+            if encoding == 'br':
+                response.streaming_content = brotli_stream(
+                    response.streaming_content, settings.RESPONSE_BROTLI_QUALITY
+                )
+            else:
+                response.streaming_content = gzip_stream(response.streaming_content, self.max_random_bytes)
+            # We won't know the compressed size until we stream it
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed_content = brotli.compress(
+                    response.content, quality=settings.RESPONSE_BROTLI_QUALITY
+                )
+            else:
+                compressed_content = compress_string(
+                    response.content, max_random_bytes=self.max_random_bytes
+                )
+            # Return the compressed content only if it's actually shorter
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+
+        # A strong ETag no longer matches the encoded bytes
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+
+        return response
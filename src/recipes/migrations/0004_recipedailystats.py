@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:28
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+
+# A copy of the rollup as it was when this migration was written, so later
+# changes to recipes.stats cannot change what replaying it does
+DIFFICULTY_FIELDS = {
+    'Easy': 'easy_count',
+    'Medium': 'medium_count',
+    'Intermediate': 'intermediate_count',
+    'Hard': 'hard_count',
+}
+
+
+def populate_daily_stats(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeDailyStats = apps.get_model('recipes', 'RecipeDailyStats')
+    aggregates = {'recipe_count': Count('pk')}
+    for difficulty, field in DIFFICULTY_FIELDS.items():
+        aggregates[field] = Count('pk', filter=Q(difficulty=difficulty))
+    days = (
+        Recipe.objects.annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(**aggregates)
+        .order_by('day')
+    )
+    rows = []
+    running_total = 0
+    for day in days:
+        running_total += day['recipe_count']
+        rows.append(RecipeDailyStats(
+            date=day['day'],
+            cumulative_total=running_total,
+            **{key: day[key] for key in aggregates}
+        ))
+    RecipeDailyStats.objects.bulk_create(rows)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_remove_recipeingredient_ingredient_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('recipe_count', models.IntegerField(default=0, help_text='Recipes added on this day')),
+                ('cumulative_total', models.IntegerField(default=0, help_text='Recipes added up to and including this day')),
+                ('easy_count', models.IntegerField(default=0)),
+                ('medium_count', models.IntegerField(default=0)),
+                ('intermediate_count', models.IntegerField(default=0)),
+                ('hard_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'recipe daily stats',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.RunPython(populate_daily_stats, migrations.RunPython.noop),
+    ]
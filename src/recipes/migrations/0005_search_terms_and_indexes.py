@@ -0,0 +1,71 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:53
+
+import re
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# A copy of the indexing rules as they were when this migration was written,
+# so later changes to recipes.search cannot change what replaying it does
+WORD = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    return list(dict.fromkeys(word.lower() for word in WORD.findall(text or '')))
+
+
+def populate_search_terms(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeSearchTerm = apps.get_model('recipes', 'RecipeSearchTerm')
+    max_length = RecipeSearchTerm._meta.get_field('term').max_length
+    rows = []
+    for recipe in Recipe.objects.only('pk', 'name', 'ingredients').iterator(chunk_size=1000):
+        for field, text in (('name', recipe.name), ('ingredient', recipe.ingredients)):
+            rows.extend(
+                RecipeSearchTerm(recipe_id=recipe.pk, field=field, term=word[:max_length])
+                for word in tokenize(text)
+            )
+    RecipeSearchTerm.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipedailystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('name', 'Name'), ('ingredient', 'Ingredient')], max_length=20)),
+                ('term', models.CharField(max_length=120)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['difficulty'], name='recipes_rec_difficu_33131c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cooking_time'], name='recipes_rec_cooking_bf57fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['created_at'], name='recipes_rec_created_a55f59_idx'),
+        ),
+        migrations.AddField(
+            model_name='recipesearchterm',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='recipes.recipe'),
+        ),
+        migrations.AddIndex(
+            model_name='recipesearchterm',
+            index=models.Index(fields=['term', 'field'], name='recipes_rec_term_f7b03d_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipesearchterm',
+            constraint=models.UniqueConstraint(fields=('recipe', 'field', 'term'), name='unique_recipe_search_term'),
+        ),
+        migrations.RunPython(populate_search_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:56
+
+import heapq
+import math
+from collections import defaultdict
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# A copy of the scoring as it was when this migration was written, so later
+# changes to recipes.similarity cannot change what replaying it does
+def ingredient_set(recipe):
+    items = (' '.join(item.lower().split()) for item in recipe.ingredients.split(','))
+    return frozenset(item for item in items if item)
+
+
+def similarity(first, second, first_ingredients, second_ingredients):
+    shared = len(first_ingredients & second_ingredients)
+    if not shared:
+        return 0.0
+    cosine = shared / math.sqrt(len(first_ingredients) * len(second_ingredients))
+    longest = max(first.cooking_time, second.cooking_time, 1)
+    time_closeness = 1 - min(abs(first.cooking_time - second.cooking_time) / longest, 1)
+    same_difficulty = 1.0 if first.difficulty == second.difficulty else 0.0
+    return 0.8 * cosine + 0.1 * time_closeness + 0.1 * same_difficulty
+
+
+def populate_similarity(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeSimilarity = apps.get_model('recipes', 'RecipeSimilarity')
+    recipes = {}
+    ingredients = {}
+    postings = defaultdict(list)
+    for recipe in Recipe.objects.only('pk', 'ingredients', 'cooking_time', 'difficulty').iterator(chunk_size=1000):
+        recipes[recipe.pk] = recipe
+        ingredients[recipe.pk] = ingredient_set(recipe)
+        for ingredient in ingredients[recipe.pk]:
+            postings[ingredient].append(recipe.pk)
+    rows = []
+    for pk, recipe in recipes.items():
+        candidates = {other for ingredient in ingredients[pk] for other in postings[ingredient]}
+        candidates.discard(pk)
+        scored = [
+            (similarity(recipe, recipes[other], ingredients[pk], ingredients[other]), other)
+            for other in candidates
+        ]
+        rows.extend(
+            RecipeSimilarity(recipe_id=pk, similar_id=similar_id, score=score, rank=rank)
+            for rank, (score, similar_id) in enumerate(heapq.nlargest(settings.RECIPE_SIMILAR_COUNT, scored), start=1)
+        )
+    RecipeSimilarity.objects.bulk_create(rows, batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_search_terms_and_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='recipes.recipe')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='recipes.recipe')),
+            ],
+            options={
+                'verbose_name_plural': 'recipe similarities',
+                'ordering': ['recipe', 'rank'],
+                'indexes': [models.Index(fields=['recipe', 'rank'], name='recipes_rec_recipe__bbf7bc_idx')],
+                'constraints': [models.UniqueConstraint(fields=('recipe', 'similar'), name='unique_recipe_similarity')],
+            },
+        ),
+        migrations.RunPython(populate_similarity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+def trigrams(word):
+    # A copy of recipes.search.trigrams as it was when this migration was written
+    padded = f'  {word} '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def populate_trigrams(apps, schema_editor):
+    RecipeSearchTerm = apps.get_model('recipes', 'RecipeSearchTerm')
+    SearchTrigram = apps.get_model('recipes', 'SearchTrigram')
+    terms = RecipeSearchTerm.objects.values_list('term', flat=True).distinct()
+    SearchTrigram.objects.bulk_create(
+        [SearchTrigram(trigram=trigram, term=term) for term in set(terms) for trigram in trigrams(term)],
+        batch_size=1000, ignore_conflicts=True,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipesimilarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('term', models.CharField(max_length=120)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('trigram', 'term'), name='unique_search_trigram')],
+            },
+        ),
+        migrations.RunPython(populate_trigrams, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:02
+
+import hashlib
+import re
+import zlib
+import django.db.models.deletion
+import numpy as np
+from django.db import migrations, models
+
+
+# A copy of the MinHash/LSH hashing as it was when this migration was written,
+# so later changes to recipes.duplicates cannot change what replaying it does
+WORD = re.compile(r'[^\W_]+')
+SHINGLE_SIZE = 3
+BANDS = 16
+ROWS_PER_BAND = 4
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def shingles(recipe):
+    text = ' '.join([recipe.name, recipe.ingredients, recipe.description])
+    words = list(dict.fromkeys(word.lower() for word in WORD.findall(text)))
+    if len(words) <= SHINGLE_SIZE:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = [' '.join(words[index:index + SHINGLE_SIZE]) for index in range(len(words) - SHINGLE_SIZE + 1)]
+    return {zlib.crc32(gram.encode()) for gram in grams}
+
+
+def band_buckets(shingle_set, hash_a, hash_b):
+    values = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+    signature = ((hash_a[:, None] * values[None, :] + hash_b[:, None]) % MERSENNE_PRIME).min(axis=1)
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(rows.tobytes(), digest_size=8).digest()
+        yield band, int.from_bytes(digest, 'big', signed=True)
+
+
+def populate_signature_bands(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeSignatureBand = apps.get_model('recipes', 'RecipeSignatureBand')
+    random = np.random.default_rng(20240611)
+    hash_a = random.integers(1, MERSENNE_PRIME, BANDS * ROWS_PER_BAND, dtype=np.uint64)
+    hash_b = random.integers(0, MERSENNE_PRIME, BANDS * ROWS_PER_BAND, dtype=np.uint64)
+    rows = []
+    for recipe in Recipe.objects.only('pk', 'name', 'ingredients', 'description').iterator(chunk_size=1000):
+        shingle_set = shingles(recipe)
+        if shingle_set:
+            rows.extend(
+                RecipeSignatureBand(recipe_id=recipe.pk, band=band, bucket=bucket)
+                for band, bucket in band_buckets(shingle_set, hash_a, hash_b)
+            )
+    RecipeSignatureBand.objects.bulk_create(rows, batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_searchtrigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Likely duplicate found when the recipe was saved', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='recipes.recipe'),
+        ),
+        migrations.CreateModel(
+            name='RecipeSignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_bands', to='recipes.recipe')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['band', 'bucket'], name='recipes_rec_band_90f39e_idx')],
+            },
+        ),
+        migrations.RunPython(populate_signature_bands, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_sync_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeDeletionPrune',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pruned_through', models.BigIntegerField(default=0)),
+                ('pruned_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
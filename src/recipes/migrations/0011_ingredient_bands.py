@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:48
+
+import hashlib
+import zlib
+import django.db.models.deletion
+import numpy as np
+from django.db import migrations, models
+
+
+# A copy of the ingredient hashing as it was when this migration was written,
+# so later changes to recipes.similarity cannot change what replaying it does
+BANDS = 16
+ROWS_PER_BAND = 2
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def ingredient_buckets(ingredients, hash_a, hash_b):
+    values = np.fromiter((zlib.crc32(item.encode()) for item in ingredients), dtype=np.uint64, count=len(ingredients))
+    signature = ((hash_a[:, None] * values[None, :] + hash_b[:, None]) % MERSENNE_PRIME).min(axis=1)
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(rows.tobytes(), digest_size=8).digest()
+        yield band, int.from_bytes(digest, 'big', signed=True)
+
+
+def populate_ingredient_bands(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredientBand = apps.get_model('recipes', 'RecipeIngredientBand')
+    random = np.random.default_rng(20240611)
+    hash_a = random.integers(1, MERSENNE_PRIME, BANDS * ROWS_PER_BAND, dtype=np.uint64)
+    hash_b = random.integers(0, MERSENNE_PRIME, BANDS * ROWS_PER_BAND, dtype=np.uint64)
+    rows = []
+    for recipe in Recipe.objects.only('pk', 'ingredients').iterator(chunk_size=1000):
+        items = (' '.join(item.lower().split()) for item in recipe.ingredients.split(','))
+        ingredients = {item for item in items if item}
+        if ingredients:
+            rows.extend(
+                RecipeIngredientBand(recipe_id=recipe.pk, band=band, bucket=bucket)
+                for band, bucket in ingredient_buckets(ingredients, hash_a, hash_b)
+            )
+    RecipeIngredientBand.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_deletion_prune_marker'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeIngredientBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingredient_bands', to='recipes.recipe')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket'], name='recipes_rec_bucket_e0cd7f_idx')],
+            },
+        ),
+        migrations.RunPython(populate_ingredient_bands, migrations.RunPython.noop),
+    ]
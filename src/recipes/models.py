@@ -7,9 +7,22 @@ class Recipe(models.Model):
     difficulty = models.CharField(max_length=20, blank=True, editable=False)
     description = models.TextField(default='', help_text="Cooking instructions")
     pic = models.ImageField(upload_to='recipes/', blank=True, null=True)
+    duplicate_of = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='+', help_text="Likely duplicate found when the recipe was saved"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['difficulty']),
+            models.Index(fields=['cooking_time']),
+            models.Index(fields=['created_at']),
+            # Keyset order of the sync feed (recipes/api.py)
+            models.Index(fields=['updated_at', 'id']),
+        ]
+    
     def __str__(self):
         return self.name
     
@@ -35,4 +48,132 @@ class Recipe(models.Model):
     
     def get_ingredients_list(self):
         """Return ingredients as a list"""
-        return [i.strip() for i in self.ingredients.split(',') if i.strip()]
\ No newline at end of file
+        return [i.strip() for i in self.ingredients.split(',') if i.strip()]
+
+class RecipeDailyStats(models.Model):
+    """Per-day rollup of the recipe catalogue, kept current by Recipe signals"""
+    date = models.DateField(unique=True)
+    recipe_count = models.IntegerField(default=0, help_text="Recipes added on this day")
+    cumulative_total = models.IntegerField(default=0, help_text="Recipes added up to and including this day")
+    easy_count = models.IntegerField(default=0)
+    medium_count = models.IntegerField(default=0)
+    intermediate_count = models.IntegerField(default=0)
+    hard_count = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['date']
+        verbose_name_plural = 'recipe daily stats'
+    
+    def __str__(self):
+        return f'{self.date}: {self.recipe_count} added, {self.cumulative_total} total'
+
+
+class RecipeSearchTerm(models.Model):
+    """Word index over recipe names and ingredients, kept current by Recipe signals"""
+    NAME = 'name'
+    INGREDIENT = 'ingredient'
+    FIELD_CHOICES = [
+        (NAME, 'Name'),
+        (INGREDIENT, 'Ingredient'),
+    ]
+    
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='search_terms')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    term = models.CharField(max_length=120)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'field', 'term'], name='unique_recipe_search_term'),
+        ]
+        indexes = [
+            models.Index(fields=['term', 'field']),
+        ]
+    
+    def __str__(self):
+        return f'{self.term} ({self.field})'
+
+
+class RecipeSimilarity(models.Model):
+    """Precomputed nearest neighbours of a recipe, best first"""
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='similarities')
+    similar = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='similar_to')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        ordering = ['recipe', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'similar'], name='unique_recipe_similarity'),
+        ]
+        indexes = [
+            models.Index(fields=['recipe', 'rank']),
+        ]
+        verbose_name_plural = 'recipe similarities'
+    
+    def __str__(self):
+        return f'{self.recipe_id} ~ {self.similar_id} ({self.score:.2f})'
+
+
+class SearchTrigram(models.Model):
+    """Character trigrams of every indexed search word, for typo-tolerant lookups"""
+    trigram = models.CharField(max_length=3)
+    term = models.CharField(max_length=120)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['trigram', 'term'], name='unique_search_trigram'),
+        ]
+    
+    def __str__(self):
+        return f'{self.trigram!r} in {self.term}'
+
+
+class RecipeSignatureBand(models.Model):
+    """MinHash LSH bucket of one recipe in one band, for save-time duplicate checks"""
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='signature_bands')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['band', 'bucket']),
+        ]
+    
+    def __str__(self):
+        return f'{self.recipe_id}: band {self.band} bucket {self.bucket}'
+
+
+class RecipeIngredientBand(models.Model):
+    """MinHash LSH bucket of one recipe's ingredient set in one band, for finding similar recipes"""
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='ingredient_bands')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['bucket']),
+        ]
+    
+    def __str__(self):
+        return f'{self.recipe_id}: band {self.band} bucket {self.bucket}'
+
+
+class RecipeDeletion(models.Model):
+    """Tombstone of a deleted recipe, so syncing clients can drop their copy"""
+    recipe_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        ordering = ['id']
+    
+    def __str__(self):
+        return f'Recipe {self.recipe_id} deleted at {self.deleted_at}'
+
+
+class RecipeDeletionPrune(models.Model):
+    """How far the tombstone log has been pruned; a single row written by prune_deletions"""
+    pruned_through = models.BigIntegerField(default=0)
+    pruned_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f'Tombstones pruned through {self.pruned_through}'
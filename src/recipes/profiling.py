@@ -0,0 +1,171 @@
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+
+def frame_label(frame):
+    """'module.function' name of a stack frame"""
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    # Semicolons separate frames in the collapsed format
+    return f'{module}.{getattr(code, "co_qualname", code.co_name)}'.replace(';', ':')
+
+
+def collapse(frame):
+    """A stack as 'outermost;...;innermost' frame labels"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class Sampler:
+    """
+    Statistical profiler for the threads serving profiled requests.
+
+    One background thread per process wakes every `interval` seconds and
+    records the current stack of each profiled thread. The profiled code is
+    not traced at all, so the overhead stays small and does not depend on
+    how many function calls the request makes. The thread stops itself
+    when no request is being profiled.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.profiles = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self, thread_id):
+        with self.lock:
+            self.profiles[thread_id] = Counter()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='request-sampler', daemon=True)
+                self.thread.start()
+
+    def stop(self, thread_id):
+        """Stop profiling a thread; returns its {collapsed stack: samples} counts"""
+        with self.lock:
+            return self.profiles.pop(thread_id, Counter())
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.profiles:
+                    self.thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, counts in self.profiles.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counts[collapse(frame)] += 1
+
+
+def safe_view_name(view_name):
+    """A view name ('recipes:recipe_search') as it appears in profile file names"""
+    return re.sub(r'[^\w.]+', '_', view_name)
+
+
+def profile_name(view_name):
+    """File name (without extension) for a new profile of a view"""
+    now = time.time()
+    stamp = f'{time.strftime("%Y%m%d-%H%M%S", time.localtime(now))}{int(now * 1000) % 1000:03d}'
+    return f'{stamp}-{os.getpid()}-{safe_view_name(view_name)}'
+
+
+def write_collapsed(path, samples):
+    """Write samples in the collapsed-stack format read by flamegraph.pl and perf_report"""
+    with open(path, 'w', encoding='utf-8') as handle:
+        for stack, count in samples.most_common():
+            handle.write(f'{stack} {count}\n')
+
+
+def write_speedscope(path, samples, view_name, elapsed, interval):
+    """Write samples as a speedscope 'sampled' profile"""
+    frames = {}
+    stacks = []
+    weights = []
+    for stack, count in samples.items():
+        stacks.append([frames.setdefault(label, len(frames)) for label in stack.split(';')])
+        weights.append(count * interval * 1000)
+    document = {
+        '$schema': SPEEDSCOPE_SCHEMA,
+        'name': view_name,
+        'exporter': 'recipes.profiling',
+        'shared': {'frames': [{'name': label} for label in frames]},
+        'profiles': [{
+            'type': 'sampled',
+            'name': f'{view_name} ({elapsed * 1000:.0f} ms)',
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': stacks,
+            'weights': weights,
+        }],
+    }
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(document, handle)
+
+
+def save_profile(directory, view_name, samples, elapsed, interval):
+    """Write a request's samples as .collapsed and .speedscope.json files; returns the base path"""
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, profile_name(view_name))
+    write_collapsed(f'{base}.collapsed', samples)
+    write_speedscope(f'{base}.speedscope.json', samples, view_name, elapsed, interval)
+    return base
+
+
+def view_of_profile(filename):
+    """The view name stored in a profile's file name"""
+    return os.path.basename(filename).split('-', 3)[3].split('.collapsed')[0]
+
+
+class SamplingProfilerMiddleware:
+    """
+    Profile slow requests (and a random fraction of all requests) with a sampling profiler.
+
+    Enabled with PROFILE_REQUESTS. Requests taking PROFILE_SLOW_REQUEST_SECONDS
+    or longer, plus a PROFILE_SAMPLE_RATE fraction of all requests, are saved
+    to PROFILE_DIR; summarise them with `manage.py perf_report`. Streamed
+    responses are only timed until the view returns.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILE_REQUESTS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.interval = settings.PROFILE_INTERVAL_MS / 1000
+        self.sampler = Sampler(self.interval)
+
+    def __call__(self, request):
+        threshold = settings.PROFILE_SLOW_REQUEST_SECONDS
+        sampled = random.random() < settings.PROFILE_SAMPLE_RATE
+        if not threshold and not sampled:
+            return self.get_response(request)
+
+        thread_id = threading.get_ident()
+        self.sampler.start(thread_id)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            samples = self.sampler.stop(thread_id)
+        elapsed = time.perf_counter() - start
+
+        if samples and (sampled or elapsed >= threshold):
+            match = request.resolver_match
+            view_name = match.view_name if match else 'unresolved'
+            save_profile(settings.PROFILE_DIR, view_name, samples, elapsed, self.interval)
+        return response
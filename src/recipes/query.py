@@ -0,0 +1,198 @@
+import re
+from django.db.models import Q
+from .forms import DIFFICULTY_CHOICES
+from .search import tokenize, words_q
+
+TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<lparen>\() |
+        (?P<rparen>\)) |
+        (?P<field>[A-Za-z_]+): |
+        (?P<negate>-)(?=[^\s)]) |
+        "(?P<phrase>[^"]*)" |
+        (?P<word>[^\s()"]+)
+    )
+''', re.VERBOSE)
+
+FIELD_ALIASES = {
+    'name': 'name',
+    'ingredient': 'ingredient',
+    'ingredients': 'ingredient',
+    'time': 'time',
+    'cooking_time': 'time',
+    'difficulty': 'difficulty',
+}
+
+COMPARISON = re.compile(r'^(<=|>=|<|>|=)?(\d+)$')
+COMPARISON_LOOKUPS = {
+    '<': 'lt',
+    '<=': 'lte',
+    '>': 'gt',
+    '>=': 'gte',
+    '=': 'exact',
+    None: 'exact',
+}
+
+DIFFICULTIES = {value.lower(): value for value, label in DIFFICULTY_CHOICES if value}
+
+# Longer or more deeply nested queries are rejected before they can exhaust the stack
+MAX_QUERY_LENGTH = 500
+MAX_QUERY_DEPTH = 20
+
+
+class QuerySyntaxError(ValueError):
+    """Raised for search queries that cannot be parsed"""
+
+
+def lex(text):
+    """Split a query into (kind, value) tokens"""
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise QuerySyntaxError(f'Unexpected character {text[position]!r}')
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'word' and value in ('AND', 'OR', 'NOT'):
+            kind = value.lower()
+        tokens.append((kind, value))
+    return tokens
+
+
+class Parser:
+    """
+    Recursive-descent parser that compiles a search query straight into a Q tree.
+
+    Grammar (AND binds tighter than OR, and is implied between terms):
+
+        query   := and_expr ('OR' and_expr)*
+        and_expr := unary ('AND'? unary)*
+        unary   := ('-' | 'NOT') unary | '(' query ')' | field ':' value | value
+        value   := word ('|' word)* | '"phrase"' | '(' query ')'
+
+    Name and ingredient words match whole indexed words; `chick*` matches
+    any word starting with "chick".
+    """
+
+    def __init__(self, text):
+        if len(text) > MAX_QUERY_LENGTH:
+            raise QuerySyntaxError(f'Query is longer than {MAX_QUERY_LENGTH} characters')
+        self.tokens = lex(text)
+        self.position = 0
+        self.depth = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position][0]
+        return None
+
+    def take(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def nested(self, parse, field):
+        """Run a nested rule (a negation or a parenthesised query), enforcing MAX_QUERY_DEPTH"""
+        self.depth += 1
+        if self.depth > MAX_QUERY_DEPTH:
+            raise QuerySyntaxError(f'Query is nested more than {MAX_QUERY_DEPTH} levels deep')
+        q = parse(field)
+        self.depth -= 1
+        return q
+
+    def parse(self):
+        if not self.tokens:
+            return Q()
+        q = self.query(None)
+        if self.peek() is not None:
+            raise QuerySyntaxError(f'Unexpected {self.tokens[self.position][1]!r}')
+        return q
+
+    def query(self, field):
+        q = self.and_expr(field)
+        while self.peek() == 'or':
+            self.take()
+            q = q | self.and_expr(field)
+        return q
+
+    def and_expr(self, field):
+        q = self.unary(field)
+        while self.peek() not in (None, 'or', 'rparen'):
+            if self.peek() == 'and':
+                self.take()
+            q = q & self.unary(field)
+        return q
+
+    def unary(self, field):
+        kind = self.peek()
+        if kind in ('negate', 'not'):
+            self.take()
+            return ~self.nested(self.unary, field)
+        if kind == 'field':
+            name = self.take()[1].lower()
+            if name not in FIELD_ALIASES:
+                raise QuerySyntaxError(f'Unknown field {name!r}; use one of {", ".join(sorted(FIELD_ALIASES))}')
+            return self.value(FIELD_ALIASES[name])
+        return self.value(field)
+
+    def value(self, field):
+        kind = self.peek()
+        if kind is None:
+            raise QuerySyntaxError('Query ends too early')
+        if kind == 'lparen':
+            self.take()
+            q = self.nested(self.query, field)
+            if self.peek() != 'rparen':
+                raise QuerySyntaxError('Missing closing parenthesis')
+            self.take()
+            return q
+        if kind == 'phrase':
+            return phrase_q(field, self.take()[1])
+        if kind == 'word':
+            alternatives = [word for word in self.take()[1].split('|') if word]
+            if not alternatives:
+                raise QuerySyntaxError('Empty alternative')
+            q = word_q(field, alternatives[0])
+            for word in alternatives[1:]:
+                q |= word_q(field, word)
+            return q
+        raise QuerySyntaxError(f'Unexpected {self.take()[1]!r}')
+
+
+def word_q(field, word):
+    """Q for one word of a field, using the indexed path for that field"""
+    if field == 'difficulty':
+        if word.lower() not in DIFFICULTIES:
+            raise QuerySyntaxError(f'Unknown difficulty {word!r}')
+        return Q(difficulty=DIFFICULTIES[word.lower()])
+    if field == 'time':
+        match = COMPARISON.match(word)
+        if not match:
+            raise QuerySyntaxError(f'Cooking time must look like 30, <30 or >=10, not {word!r}')
+        operator, minutes = match.groups()
+        return Q(**{f'cooking_time__{COMPARISON_LOOKUPS[operator]}': int(minutes)})
+    words = tokenize(word)
+    if not words:
+        return Q()
+    # Whole words use the (term, field) index; a trailing * asks for a prefix match
+    return words_q(words, field, prefix=word.endswith('*'))
+
+
+def phrase_q(field, phrase):
+    """Q for an exact phrase: narrowed by the word index, then checked as a substring"""
+    if field in ('difficulty', 'time'):
+        return word_q(field, phrase)
+    q = word_q(field, phrase)
+    if field == 'name':
+        return q & Q(name__icontains=phrase)
+    if field == 'ingredient':
+        return q & Q(ingredients__icontains=phrase)
+    return q & (Q(name__icontains=phrase) | Q(ingredients__icontains=phrase))
+
+
+def compile_query(text):
+    """Compile a search query into a single Q object; raises QuerySyntaxError"""
+    return Parser(text).parse()
@@ -0,0 +1,102 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+
+class SlidingWindowLimiter:
+    """
+    Sliding-window counter stored in the configured cache.
+
+    Keeps one counter per fixed window and estimates the sliding count as
+    the current window plus the previous window weighted by how much of it
+    still overlaps. Two cache reads per check, one increment per hit.
+    """
+
+    def __init__(self, name, limit, window):
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    def _cache_key(self, key, index):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return f'recipes:ratelimit:{self.name}:{digest}:{index}'
+
+    def count(self, key, now=None):
+        now = time.time() if now is None else now
+        index = int(now // self.window)
+        counts = cache.get_many([self._cache_key(key, index), self._cache_key(key, index - 1)])
+        current = counts.get(self._cache_key(key, index), 0)
+        previous = counts.get(self._cache_key(key, index - 1), 0)
+        overlap = 1 - (now % self.window) / self.window
+        return current + previous * overlap
+
+    def is_limited(self, key, now=None):
+        return self.count(key, now) >= self.limit
+
+    def hit(self, key, now=None):
+        now = time.time() if now is None else now
+        cache_key = self._cache_key(key, int(now // self.window))
+        # Counters outlive their own window so they can still weight the next one
+        cache.add(cache_key, 0, self.window * 2)
+        try:
+            cache.incr(cache_key)
+        except ValueError:
+            cache.set(cache_key, 1, self.window * 2)
+
+    def reset(self, key, now=None):
+        now = time.time() if now is None else now
+        index = int(now // self.window)
+        cache.delete_many([self._cache_key(key, index), self._cache_key(key, index - 1)])
+
+
+def client_ip(request):
+    """Client address, taken from X-Forwarded-For when behind RATE_LIMIT_PROXY_COUNT proxies"""
+    proxies = settings.RATE_LIMIT_PROXY_COUNT
+    if proxies:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def login_limiters():
+    window = settings.LOGIN_RATE_LIMIT_WINDOW
+    return (
+        SlidingWindowLimiter('login-ip', settings.LOGIN_RATE_LIMIT_PER_IP, window),
+        SlidingWindowLimiter('login-user', settings.LOGIN_RATE_LIMIT_PER_USERNAME, window),
+    )
+
+
+def login_throttled(request, username):
+    """True if too many failed logins came from this IP or for this username"""
+    if not settings.LOGIN_RATE_LIMIT_ENABLED:
+        return False
+    by_ip, by_username = login_limiters()
+    return by_ip.is_limited(client_ip(request)) or by_username.is_limited(username.lower())
+
+
+def record_login_failure(request, username):
+    if not settings.LOGIN_RATE_LIMIT_ENABLED:
+        return
+    by_ip, by_username = login_limiters()
+    by_ip.hit(client_ip(request))
+    by_username.hit(username.lower())
+
+
+def record_login_success(request, username):
+    """Clear the username's failures so a legitimate user is not left throttled"""
+    if not settings.LOGIN_RATE_LIMIT_ENABLED:
+        return
+    by_ip, by_username = login_limiters()
+    by_username.reset(username.lower())
+
+
+def username_check_throttled(request):
+    """Count a username availability check and report whether the IP is over its limit"""
+    limiter = SlidingWindowLimiter('username-check', settings.USERNAME_CHECK_RATE_LIMIT, 60)
+    ip = client_ip(request)
+    if limiter.is_limited(ip):
+        return True
+    limiter.hit(ip)
+    return False
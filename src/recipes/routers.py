@@ -0,0 +1,83 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+
+REPLICA_ALIAS = 'replica'
+PIN_SESSION_KEY = '_pin_primary_until'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+class ReplicaRouter:
+    """
+    Send reads to the replica inside views marked with `read_from_replica`.
+
+    Everything else, and every write, goes to the primary ('default').
+    Migrations only run on the primary; the replica gets its schema by
+    replication (or, locally, by copying the primary's SQLite file).
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_configured():
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def session_pinned_to_primary(request):
+    """True if this session wrote recently and must read its own writes"""
+    session = getattr(request, 'session', None)
+    return session is not None and session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+def read_from_replica(view):
+    """Route the view's reads to the replica unless the session is pinned to the primary"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or session_pinned_to_primary(request):
+            return view(request, *args, **kwargs)
+        token = _use_replica.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Send reads inside the block to the primary, even within a read_from_replica view"""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class PrimaryPinningMiddleware:
+    """Pin a session's reads to the primary for a short time after any write request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if replica_configured() and request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            session = getattr(request, 'session', None)
+            if session is not None:
+                session[PIN_SESSION_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
+        return response
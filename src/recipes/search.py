@@ -0,0 +1,221 @@
+import re
+from datetime import datetime, timezone
+from django.db import transaction
+from django.db.models import Count, Q
+
+# Above this many ids a snapshot match is left to the database subquery instead
+SNAPSHOT_MAX_IDS = 500
+
+WORD = re.compile(r'[^\W_]+')
+
+# Sorts after any character that can follow a prefix in an indexed word
+PREFIX_END = '\uffff'
+
+
+def tokenize(text):
+    """Lower-cased words of a piece of text, in order, without duplicates"""
+    return list(dict.fromkeys(word.lower() for word in WORD.findall(text or '')))
+
+
+def recipe_terms(recipe, term_model=None):
+    """Unsaved search term rows for one recipe's name and ingredients"""
+    if term_model is None:
+        from .models import RecipeSearchTerm as term_model
+    max_length = term_model._meta.get_field('term').max_length
+    rows = [
+        term_model(recipe_id=recipe.pk, field='name', term=word[:max_length])
+        for word in tokenize(recipe.name)
+    ]
+    rows += [
+        term_model(recipe_id=recipe.pk, field='ingredient', term=word[:max_length])
+        for word in tokenize(recipe.ingredients)
+    ]
+    return rows
+
+
+def trigrams(word):
+    """Distinct character trigrams of a word, padded like pg_trgm ('  ab', ..., 'yz ')"""
+    padded = f'  {word} '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def trigram_rows(terms, trigram_model=None):
+    """Unsaved trigram index rows for a collection of words"""
+    if trigram_model is None:
+        from .models import SearchTrigram as trigram_model
+    return [
+        trigram_model(trigram=trigram, term=term)
+        for term in set(terms)
+        for trigram in trigrams(term)
+    ]
+
+
+def index_recipe_terms(recipe):
+    """Replace one recipe's rows in the search term index"""
+    from .models import RecipeSearchTerm, SearchTrigram
+    rows = recipe_terms(recipe)
+    with transaction.atomic():
+        RecipeSearchTerm.objects.filter(recipe_id=recipe.pk).delete()
+        RecipeSearchTerm.objects.bulk_create(rows, ignore_conflicts=True)
+        # Words nobody uses any more stay until the next rebuild; they match no recipe
+        SearchTrigram.objects.bulk_create(trigram_rows(row.term for row in rows), ignore_conflicts=True)
+
+
+def rebuild_search_terms(recipe_model=None, term_model=None):
+    """Rebuild the whole search term index; returns the number of rows written"""
+    if recipe_model is None:
+        from .models import Recipe as recipe_model
+    if term_model is None:
+        from .models import RecipeSearchTerm as term_model
+    with transaction.atomic():
+        term_model.objects.all().delete()
+        rows = []
+        for recipe in recipe_model.objects.only('pk', 'name', 'ingredients').iterator(chunk_size=1000):
+            rows.extend(recipe_terms(recipe, term_model))
+        term_model.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows)
+
+
+def rebuild_search_trigrams(term_model=None, trigram_model=None):
+    """Rebuild the trigram index from the indexed words; returns the number of rows written"""
+    if term_model is None:
+        from .models import RecipeSearchTerm as term_model
+    if trigram_model is None:
+        from .models import SearchTrigram as trigram_model
+    terms = term_model.objects.values_list('term', flat=True).distinct()
+    with transaction.atomic():
+        trigram_model.objects.all().delete()
+        rows = trigram_rows(terms, trigram_model)
+        trigram_model.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows)
+
+
+def matching_recipe_ids(words, field=None, prefix=True, changed_since=None):
+    """
+    Subquery of recipe ids having an indexed term starting with each word.
+
+    Each word narrows the result (AND). `field` limits matches to 'name'
+    or 'ingredient' terms. With prefix=False terms must equal the words.
+    With `changed_since` only recipes updated after that moment are searched.
+    Prefixes are compared as a range rather than with LIKE, so both kinds
+    are answered from the (term, field) index on every database.
+    """
+    from .models import RecipeSearchTerm
+    ids = None
+    for word in words:
+        if prefix:
+            terms = RecipeSearchTerm.objects.filter(term__gte=word, term__lt=word + PREFIX_END)
+        else:
+            terms = RecipeSearchTerm.objects.filter(term=word)
+        if field:
+            terms = terms.filter(field=field)
+        if changed_since is not None:
+            terms = terms.filter(recipe__updated_at__gt=changed_since)
+        word_ids = terms.values('recipe_id')
+        ids = word_ids if ids is None else ids.filter(recipe_id__in=word_ids)
+    return ids
+
+
+def words_q(words, field=None, prefix=True):
+    """
+    Q for recipes matching every word, like matching_recipe_ids().
+
+    When a search snapshot is loaded (see recipes/snapshot.py) its postings
+    answer for recipes saved before it was built, and the word index is
+    only searched among the recipes saved since.
+    """
+    from .snapshot import current_snapshot
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        ids = snapshot.matching_ids(words, field, prefix)
+        if len(ids) <= SNAPSHOT_MAX_IDS:
+            built_at = datetime.fromtimestamp(snapshot.built_at, tz=timezone.utc)
+            return (
+                (Q(pk__in=ids.tolist()) & Q(updated_at__lte=built_at))
+                | Q(pk__in=matching_recipe_ids(words, field, prefix, changed_since=built_at))
+            )
+    return Q(pk__in=matching_recipe_ids(words, field, prefix))
+
+
+def max_edits(word):
+    """Typos tolerated in a search word: one for short words, two for longer ones"""
+    if len(word) <= 2:
+        return 0
+    return 1 if len(word) <= 5 else 2
+
+
+def edit_distance(first, second, limit):
+    """Levenshtein distance between two words, or limit + 1 once it must exceed limit"""
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for row, first_char in enumerate(first, start=1):
+        current = [row]
+        for column, second_char in enumerate(second, start=1):
+            current.append(min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (first_char != second_char),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def fuzzy_terms(word):
+    """
+    Indexed words within max_edits(word) of `word`, mapped to their distance.
+
+    Candidates come from the trigram index: a word within k edits shares all
+    but at most 3k of the query's trigrams, so only words with that many
+    trigrams in common are fetched and checked with edit_distance().
+    """
+    from .models import SearchTrigram
+    limit = max_edits(word)
+    query_trigrams = trigrams(word)
+    candidates = (
+        SearchTrigram.objects.filter(trigram__in=query_trigrams)
+        .values('term')
+        .annotate(shared=Count('pk'))
+        .filter(shared__gte=max(1, len(query_trigrams) - 3 * limit))
+        .values_list('term', flat=True)
+    )
+    matches = {}
+    for term in candidates:
+        distance = edit_distance(word, term, limit)
+        if distance <= limit:
+            matches[term] = distance
+    return matches
+
+
+def fuzzy_recipe_distances(text, field=None):
+    """
+    Recipes matching every word of `text` allowing typos, mapped to their total edit distance.
+
+    `field` limits matches to 'name' or 'ingredient' words. Returns None
+    when `text` has no words.
+    """
+    from .models import RecipeSearchTerm
+    words = tokenize(text)
+    if not words:
+        return None
+    distances = None
+    for word in words:
+        terms = fuzzy_terms(word)
+        rows = RecipeSearchTerm.objects.filter(term__in=list(terms))
+        if field:
+            rows = rows.filter(field=field)
+        best = {}
+        for recipe_id, term in rows.values_list('recipe_id', 'term'):
+            best[recipe_id] = min(best.get(recipe_id, terms[term]), terms[term])
+        if distances is None:
+            distances = best
+        else:
+            distances = {
+                recipe_id: distance + best[recipe_id]
+                for recipe_id, distance in distances.items() if recipe_id in best
+            }
+        if not distances:
+            break
+    return distances
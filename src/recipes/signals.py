@@ -0,0 +1,104 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import receiver
+from .models import Recipe, RecipeSimilarity, RecipeDeletion
+from .facets import invalidate_facet_counts
+from .backends import user_cache_key, username_cache_key
+from .search import index_recipe_terms
+from .similarity import update_recipe_similarity, refresh_neighbours
+from .duplicates import flag_duplicate
+from .cache import detail_cache_key
+from . import stats
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_previous_difficulty(sender, instance, raw=False, **kwargs):
+    """Keep the stored difficulty so post_save can tell if it changed"""
+    instance._previous_difficulty = None
+    if instance.pk and not raw:
+        instance._previous_difficulty = (
+            Recipe.objects.filter(pk=instance.pk).values_list('difficulty', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def update_daily_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    """Keep the daily rollup in step with new and re-graded recipes"""
+    if created:
+        stats.record_recipe_added(instance)
+    elif not raw and instance._previous_difficulty is not None:
+        stats.record_difficulty_change(instance, instance._previous_difficulty)
+
+
+@receiver(post_delete, sender=Recipe)
+def update_daily_stats_on_delete(sender, instance, **kwargs):
+    """Remove deleted recipes from the daily rollup"""
+    stats.record_recipe_removed(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_terms_on_save(sender, instance, raw=False, **kwargs):
+    """Re-index a recipe's name and ingredient words after it is saved"""
+    if not raw:
+        index_recipe_terms(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def update_similarity_on_save(sender, instance, raw=False, **kwargs):
+    """Refresh the saved recipe's neighbours and merge it into theirs"""
+    if not raw:
+        update_recipe_similarity(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def flag_duplicate_on_save(sender, instance, raw=False, **kwargs):
+    """Mark a saved recipe that looks like a copy of another one"""
+    if not raw:
+        flag_duplicate(instance)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_similarity_listings(sender, instance, **kwargs):
+    """Note which recipes list this one before the cascade removes the rows"""
+    instance._listed_by = list(
+        RecipeSimilarity.objects.filter(similar_id=instance.pk).values_list('recipe_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def refill_similarity_on_delete(sender, instance, **kwargs):
+    """Give recipes that listed a deleted recipe a full neighbour list again"""
+    refresh_neighbours(getattr(instance, '_listed_by', []))
+
+
+@receiver(post_delete, sender=Recipe)
+def log_recipe_deletion(sender, instance, **kwargs):
+    """Leave a tombstone for the sync feed"""
+    RecipeDeletion.objects.create(recipe_id=instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    """Invalidate cached search facets and the recipe's detail page whenever the catalogue changes"""
+    invalidate_facet_counts()
+    cache.delete(detail_cache_key(instance.pk))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    """Drop a user from the auth and username-availability caches when their row changes"""
+    cache.delete_many([user_cache_key(instance.pk), username_cache_key(instance.username)])
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Apply the configured SQLite performance pragmas to a new connection"""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
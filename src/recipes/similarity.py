@@ -0,0 +1,258 @@
+import heapq
+import math
+import zlib
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from .duplicates import minhash, band_buckets
+
+# Shared ingredients dominate; cooking time and difficulty break ties
+INGREDIENT_WEIGHT = 0.8
+COOKING_TIME_WEIGHT = 0.1
+DIFFICULTY_WEIGHT = 0.1
+
+FIELDS = ('pk', 'ingredients', 'cooking_time', 'difficulty')
+
+# Recipes are compared when their ingredient sets share a MinHash LSH bucket
+# (16 bands of 2 rows: pairs above ~0.4 Jaccard similarity almost always do)
+BANDS = 16
+ROWS_PER_BAND = 2
+# Within a bucket a recipe is only compared with this many members on either side
+# (by pk), so an ingredient set shared by thousands of recipes still costs little
+BUCKET_WINDOW = 10
+
+
+def ingredient_set(recipe):
+    """Normalised ingredient names of a recipe"""
+    items = (' '.join(item.lower().split()) for item in recipe.ingredients.split(','))
+    return frozenset(item for item in items if item)
+
+
+def similarity(first, second, first_ingredients=None, second_ingredients=None):
+    """
+    Score two recipes between 0 and 1; recipes without a common ingredient score 0.
+
+    The ingredient part is the cosine between the two ingredient sets as
+    binary vectors; cooking times and difficulties add a small bonus.
+    """
+    if first_ingredients is None:
+        first_ingredients = ingredient_set(first)
+    if second_ingredients is None:
+        second_ingredients = ingredient_set(second)
+    shared = len(first_ingredients & second_ingredients)
+    if not shared:
+        return 0.0
+    cosine = shared / math.sqrt(len(first_ingredients) * len(second_ingredients))
+    longest = max(first.cooking_time, second.cooking_time, 1)
+    time_closeness = 1 - min(abs(first.cooking_time - second.cooking_time) / longest, 1)
+    same_difficulty = 1.0 if first.difficulty == second.difficulty else 0.0
+    return (INGREDIENT_WEIGHT * cosine
+            + COOKING_TIME_WEIGHT * time_closeness
+            + DIFFICULTY_WEIGHT * same_difficulty)
+
+
+def _rows(recipe_id, scored, similarity_model):
+    """Ranked similarity rows from (score, similar_id) pairs"""
+    top = heapq.nlargest(settings.RECIPE_SIMILAR_COUNT, scored)
+    return [
+        similarity_model(recipe_id=recipe_id, similar_id=similar_id, score=score, rank=rank)
+        for rank, (score, similar_id) in enumerate(top, start=1)
+    ]
+
+
+def ingredient_buckets(ingredients):
+    """(band, bucket) LSH keys of an ingredient set"""
+    if not ingredients:
+        return []
+    signature = minhash({zlib.crc32(item.encode()) for item in ingredients})
+    return band_buckets(signature, BANDS, ROWS_PER_BAND)
+
+
+def windowed_candidates(buckets, pks=None):
+    """
+    {pk: candidate pks} from {(band, bucket): member pks}.
+
+    Each member is paired with its BUCKET_WINDOW nearest members on either
+    side in pk order. With `pks`, only those recipes' candidates are kept.
+    """
+    candidates = defaultdict(set)
+    for members in buckets.values():
+        members = sorted(members)
+        for index, pk in enumerate(members):
+            if pks is None or pk in pks:
+                candidates[pk].update(members[max(index - BUCKET_WINDOW, 0):index])
+                candidates[pk].update(members[index + 1:index + 1 + BUCKET_WINDOW])
+    return candidates
+
+
+def build_similarity_index():
+    """
+    Recompute every recipe's ingredient buckets and neighbours; returns the number of neighbour rows written.
+
+    Only recipes sharing an LSH bucket are compared, and a bounded number
+    per bucket, so the work grows linearly with the number of recipes.
+    """
+    from .models import Recipe, RecipeIngredientBand, RecipeSimilarity
+    recipes = {}
+    ingredients = {}
+    buckets = defaultdict(list)
+    band_rows = []
+    for recipe in Recipe.objects.only(*FIELDS).iterator(chunk_size=1000):
+        recipes[recipe.pk] = recipe
+        ingredients[recipe.pk] = ingredient_set(recipe)
+        for band, bucket in ingredient_buckets(ingredients[recipe.pk]):
+            buckets[band, bucket].append(recipe.pk)
+            band_rows.append(RecipeIngredientBand(recipe_id=recipe.pk, band=band, bucket=bucket))
+
+    candidates = windowed_candidates(buckets)
+    rows = []
+    for pk, recipe in recipes.items():
+        scored = [
+            (similarity(recipe, recipes[other], ingredients[pk], ingredients[other]), other)
+            for other in candidates[pk]
+        ]
+        rows.extend(_rows(pk, scored, RecipeSimilarity))
+
+    with transaction.atomic():
+        RecipeIngredientBand.objects.all().delete()
+        RecipeIngredientBand.objects.bulk_create(band_rows, batch_size=1000)
+        RecipeSimilarity.objects.all().delete()
+        RecipeSimilarity.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def index_ingredient_bands(recipe):
+    """Replace one recipe's ingredient bucket rows"""
+    from .models import RecipeIngredientBand
+    RecipeIngredientBand.objects.filter(recipe_id=recipe.pk).delete()
+    RecipeIngredientBand.objects.bulk_create([
+        RecipeIngredientBand(recipe_id=recipe.pk, band=band, bucket=bucket)
+        for band, bucket in ingredient_buckets(ingredient_set(recipe))
+    ])
+
+
+def candidate_ids(recipe_ids):
+    """{pk: candidate pks} of the given recipes, from the stored ingredient buckets"""
+    from .models import RecipeIngredientBand
+    own = RecipeIngredientBand.objects.filter(recipe_id__in=recipe_ids).values('bucket')
+    buckets = defaultdict(list)
+    for band, bucket, recipe_id in RecipeIngredientBand.objects.filter(
+        bucket__in=own
+    ).values_list('band', 'bucket', 'recipe_id'):
+        buckets[band, bucket].append(recipe_id)
+    return windowed_candidates(buckets, set(recipe_ids))
+
+
+def neighbour_scores(recipes):
+    """
+    {recipe pk: {other pk: score}} of every candidate, loading the candidates in one query.
+
+    Needs the recipes' ingredient buckets to be indexed.
+    """
+    from .models import Recipe
+    recipes = list(recipes)
+    if not recipes:
+        return {}
+    candidates = candidate_ids([recipe.pk for recipe in recipes])
+    others = Recipe.objects.only(*FIELDS).in_bulk(set().union(*candidates.values()))
+    ingredients = {pk: ingredient_set(other) for pk, other in others.items()}
+
+    scores = {}
+    for recipe in recipes:
+        own_ingredients = ingredient_set(recipe)
+        scores[recipe.pk] = {
+            pk: similarity(recipe, others[pk], own_ingredients, ingredients[pk])
+            for pk in candidates[recipe.pk] if pk in others
+        }
+    return scores
+
+
+def _replace_lists(lists):
+    """Write {recipe pk: {similar pk: score}} neighbour lists with one DELETE and one INSERT"""
+    from .models import RecipeSimilarity
+    if not lists:
+        return
+    RecipeSimilarity.objects.filter(recipe_id__in=list(lists)).delete()
+    rows = []
+    for recipe_id, scores in lists.items():
+        rows.extend(_rows(recipe_id, [(score, pk) for pk, score in scores.items()], RecipeSimilarity))
+    RecipeSimilarity.objects.bulk_create(rows, batch_size=1000)
+
+
+def refresh_neighbours(recipe_ids):
+    """Recompute the neighbour lists of the given recipes with a fixed number of queries"""
+    from .models import Recipe
+    recipes = Recipe.objects.filter(pk__in=list(recipe_ids)).only(*FIELDS)
+    with transaction.atomic():
+        _replace_lists(neighbour_scores(recipes))
+
+
+def _merge_into_neighbours(recipe_id, scores):
+    """
+    Put a recipe's new scores into the lists of the recipes it was compared with.
+
+    Only lists the recipe enters, leaves or moves within are rewritten. A
+    full list whose k-th entry beats the recipe is left alone. When the
+    recipe drops down or out of a full list, the next best neighbour is
+    unknown here, so that list is recomputed.
+    """
+    from .models import RecipeSimilarity
+    limit = settings.RECIPE_SIMILAR_COUNT
+    listed = dict(RecipeSimilarity.objects.filter(similar_id=recipe_id).values_list('recipe_id', 'score'))
+    # The k-th entry of every full list that could be affected, in one query
+    kth = {
+        row[0]: row[1:]
+        for row in RecipeSimilarity.objects.filter(
+            rank=limit, recipe_id__in=list(scores.keys() | listed.keys())
+        ).values_list('recipe_id', 'score', 'similar_id')
+    }
+
+    changed = {}
+    stale = set()
+    for other_id in listed.keys() | scores.keys():
+        new = scores.get(other_id, 0)
+        old = listed.get(other_id)
+        if old is None:
+            if new and (other_id not in kth or (new, recipe_id) > kth[other_id]):
+                changed[other_id] = new
+        elif new != old:
+            if new > old or other_id not in kth:
+                changed[other_id] = new
+            else:
+                stale.add(other_id)
+
+    lists = defaultdict(dict)
+    for row in RecipeSimilarity.objects.filter(recipe_id__in=list(changed)):
+        lists[row.recipe_id][row.similar_id] = row.score
+    for other_id, score in changed.items():
+        lists[other_id].pop(recipe_id, None)
+        if score:
+            lists[other_id][recipe_id] = score
+    _replace_lists(lists)
+    refresh_neighbours(stale)
+
+
+def update_recipe_similarity(recipe, propagate=True):
+    """
+    Recompute one recipe's neighbours after it was saved.
+
+    With `propagate`, the recipe is also merged into (or dropped from) the
+    lists of the recipes it is compared with, so their lists stay current
+    without a full rebuild.
+    """
+    with transaction.atomic():
+        index_ingredient_bands(recipe)
+        scores = {pk: score for pk, score in neighbour_scores([recipe])[recipe.pk].items() if score}
+        _replace_lists({recipe.pk: scores})
+        if propagate:
+            _merge_into_neighbours(recipe.pk, scores)
+
+
+def similar_recipes(recipe):
+    """The stored neighbours of a recipe, best first, in one query"""
+    from .models import Recipe
+    return list(
+        Recipe.objects.filter(similar_to__recipe=recipe)
+        .order_by('similar_to__rank')
+        .only('pk', 'name', 'cooking_time', 'difficulty', 'pic')
+    )
@@ -0,0 +1,118 @@
+import math
+import random
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+
+_guard = threading.Lock()
+_locks = {}
+
+
+class _KeyLock:
+    """Per-key lock shared by the threads of this process that want the same key"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+def _key_lock(key):
+    with _guard:
+        entry = _locks.get(key)
+        if entry is None:
+            entry = _locks[key] = _KeyLock()
+        entry.users += 1
+        return entry
+
+
+def _release_key_lock(key, entry):
+    with _guard:
+        entry.users -= 1
+        if not entry.users:
+            _locks.pop(key, None)
+
+
+def should_refresh(delta, expires_at, beta, now):
+    """
+    Probabilistic early expiration ("XFetch").
+
+    Recomputes a little before expiry with a probability that grows as
+    expiry nears and with how long the value took to compute (delta), so
+    one request usually refreshes the value before anybody sees it expire.
+    """
+    return now - delta * beta * math.log(1 - random.random()) >= expires_at
+
+
+def _compute_and_store(key, compute, timeout):
+    start = time.time()
+    value = compute()
+    now = time.time()
+    # Kept past its expiry so it can still be served stale during a refresh
+    cache.set(key, (value, now - start, now + timeout), timeout + settings.SINGLE_FLIGHT_STALE_SECONDS)
+    return value
+
+
+def _wait_for_other_process(key, entry, deadline):
+    """Poll the cache until another process stores a newer entry; None on timeout"""
+    while time.time() < deadline:
+        time.sleep(0.05)
+        current = cache.get(key)
+        if current is not None and (entry is None or current[2] != entry[2]):
+            return current
+    return None
+
+
+def get_or_compute(key, compute, timeout, beta=None):
+    """
+    Return the cached value for `key`, computing it with `compute()` at most once at a time.
+
+    While one thread recomputes an expired key, the other threads of this
+    process get the stale value, or wait for the fresh one if there is no
+    stale copy. With SINGLE_FLIGHT_CACHE_LOCK the same holds across
+    processes through a lock key in the shared cache. Values are also
+    refreshed early at random (see should_refresh) so popular keys rarely
+    expire under load.
+    """
+    beta = settings.SINGLE_FLIGHT_BETA if beta is None else beta
+    lock_timeout = settings.SINGLE_FLIGHT_LOCK_TIMEOUT
+    entry = cache.get(key)
+    if entry is not None and not should_refresh(entry[1], entry[2], beta, time.time()):
+        return entry[0]
+
+    key_lock = _key_lock(key)
+    try:
+        if not key_lock.lock.acquire(blocking=entry is None, timeout=lock_timeout if entry is None else -1):
+            # Another thread is already refreshing it
+            if entry is not None:
+                return entry[0]
+            return _compute_and_store(key, compute, timeout)
+        try:
+            current = cache.get(key)
+            if current is not None and (entry is None or current[2] != entry[2]):
+                # Refreshed by the thread we waited for
+                return current[0]
+
+            if not settings.SINGLE_FLIGHT_CACHE_LOCK:
+                return _compute_and_store(key, compute, timeout)
+
+            lock_key = f'{key}:lock'
+            token = uuid.uuid4().hex
+            if not cache.add(lock_key, token, lock_timeout):
+                # Another process is refreshing it
+                if entry is not None:
+                    return entry[0]
+                fresh = _wait_for_other_process(key, entry, time.time() + lock_timeout)
+                if fresh is not None:
+                    return fresh[0]
+                return _compute_and_store(key, compute, timeout)
+            try:
+                return _compute_and_store(key, compute, timeout)
+            finally:
+                if cache.get(lock_key) == token:
+                    cache.delete(lock_key)
+        finally:
+            key_lock.lock.release()
+    finally:
+        _release_key_lock(key, key_lock)
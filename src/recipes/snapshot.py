@@ -0,0 +1,185 @@
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import defaultdict
+import numpy as np
+from django.conf import settings
+
+# File layout (all integers little-endian):
+#   header          magic, format, built_at, term count, postings count, term bytes
+#   term_offsets    uint32[terms + 1]   start of each term in term_bytes
+#   post_offsets    uint32[terms + 1]   start of each term's postings
+#   term_bytes      'field:term' keys, UTF-8, sorted bytewise
+#   postings        uint64[postings]    sorted recipe ids per term (wide enough for BigAutoField)
+MAGIC = b'RCPSNAP'
+FORMAT = 2
+HEADER = struct.Struct('<7sBdIII')
+UINT32 = np.dtype('<u4')
+UINT64 = np.dtype('<u8')
+
+FIELD_PREFIXES = {'name': b'n:', 'ingredient': b'i:'}
+
+
+class SnapshotError(ValueError):
+    """Raised for files that are not search snapshots of a supported format"""
+
+
+def _key(field, word):
+    return FIELD_PREFIXES[field] + word.encode('utf-8')
+
+
+def build_snapshot(path, term_model=None):
+    """
+    Write a snapshot of the search term index to `path`; returns (terms, postings).
+
+    The file is written next to `path` and renamed over it, so readers see
+    either the old or the new snapshot, never a partial one.
+    """
+    if term_model is None:
+        from .models import RecipeSearchTerm as term_model
+    # Everything saved before this moment is in the snapshot
+    built_at = time.time()
+    postings = defaultdict(list)
+    rows = term_model.objects.values_list('field', 'term', 'recipe_id')
+    for field, term, recipe_id in rows.iterator(chunk_size=5000):
+        postings[_key(field, term)].append(recipe_id)
+
+    keys = sorted(postings)
+    term_offsets = np.zeros(len(keys) + 1, dtype=UINT32)
+    post_offsets = np.zeros(len(keys) + 1, dtype=UINT32)
+    term_offsets[1:] = np.cumsum([len(key) for key in keys], dtype=np.uint64)
+    post_offsets[1:] = np.cumsum([len(postings[key]) for key in keys], dtype=np.uint64)
+    packed = np.fromiter(
+        (recipe_id for key in keys for recipe_id in sorted(postings[key])),
+        dtype=UINT64, count=int(post_offsets[-1]),
+    )
+    term_bytes = b''.join(keys)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        with os.fdopen(descriptor, 'wb') as handle:
+            handle.write(HEADER.pack(MAGIC, FORMAT, built_at, len(keys), len(packed), len(term_bytes)))
+            handle.write(term_offsets.tobytes())
+            handle.write(post_offsets.tobytes())
+            handle.write(term_bytes)
+            handle.write(packed.tobytes())
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+    return len(keys), len(packed)
+
+
+class SearchSnapshot:
+    """
+    Read-only view of a snapshot file through mmap.
+
+    Arrays are numpy views straight over the mapping, so every worker
+    process that opens the same file shares one copy in the page cache.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as handle:
+            self.stat = os.fstat(handle.fileno())
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise SnapshotError(f'{path} is too short to be a search snapshot')
+        magic, file_format, self.built_at, terms, postings, term_bytes = HEADER.unpack_from(self._map)
+        if magic != MAGIC or file_format != FORMAT:
+            raise SnapshotError(f'{path} is not a format {FORMAT} search snapshot')
+        offset = HEADER.size
+        self.term_offsets = np.frombuffer(self._map, UINT32, terms + 1, offset)
+        offset += self.term_offsets.nbytes
+        self.post_offsets = np.frombuffer(self._map, UINT32, terms + 1, offset)
+        offset += self.post_offsets.nbytes
+        self._terms_start = offset
+        offset += term_bytes
+        self.postings = np.frombuffer(self._map, UINT64, postings, offset)
+        self.term_count = terms
+
+    def _term(self, index):
+        start = self._terms_start + int(self.term_offsets[index])
+        end = self._terms_start + int(self.term_offsets[index + 1])
+        return self._map[start:end]
+
+    def _lower_bound(self, key):
+        """Index of the first term >= key"""
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._term(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _postings(self, start, end):
+        return self.postings[int(self.post_offsets[start]):int(self.post_offsets[end])]
+
+    def lookup(self, field, word, prefix=False):
+        """Sorted recipe ids having `word` (or, with prefix, a word starting with it) in `field`"""
+        key = _key(field, word)
+        start = self._lower_bound(key)
+        if not prefix:
+            if start < self.term_count and self._term(start) == key:
+                return self._postings(start, start + 1)
+            return self.postings[:0]
+        # Every key starting with `key` sorts before key + 0xff
+        end = self._lower_bound(key + b'\xff')
+        return np.unique(self._postings(start, end))
+
+    def matching_ids(self, words, field=None, prefix=False):
+        """Recipe ids matching every word (in `field`, or in name or ingredients)"""
+        ids = None
+        for word in words:
+            fields = [field] if field else list(FIELD_PREFIXES)
+            word_ids = np.unique(np.concatenate([self.lookup(name, word, prefix) for name in fields]))
+            ids = word_ids if ids is None else np.intersect1d(ids, word_ids, assume_unique=True)
+            if not len(ids):
+                break
+        return ids
+
+
+_lock = threading.Lock()
+_state = {'snapshot': None, 'checked_at': 0.0, 'path': None}
+
+
+def current_snapshot():
+    """
+    The newest snapshot at SEARCH_SNAPSHOT_PATH, or None when there is none.
+
+    The file is re-checked at most every SEARCH_SNAPSHOT_CHECK_SECONDS; a
+    rebuilt file is opened and swapped in, and the old mapping is released
+    once the requests still using it are done with it.
+    """
+    path = settings.SEARCH_SNAPSHOT_PATH
+    if not path:
+        return None
+    now = time.monotonic()
+    snapshot = _state['snapshot']
+    if _state['path'] == path and now - _state['checked_at'] < settings.SEARCH_SNAPSHOT_CHECK_SECONDS:
+        return snapshot
+    with _lock:
+        _state['checked_at'] = now
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            _state.update(snapshot=None, path=path)
+            return None
+        snapshot = _state['snapshot']
+        if (_state['path'] != path or snapshot is None
+                or (stat.st_ino, stat.st_mtime_ns) != (snapshot.stat.st_ino, snapshot.stat.st_mtime_ns)):
+            try:
+                snapshot = SearchSnapshot(path)
+            except (OSError, SnapshotError):
+                snapshot = None
+            _state.update(snapshot=snapshot, path=path)
+        return snapshot
@@ -0,0 +1,171 @@
+// Draws the search page charts from the JSON specs made by recipes.charts.render_spec.
+// Same layout as render_svg: a 1000x600 SVG with the matplotlib palette.
+(function () {
+    'use strict';
+
+    var SVG_NS = 'http://www.w3.org/2000/svg';
+    var COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+                  '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'];
+    var WIDTH = 1000;
+    var HEIGHT = 600;
+    var MARGIN_LEFT = 80;
+    var MARGIN_RIGHT = 30;
+    var MARGIN_TOP = 60;
+    var MARGIN_BOTTOM = 130;
+
+    function element(svg, name, attributes, text) {
+        var node = document.createElementNS(SVG_NS, name);
+        Object.keys(attributes).forEach(function (key) {
+            node.setAttribute(key, attributes[key]);
+        });
+        if (text !== undefined) {
+            node.textContent = text;
+        }
+        svg.appendChild(node);
+        return node;
+    }
+
+    function label(svg, x, y, text, size, anchor, transform) {
+        var attributes = {x: x, y: y, 'font-size': size || 14, 'text-anchor': anchor || 'middle'};
+        if (transform) {
+            attributes.transform = transform;
+        }
+        return element(svg, 'text', attributes, text);
+    }
+
+    function niceTicks(maxValue, count) {
+        count = count || 5;
+        if (maxValue <= 0) {
+            return [0, 1];
+        }
+        var rawStep = maxValue / count;
+        var magnitude = Math.pow(10, Math.floor(Math.log10(rawStep)));
+        var step = magnitude;
+        [1, 2, 5, 10].some(function (multiplier) {
+            step = multiplier * magnitude;
+            return step >= rawStep;
+        });
+        step = Math.max(step, 1);
+        var ticks = [];
+        for (var tick = 0; tick < maxValue + step; tick += step) {
+            ticks.push(tick);
+        }
+        return ticks;
+    }
+
+    function axes(svg, ticks, spec, grid) {
+        var plotHeight = HEIGHT - MARGIN_TOP - MARGIN_BOTTOM;
+        var plotRight = WIDTH - MARGIN_RIGHT;
+        var top = ticks[ticks.length - 1];
+        var yPos = function (value) {
+            return MARGIN_TOP + plotHeight - (value / top) * plotHeight;
+        };
+        ticks.forEach(function (tick) {
+            var y = yPos(tick);
+            if (grid) {
+                element(svg, 'line', {x1: MARGIN_LEFT, y1: y, x2: plotRight, y2: y,
+                                      stroke: '#000', 'stroke-opacity': 0.15});
+            }
+            label(svg, MARGIN_LEFT - 8, y + 5, String(tick), 12, 'end');
+        });
+        element(svg, 'path', {d: 'M' + MARGIN_LEFT + ' ' + MARGIN_TOP + 'V' + (MARGIN_TOP + plotHeight) +
+                                 'H' + plotRight, fill: 'none', stroke: '#000'});
+        if (spec.xlabel) {
+            label(svg, (MARGIN_LEFT + plotRight) / 2, HEIGHT - 15, spec.xlabel);
+        }
+        if (spec.ylabel) {
+            var middle = MARGIN_TOP + plotHeight / 2;
+            label(svg, 20, middle, spec.ylabel, 14, 'middle', 'rotate(-90 20 ' + middle + ')');
+        }
+        return yPos;
+    }
+
+    function xLabel(svg, x, text) {
+        var y = HEIGHT - MARGIN_BOTTOM + 18;
+        label(svg, x, y, text, 12, 'end', 'rotate(-45 ' + x + ' ' + y + ')');
+    }
+
+    function bar(svg, spec) {
+        var yPos = axes(svg, niceTicks(Math.max.apply(null, spec.values.concat([0]))), spec, false);
+        var slot = (WIDTH - MARGIN_LEFT - MARGIN_RIGHT) / Math.max(spec.values.length, 1);
+        spec.values.forEach(function (value, index) {
+            var x = MARGIN_LEFT + slot * index + slot * 0.1;
+            element(svg, 'rect', {x: x, y: yPos(value), width: slot * 0.8,
+                                  height: yPos(0) - yPos(value), fill: COLORS[0]});
+            xLabel(svg, x + slot * 0.4, spec.labels[index]);
+        });
+    }
+
+    function pie(svg, spec) {
+        var total = spec.values.reduce(function (sum, value) { return sum + value; }, 0);
+        var cx = WIDTH / 2;
+        var cy = (HEIGHT + MARGIN_TOP) / 2;
+        var radius = Math.min(WIDTH, HEIGHT - MARGIN_TOP) / 2 - 60;
+        // Start at 12 o'clock and go counter-clockwise, as matplotlib's startangle=90
+        var angle = Math.PI / 2;
+        spec.values.forEach(function (value, index) {
+            if (!total || !value) {
+                return;
+            }
+            var sweep = 2 * Math.PI * value / total;
+            var color = COLORS[index % COLORS.length];
+            if (value === total) {
+                element(svg, 'circle', {cx: cx, cy: cy, r: radius, fill: color});
+            } else {
+                var x1 = cx + radius * Math.cos(angle);
+                var y1 = cy - radius * Math.sin(angle);
+                var x2 = cx + radius * Math.cos(angle + sweep);
+                var y2 = cy - radius * Math.sin(angle + sweep);
+                element(svg, 'path', {
+                    d: 'M' + cx + ' ' + cy + 'L' + x1 + ' ' + y1 + 'A' + radius + ' ' + radius + ' 0 ' +
+                       (sweep > Math.PI ? 1 : 0) + ' 0 ' + x2 + ' ' + y2 + 'Z',
+                    fill: color
+                });
+            }
+            var middle = angle + sweep / 2;
+            label(svg, cx + radius * 0.6 * Math.cos(middle), cy - radius * 0.6 * Math.sin(middle) + 5,
+                  (100 * value / total).toFixed(1) + '%');
+            label(svg, cx + radius * 1.1 * Math.cos(middle), cy - radius * 1.1 * Math.sin(middle) + 5,
+                  spec.labels[index], 14, Math.cos(middle) >= 0 ? 'start' : 'end');
+            angle += sweep;
+        });
+    }
+
+    function line(svg, spec) {
+        var yPos = axes(svg, niceTicks(Math.max.apply(null, spec.values.concat([0]))), spec, true);
+        var slot = (WIDTH - MARGIN_LEFT - MARGIN_RIGHT) / Math.max(spec.values.length, 1);
+        var points = spec.values.map(function (value, index) {
+            var x = MARGIN_LEFT + slot * (index + 0.5);
+            xLabel(svg, x, spec.labels[index]);
+            return [x, yPos(value)];
+        });
+        element(svg, 'polyline', {points: points.map(function (point) { return point.join(','); }).join(' '),
+                                  fill: 'none', stroke: COLORS[0], 'stroke-width': 2});
+        points.forEach(function (point) {
+            element(svg, 'circle', {cx: point[0], cy: point[1], r: 4, fill: COLORS[0]});
+        });
+    }
+
+    var RENDERERS = {bar: bar, pie: pie, line: line};
+
+    function render(spec) {
+        var svg = document.createElementNS(SVG_NS, 'svg');
+        svg.setAttribute('viewBox', '0 0 ' + WIDTH + ' ' + HEIGHT);
+        svg.setAttribute('font-family', 'sans-serif');
+        svg.setAttribute('role', 'img');
+        element(svg, 'rect', {width: WIDTH, height: HEIGHT, fill: '#fff'});
+        if (spec.title) {
+            label(svg, WIDTH / 2, 35, spec.title, 20);
+        }
+        RENDERERS[spec.type](svg, spec);
+        return svg;
+    }
+
+    document.querySelectorAll('[data-chart-spec]').forEach(function (container) {
+        var source = document.getElementById(container.getAttribute('data-chart-spec'));
+        var spec = source && JSON.parse(source.textContent);
+        if (spec && RENDERERS[spec.type]) {
+            container.appendChild(render(spec));
+        }
+    });
+})();
@@ -0,0 +1,120 @@
+from django.db import transaction
+from django.db.models import Q, Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+DIFFICULTY_FIELDS = {
+    'Easy': 'easy_count',
+    'Medium': 'medium_count',
+    'Intermediate': 'intermediate_count',
+    'Hard': 'hard_count',
+}
+
+
+def _stats_model():
+    from .models import RecipeDailyStats
+    return RecipeDailyStats
+
+
+def _day_for(created_at):
+    """Date bucket for a recipe's creation timestamp"""
+    if timezone.is_aware(created_at):
+        return timezone.localdate(created_at)
+    return created_at.date()
+
+
+def record_recipe_added(recipe, delta=1):
+    """Add (or with delta=-1, remove) one recipe from the daily rollup"""
+    RecipeDailyStats = _stats_model()
+    day = _day_for(recipe.created_at)
+    field = DIFFICULTY_FIELDS.get(recipe.difficulty)
+
+    with transaction.atomic():
+        if not RecipeDailyStats.objects.filter(date=day).exists():
+            # A new day starts from the running total of the day before it
+            previous = (
+                RecipeDailyStats.objects.filter(date__lt=day)
+                .order_by('-date')
+                .values_list('cumulative_total', flat=True)
+                .first()
+            )
+            RecipeDailyStats.objects.get_or_create(
+                date=day, defaults={'cumulative_total': previous or 0}
+            )
+
+        updates = {'recipe_count': F('recipe_count') + delta}
+        if field:
+            updates[field] = F(field) + delta
+        RecipeDailyStats.objects.filter(date=day).update(**updates)
+        RecipeDailyStats.objects.filter(date__gte=day).update(
+            cumulative_total=F('cumulative_total') + delta
+        )
+        RecipeDailyStats.objects.filter(date=day, recipe_count__lte=0).delete()
+
+
+def record_recipe_removed(recipe):
+    """Remove one recipe from the daily rollup"""
+    record_recipe_added(recipe, delta=-1)
+
+
+def record_difficulty_change(recipe, old_difficulty):
+    """Move one recipe between difficulty counters on its creation day"""
+    old_field = DIFFICULTY_FIELDS.get(old_difficulty)
+    new_field = DIFFICULTY_FIELDS.get(recipe.difficulty)
+    if old_field == new_field:
+        return
+
+    updates = {}
+    if old_field:
+        updates[old_field] = F(old_field) - 1
+    if new_field:
+        updates[new_field] = F(new_field) + 1
+    _stats_model().objects.filter(date=_day_for(recipe.created_at)).update(**updates)
+
+
+def rebuild_daily_stats(recipe_model=None, stats_model=None):
+    """
+    Recompute the whole rollup table from the Recipe table.
+
+    Runs one grouped aggregate over recipes, then replaces every rollup
+    row. Returns the number of rows written.
+    """
+    if recipe_model is None:
+        from .models import Recipe as recipe_model
+    if stats_model is None:
+        stats_model = _stats_model()
+
+    aggregates = {'recipe_count': Count('pk')}
+    for difficulty, field in DIFFICULTY_FIELDS.items():
+        aggregates[field] = Count('pk', filter=Q(difficulty=difficulty))
+
+    days = (
+        recipe_model.objects.annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(**aggregates)
+        .order_by('day')
+    )
+
+    rows = []
+    running_total = 0
+    for day in days:
+        running_total += day['recipe_count']
+        rows.append(stats_model(
+            date=day['day'],
+            cumulative_total=running_total,
+            **{key: day[key] for key in aggregates}
+        ))
+
+    with transaction.atomic():
+        stats_model.objects.all().delete()
+        stats_model.objects.bulk_create(rows)
+    return len(rows)
+
+
+def get_growth_chart_data():
+    """Cumulative recipe totals per day, read from the rollup table"""
+    rows = _stats_model().objects.order_by('date').values_list('date', 'cumulative_total')
+    return {
+        'labels': [day.strftime('%Y-%m-%d') for day, total in rows],
+        'values': [total for day, total in rows],
+    }
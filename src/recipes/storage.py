@@ -0,0 +1,19 @@
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class RecipeStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    WhiteNoise's compressed, hashed storage that tolerates a missing collectstatic.
+
+    When WHITENOISE_MANIFEST_STRICT is False (debug runs and tests) and a file
+    has not been collected yet, `{% static %}` falls back to the plain file
+    name instead of raising.
+    """
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if self.manifest_strict:
+                raise
+            return name
@@ -0,0 +1,47 @@
+from itertools import islice
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+
+STREAM_MARKER = '<!-- stream -->'
+
+
+def streaming_requested(request):
+    """True if the page should be streamed (setting, or ?stream=1 to override it)"""
+    value = request.GET.get('stream')
+    if value is None:
+        return settings.RECIPE_STREAMING
+    return value not in ('', '0', 'false', 'off')
+
+
+def stream_template(request, template_name, context, items, item_template, items_key='recipes'):
+    """
+    Stream a page whose main list is rendered in chunks.
+
+    The page template is rendered once with the first chunk of `items` and
+    split at `{{ stream_marker }}`. Everything before the marker (the page
+    head and first chunk) is sent immediately, the remaining items follow
+    in chunks rendered with `item_template`, and the rest of the page last.
+    Pages that leave the marker out (empty lists) are sent as a normal response.
+    """
+    chunk_size = settings.RECIPE_STREAM_CHUNK_SIZE
+    iterator = iter(items)
+    context = dict(context)
+    context[items_key] = list(islice(iterator, chunk_size))
+    context['stream_marker'] = STREAM_MARKER
+    page = render_to_string(template_name, context, request)
+    if STREAM_MARKER not in page:
+        return HttpResponse(page)
+    head, tail = page.split(STREAM_MARKER, 1)
+    item_template = get_template(item_template)
+
+    def content():
+        yield head
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                break
+            yield item_template.render({items_key: chunk})
+        yield tail
+
+    return StreamingHttpResponse(content())
@@ -1,8 +1,49 @@
-from django.test import TestCase, Client
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.test import TestCase, Client, override_settings, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, IntegrityError
 from django.urls import reverse
 from django.contrib.auth.models import User
-from .models import Recipe
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.utils import timezone
+from .models import Recipe, RecipeDailyStats, RecipeSearchTerm, RecipeSimilarity, RecipeDeletion
 from .forms import LoginForm, SignupForm, RecipeSearchForm
+from .admin import EstimatedCountPaginator
+from .api import encode_cursor
+from .backends import CachedModelBackend
+from .cache import detail_cache_key
+from .charts import render_svg, render_spec, FigurePool, render_png
+from .duplicates import shingles, minhash, find_duplicate_clusters, merge_cluster
+from .facets import get_facet_counts, FACET_CACHE_VERSION_KEY
+from .memory import reset_memory_stats, memory_report
+from .middleware import negotiate_encoding, brotli, gzip_stream
+from .profiling import Sampler, save_profile
+from .query import compile_query, QuerySyntaxError
+from .ratelimit import SlidingWindowLimiter
+from .routers import ReplicaRouter, read_from_replica, PrimaryPinningMiddleware, PIN_SESSION_KEY, _use_replica
+from .search import edit_distance, fuzzy_terms
+from .signals import apply_sqlite_pragmas
+from .similarity import similar_recipes, build_similarity_index, neighbour_scores, BUCKET_WINDOW
+from .singleflight import get_or_compute, should_refresh
+from .snapshot import build_snapshot, SearchSnapshot, SnapshotError, current_snapshot
+from .stats import rebuild_daily_stats
+from .views import with_detail_urls
+from .warmup import warm_template_cache
 
 class RecipeModelTest(TestCase):
     """Test Recipe model"""
@@ -130,7 +171,9 @@ class RecipeFormTest(TestCase):
             'password1': 'testpass123',
             'password2': 'testpass123'
         })
-        self.assertFalse(form.is_valid())
+        # The unique constraint catches the duplicate when the user is saved
+        self.assertTrue(form.is_valid())
+        self.assertIsNone(form.save())
         self.assertIn('username', form.errors)
     
     def test_signup_form_email_optional(self):
@@ -647,4 +690,1429 @@ class RecipeURLsTest(TestCase):
     def test_detail_url_resolves(self):
         """Test detail URL resolves correctly"""
         url = reverse('recipes:detail', args=[1])
-        self.assertEqual(url, '/detail/1/')
\ No newline at end of file
+        self.assertEqual(url, '/detail/1/')
+
+@override_settings(RECIPE_VIEW_CACHE=True)
+class RecipeFacetTest(TestCase):
+    """Test search facet counts"""
+    
+    def setUp(self):
+        """Set up test client, user, and recipes across difficulties"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpassword123'
+        )
+        Recipe.objects.create(name='Quick Salad', ingredients='lettuce, tomato', cooking_time=5)
+        Recipe.objects.create(name='Pasta Carbonara', ingredients='pasta, eggs, bacon, cheese', cooking_time=20)
+        Recipe.objects.create(name='Chicken Soup', ingredients='chicken, carrots, onions', cooking_time=45)
+    
+    def test_facet_counts_single_query(self):
+        """Test all facet counts are computed in one query"""
+        with self.assertNumQueries(1):
+            counts = get_facet_counts(Recipe.objects.all())
+        self.assertEqual(counts['difficulty'][''], 3)
+        self.assertEqual(counts['difficulty']['Easy'], 1)
+        self.assertEqual(counts['difficulty']['Intermediate'], 1)
+        self.assertEqual(counts['cooking_time']['10'], 1)
+        self.assertEqual(counts['cooking_time']['30'], 2)
+    
+    def test_facet_counts_respect_other_filters(self):
+        """Test each facet is counted with the other facet's selection applied"""
+        counts = get_facet_counts(Recipe.objects.all(), cooking_time='10')
+        self.assertEqual(counts['difficulty'][''], 1)
+        self.assertEqual(counts['difficulty']['Medium'], 0)
+        # The cooking time facet itself ignores the selected cooking time
+        self.assertEqual(counts['cooking_time'][''], 3)
+    
+    def test_facet_counts_cached(self):
+        """Test facet counts are cached per filter combination"""
+        get_facet_counts(Recipe.objects.all(), difficulty='Easy')
+        with self.assertNumQueries(0):
+            get_facet_counts(Recipe.objects.all(), difficulty='Easy')
+    
+    def test_facet_cache_key_safe_for_free_text(self):
+        """Test names and ingredients with spaces or symbols give short, memcached-safe keys"""
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            get_facet_counts(Recipe.objects.all(), recipe_name='pasta  bake ' * 30, ingredient='eggs|bacon\n')
+    
+    def test_facet_cache_invalidated_on_save(self):
+        """Test saving a recipe refreshes the cached counts"""
+        get_facet_counts(Recipe.objects.all())
+        Recipe.objects.create(name='Toast', ingredients='bread', cooking_time=3)
+        counts = get_facet_counts(Recipe.objects.all())
+        self.assertEqual(counts['difficulty']['Easy'], 2)
+    
+    def test_search_page_shows_facet_counts(self):
+        """Test counts are shown next to each dropdown option"""
+        self.client.login(username='testuser', password='testpassword123')
+        response = self.client.get(reverse('recipes:search'), {'recipe_name': 'pasta'})
+        self.assertContains(response, 'Intermediate (1)')
+        self.assertContains(response, 'Easy (0)')
+
+
+class RecipeDailyStatsTest(TestCase):
+    """Test the incrementally maintained daily statistics"""
+    
+    def test_stats_updated_on_create(self):
+        """Test creating recipes updates the day's counters"""
+        Recipe.objects.create(name='Toast', ingredients='bread', cooking_time=3)
+        Recipe.objects.create(name='Stew', ingredients='beef, carrots, onions, potatoes', cooking_time=90)
+        stats = RecipeDailyStats.objects.get()
+        self.assertEqual(stats.recipe_count, 2)
+        self.assertEqual(stats.cumulative_total, 2)
+        self.assertEqual(stats.easy_count, 1)
+        self.assertEqual(stats.hard_count, 1)
+    
+    def test_stats_updated_on_difficulty_change(self):
+        """Test re-grading a recipe moves it between difficulty counters"""
+        recipe = Recipe.objects.create(name='Toast', ingredients='bread', cooking_time=3)
+        recipe.cooking_time = 15
+        recipe.save()
+        stats = RecipeDailyStats.objects.get()
+        self.assertEqual(stats.easy_count, 0)
+        self.assertEqual(stats.medium_count, 1)
+        self.assertEqual(stats.recipe_count, 1)
+    
+    def test_stats_updated_on_delete(self):
+        """Test deleting recipes decrements totals and drops empty days"""
+        recipe = Recipe.objects.create(name='Toast', ingredients='bread', cooking_time=3)
+        Recipe.objects.create(name='Salad', ingredients='lettuce', cooking_time=2)
+        recipe.delete()
+        self.assertEqual(RecipeDailyStats.objects.get().cumulative_total, 1)
+        Recipe.objects.all().delete()
+        self.assertFalse(RecipeDailyStats.objects.exists())
+    
+    def test_cumulative_totals_across_days(self):
+        """Test cumulative totals carry over and match a full rebuild"""
+        older = Recipe.objects.create(name='Old', ingredients='bread', cooking_time=3)
+        Recipe.objects.filter(pk=older.pk).update(created_at=timezone.now() - timedelta(days=2))
+        rebuild_daily_stats()
+        Recipe.objects.create(name='New', ingredients='eggs', cooking_time=3)
+        incremental = list(RecipeDailyStats.objects.values_list('date', 'recipe_count', 'cumulative_total'))
+        self.assertEqual([row[2] for row in incremental], [1, 2])
+        rebuild_daily_stats()
+        rebuilt = list(RecipeDailyStats.objects.values_list('date', 'recipe_count', 'cumulative_total'))
+        self.assertEqual(incremental, rebuilt)
+    
+    def test_rebuild_stats_command(self):
+        """Test the rebuild_stats management command"""
+        Recipe.objects.create(name='Toast', ingredients='bread', cooking_time=3)
+        RecipeDailyStats.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_stats', stdout=out)
+        self.assertIn('1 day', out.getvalue())
+        self.assertEqual(RecipeDailyStats.objects.get().cumulative_total, 1)
+
+
+class RecipeChartFormatTest(TestCase):
+    """Test the alternative chart backends"""
+    
+    def setUp(self):
+        """Set up test client, user, and a recipe to chart"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpassword123'
+        )
+        Recipe.objects.create(name='Quick Salad', ingredients='lettuce, tomato', cooking_time=5)
+        self.client.login(username='testuser', password='testpassword123')
+    
+    def test_render_svg(self):
+        """Test SVG output for every chart kind"""
+        data = {'labels': ['Easy', '<Hard>'], 'values': [2, 1]}
+        for chart_type in ('bar', 'pie', 'line'):
+            svg = render_svg(chart_type, data, title='Title')
+            self.assertTrue(svg.startswith('<svg'))
+            self.assertIn('&lt;Hard&gt;', svg)
+    
+    def test_render_spec(self):
+        """Test JSON spec output"""
+        spec = render_spec('bar', {'labels': ['Easy'], 'values': [3]}, title='Title')
+        self.assertEqual(spec['type'], 'bar')
+        self.assertEqual(spec['values'], [3])
+    
+    def test_search_svg_charts(self):
+        """Test charts are inlined as SVG when requested"""
+        response = self.client.get(reverse('recipes:search'), {'show_chart': 'on', 'chart_format': 'svg'})
+        self.assertContains(response, '<svg', count=3)
+        self.assertNotContains(response, 'data:image/png')
+    
+    def test_search_json_charts(self):
+        """Test charts are embedded as JSON specs when requested"""
+        response = self.client.get(reverse('recipes:search'), {'show_chart': 'on', 'chart_format': 'json'})
+        self.assertContains(response, 'application/json', count=3)
+        self.assertContains(response, 'recipes/js/charts.js', count=1)
+    
+    def test_svg_charts_skip_renderer(self):
+        """Test the client-side chart renderer is only loaded for JSON specs"""
+        response = self.client.get(reverse('recipes:search'), {'show_chart': 'on', 'chart_format': 'svg'})
+        self.assertNotContains(response, 'recipes/js/charts.js')
+
+    def test_search_unknown_format_uses_png(self):
+        """Test unknown chart formats fall back to matplotlib PNG"""
+        response = self.client.get(reverse('recipes:search'), {'show_chart': 'on', 'chart_format': 'gif'})
+        self.assertContains(response, 'data:image/png', count=3)
+
+
+class FigurePoolTest(TestCase):
+    """Test the per-thread matplotlib figure pool"""
+    
+    def test_figure_reused_within_thread(self):
+        """Test the same thread gets the same figure back"""
+        pool = FigurePool()
+        with pool.acquire() as (figure, axes):
+            axes.plot([1, 2], [3, 4])
+        with pool.acquire() as (second_figure, second_axes):
+            self.assertIs(second_figure, figure)
+            self.assertEqual(len(second_axes.lines), 0)
+    
+    def test_separate_figures_per_thread(self):
+        """Test each thread gets its own figure"""
+        pool = FigurePool()
+        figures = []
+        
+        def grab():
+            with pool.acquire() as (figure, axes):
+                figures.append(figure)
+        
+        threads = [threading.Thread(target=grab) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIsNot(figures[0], figures[1])
+    
+    def test_reused_figure_renders_identically(self):
+        """Test a pie chart does not leak state into the next render"""
+        data = {'labels': ['Easy', 'Hard'], 'values': [2, 1]}
+        pool = FigurePool()
+        first = render_png('bar', data, pool=pool, title='Bar')
+        render_png('pie', data, pool=pool, title='Pie')
+        self.assertEqual(render_png('bar', data, pool=pool, title='Bar'), first)
+
+
+@override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    AUTHENTICATION_BACKENDS=['recipes.backends.CachedModelBackend'],
+    RECIPE_VIEW_CACHE=True,
+)
+class CachedSessionTest(TestCase):
+    """Test cached sessions and cached user loading (enabled with a shared cache)"""
+    
+    def setUp(self):
+        """Set up test client, user and recipe"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpassword123'
+        )
+        self.recipe = Recipe.objects.create(name='Toast', ingredients='bread', cooking_time=3)
+        self.client.login(username='testuser', password='testpassword123')
+    
+    def test_detail_view_skips_session_and_user_queries(self):
+        """Test an authenticated request runs no queries once caches are warm"""
+        url = reverse('recipes:detail', args=[self.recipe.pk])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_cached_user_invalidated_on_save(self):
+        """Test saving a user drops the cached copy"""
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(backend.get_user(self.user.pk))
+
+
+class SQLiteTuningTest(TestCase):
+    """Test the opt-in SQLite pragma hook"""
+    
+    def test_pragmas_applied_on_connect(self):
+        """Test configured pragmas are run on every new connection"""
+        connection = mock.MagicMock(vendor='sqlite')
+        cursor = connection.cursor.return_value.__enter__.return_value
+        with override_settings(SQLITE_PRAGMAS={'synchronous': 'NORMAL', 'busy_timeout': 5000}):
+            apply_sqlite_pragmas(sender=None, connection=connection)
+        cursor.execute.assert_any_call('PRAGMA synchronous = NORMAL')
+        cursor.execute.assert_any_call('PRAGMA busy_timeout = 5000')
+    
+    def test_pragmas_skipped_when_disabled(self):
+        """Test nothing runs when tuning is off or the database is not SQLite"""
+        connection = mock.MagicMock(vendor='postgresql')
+        with override_settings(SQLITE_PRAGMAS={'synchronous': 'NORMAL'}):
+            apply_sqlite_pragmas(sender=None, connection=connection)
+        connection.cursor.assert_not_called()
+
+
+class ReplicaRoutingTest(TestCase):
+    """Test read-replica routing for recipe read views"""
+    
+    replica_databases = {
+        'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'primary.sqlite3'},
+        'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'replica.sqlite3'},
+    }
+    
+    def test_reads_use_primary_outside_read_views(self):
+        """Test reads default to the primary"""
+        with override_settings(DATABASES=self.replica_databases):
+            self.assertEqual(ReplicaRouter().db_for_read(Recipe), 'default')
+    
+    def test_read_view_uses_replica(self):
+        """Test reads inside a read view go to the replica, writes to the primary"""
+        router = ReplicaRouter()
+        seen = {}
+        
+        @read_from_replica
+        def view(request):
+            seen['read'] = router.db_for_read(Recipe)
+            seen['write'] = router.db_for_write(Recipe)
+        
+        request = RequestFactory().get('/list/')
+        request.session = {}
+        with override_settings(DATABASES=self.replica_databases):
+            view(request)
+        self.assertEqual(seen, {'read': 'replica', 'write': 'default'})
+    
+    def test_session_pinned_after_write(self):
+        """Test a session reads from the primary shortly after a write request"""
+        router = ReplicaRouter()
+        seen = {}
+        
+        @read_from_replica
+        def view(request):
+            seen['read'] = router.db_for_read(Recipe)
+        
+        session = {}
+        post = RequestFactory().post('/login/')
+        post.session = session
+        get = RequestFactory().get('/list/')
+        get.session = session
+        with override_settings(DATABASES=self.replica_databases, REPLICA_PIN_SECONDS=60):
+            PrimaryPinningMiddleware(lambda request: HttpResponse())(post)
+            view(get)
+        self.assertEqual(seen['read'], 'default')
+    
+    def test_no_replica_configured(self):
+        """Test read views use the primary when no replica is configured"""
+        self.client.force_login(User.objects.create_user(username='testuser', password='pw'))
+        response = self.client.get(reverse('recipes:list'))
+        self.assertEqual(response.status_code, 200)
+
+
+class StaticStylesTest(TestCase):
+    """Test page styles are served as static files"""
+    
+    def test_pages_link_stylesheets(self):
+        """Test pages link their stylesheets instead of inlining them"""
+        response = self.client.get(reverse('recipes:home'))
+        self.assertContains(response, 'recipes/css/base')
+        self.assertContains(response, 'recipes/css/recipes_home')
+        self.assertNotContains(response, '<style>')
+
+
+class CompressionAndStreamingTest(TestCase):
+    """Test response compression and streamed recipe pages"""
+    
+    def setUp(self):
+        """Set up test client, user, and enough recipes for several chunks"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpassword123'
+        )
+        for index in range(7):
+            Recipe.objects.create(name=f'Recipe {index}', ingredients='eggs, milk', cooking_time=5 + index)
+        self.client.login(username='testuser', password='testpassword123')
+    
+    def test_negotiate_encoding(self):
+        """Test Accept-Encoding negotiation"""
+        self.assertEqual(negotiate_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(negotiate_encoding('br;q=0, gzip'), 'gzip')
+        self.assertIsNone(negotiate_encoding('identity'))
+    
+    def test_gzip_response(self):
+        """Test large pages are gzipped when the client accepts it"""
+        response = self.client.get(reverse('recipes:list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'Recipe 6', gzip.decompress(response.content))
+    
+    def test_brotli_response(self):
+        """Test Brotli is preferred for non-HTML responses when installed and accepted"""
+        if brotli is None:
+            self.skipTest('brotli is not installed')
+        response = self.client.get(reverse('recipes:api_list'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn(b'Recipe 6', brotli.decompress(response.content))
+    
+    def test_html_never_brotli(self):
+        """Test HTML pages are gzipped with random header padding even when Brotli is accepted"""
+        response = self.client.get(reverse('recipes:list'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response.content[3] & gzip.FNAME)
+        self.assertIn(b'Recipe 6', gzip.decompress(response.content))
+    
+    def test_streamed_gzip_padded(self):
+        """Test streamed gzip carries the same random header padding"""
+        data = b''.join(gzip_stream([b'first ', b'second'], max_random_bytes=100))
+        self.assertTrue(data[3] & gzip.FNAME)
+        self.assertEqual(gzip.decompress(data), b'first second')
+    
+    def test_streamed_empty_results(self):
+        """Test streaming an empty list or search falls back to a normal page"""
+        Recipe.objects.all().delete()
+        response = self.client.get(reverse('recipes:list'), {'stream': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        response = self.client.get(reverse('recipes:search'), {'recipe_name': 'zzz', 'stream': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+    
+    def test_small_response_not_compressed(self):
+        """Test responses under the minimum size are sent as is"""
+        with override_settings(RESPONSE_COMPRESSION_MIN_SIZE=10 ** 6):
+            response = self.client.get(reverse('recipes:list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+    
+    def test_streamed_recipe_list(self):
+        """Test the streamed list sends the head first and every card in chunks"""
+        with override_settings(RECIPE_STREAM_CHUNK_SIZE=3):
+            response = self.client.get(reverse('recipes:list'), {'stream': '1'})
+            chunks = [chunk.decode('utf-8') for chunk in response.streaming_content]
+        self.assertTrue(response.streaming)
+        self.assertIn('<head>', chunks[0])
+        self.assertEqual(len(chunks), 4)
+        page = ''.join(chunks)
+        self.assertEqual(page.count('class="recipe-card"'), 7)
+        self.assertTrue(page.rstrip().endswith('</html>'))
+    
+    def test_streamed_gzip_decompresses(self):
+        """Test streamed pages are compressed chunk by chunk"""
+        response = self.client.get(reverse('recipes:search'), {'recipe_name': 'Recipe', 'stream': '1'},
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        page = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8')
+        self.assertEqual(page.count('class="recipe-link"'), 7)
+
+
+class TemplateWarmupTest(TestCase):
+    """Test template warm-up and precomputed detail URLs"""
+    
+    def test_warm_template_cache(self):
+        """Test every recipe template compiles during warm-up"""
+        names = warm_template_cache()
+        self.assertIn('recipes/recipe_list.html', names)
+        self.assertIn('recipes/_recipe_cards.html', names)
+    
+    def test_with_detail_urls(self):
+        """Test precomputed detail URLs match reverse()"""
+        recipe = Recipe.objects.create(name='Toast', ingredients='bread', cooking_time=3)
+        (result,) = with_detail_urls([recipe])
+        self.assertEqual(result.detail_url, reverse('recipes:detail', args=[recipe.pk]))
+
+
+class LoginThrottleTest(TestCase):
+    """Test login brute-force throttling"""
+    
+    def setUp(self):
+        """Set up test client and user with a clean cache"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpassword123'
+        )
+    
+    def test_sliding_window_counts(self):
+        """Test the previous window is weighted by its remaining overlap"""
+        limiter = SlidingWindowLimiter('test', limit=3, window=100)
+        for _ in range(4):
+            limiter.hit('key', now=1050)
+        self.assertTrue(limiter.is_limited('key', now=1099))
+        # Halfway through the next window, half of the old hits still count
+        self.assertEqual(limiter.count('key', now=1150), 2)
+        self.assertFalse(limiter.is_limited('key', now=1150))
+    
+    def test_throttled_before_authenticate(self):
+        """Test throttled logins are rejected without running authenticate"""
+        data = {'username': 'testuser', 'password': 'wrong'}
+        with override_settings(LOGIN_RATE_LIMIT_PER_USERNAME=2):
+            self.client.post(reverse('recipes:login'), data)
+            self.client.post(reverse('recipes:login'), data)
+            with mock.patch('recipes.views.authenticate') as authenticate:
+                response = self.client.post(reverse('recipes:login'), {
+                    'username': 'testuser', 'password': 'testpassword123'
+                })
+        self.assertEqual(response.status_code, 429)
+        authenticate.assert_not_called()
+    
+    def test_throttled_by_ip(self):
+        """Test failures across usernames from one IP are throttled"""
+        with override_settings(LOGIN_RATE_LIMIT_PER_IP=2):
+            self.client.post(reverse('recipes:login'), {'username': 'a', 'password': 'x'})
+            self.client.post(reverse('recipes:login'), {'username': 'b', 'password': 'x'})
+            response = self.client.post(reverse('recipes:login'), {'username': 'c', 'password': 'x'})
+        self.assertEqual(response.status_code, 429)
+    
+    def test_success_resets_username_failures(self):
+        """Test a successful login clears earlier failures for that username"""
+        with override_settings(LOGIN_RATE_LIMIT_PER_USERNAME=2):
+            self.client.post(reverse('recipes:login'), {'username': 'testuser', 'password': 'wrong'})
+            self.client.post(reverse('recipes:login'), {'username': 'testuser', 'password': 'testpassword123'})
+            self.client.logout()
+            self.client.post(reverse('recipes:login'), {'username': 'testuser', 'password': 'wrong'})
+            response = self.client.post(reverse('recipes:login'), {
+                'username': 'testuser', 'password': 'testpassword123'
+            })
+        self.assertEqual(response.status_code, 302)
+
+
+class SignupUsernameTest(TestCase):
+    """Test race-free signup and the username availability endpoint"""
+    
+    def setUp(self):
+        """Set up test client and an existing user with a clean cache"""
+        cache.clear()
+        self.client = Client()
+        User.objects.create_user(username='taken', password='testpassword123')
+    
+    def test_signup_skips_existence_query(self):
+        """Test signup validates without a separate username lookup"""
+        form = SignupForm(data={'username': 'fresh', 'password1': 'pw12345678', 'password2': 'pw12345678'})
+        with self.assertNumQueries(0):
+            self.assertTrue(form.is_valid())
+    
+    def test_signup_integrity_error_is_form_error(self):
+        """Test a concurrent duplicate shows a form error instead of a 500"""
+        with mock.patch.object(User.objects, 'create_user', side_effect=IntegrityError):
+            response = self.client.post(reverse('recipes:signup'), {
+                'username': 'racer', 'password1': 'pw12345678', 'password2': 'pw12345678'
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'already taken')
+    
+    def test_check_username(self):
+        """Test the endpoint reports taken and free names"""
+        url = reverse('recipes:check_username')
+        self.assertFalse(self.client.get(url, {'username': 'taken'}).json()['available'])
+        self.assertTrue(self.client.get(url, {'username': 'free'}).json()['available'])
+    
+    def test_check_username_cached_and_invalidated(self):
+        """Test answers are cached and refreshed when the name is claimed"""
+        url = reverse('recipes:check_username')
+        self.client.get(url, {'username': 'newname'})
+        with self.assertNumQueries(0):
+            self.assertTrue(self.client.get(url, {'username': 'newname'}).json()['available'])
+        User.objects.create_user(username='newname', password='testpassword123')
+        self.assertFalse(self.client.get(url, {'username': 'newname'}).json()['available'])
+
+
+class PasswordHasherProfileTest(TestCase):
+    """Test configurable password hashing and rehash on login"""
+    
+    def setUp(self):
+        """Set up test client with a clean cache"""
+        cache.clear()
+        self.client = Client()
+    
+    def test_hash_upgraded_on_login(self):
+        """Test logging in re-hashes a password made with an older iteration count"""
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=1000):
+            user = User.objects.create_user(username='cook', password='testpassword123')
+        self.assertIn('$1000$', user.password)
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            response = self.client.post(reverse('recipes:login'), {
+                'username': 'cook', 'password': 'testpassword123'
+            })
+        self.assertEqual(response.status_code, 302)
+        user.refresh_from_db()
+        self.assertIn('$2000$', user.password)
+    
+    def test_hash_upgraded_to_new_profile(self):
+        """Test logging in moves a hash from another algorithm to the current profile"""
+        user = User.objects.create(
+            username='cook', password=make_password('testpassword123', hasher='pbkdf2_sha1')
+        )
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=1000):
+            self.client.post(reverse('recipes:login'), {'username': 'cook', 'password': 'testpassword123'})
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+
+class RecipeAdminChangelistTest(TestCase):
+    """Test the admin recipe list's word-index search, counts and bulk re-grading"""
+    
+    def setUp(self):
+        """Set up a superuser and a few recipes"""
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='admin', password='testpassword123')
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.pasta = Recipe.objects.create(
+            name='Tomato Pasta', ingredients='pasta, tomato, garlic', cooking_time=20, description='Boil'
+        )
+        self.salad = Recipe.objects.create(
+            name='Green Salad', ingredients='lettuce, cucumber', cooking_time=5, description='Toss'
+        )
+    
+    def test_search_terms_indexed_on_save(self):
+        """Test saving a recipe replaces its indexed words"""
+        terms = set(self.pasta.search_terms.values_list('field', 'term'))
+        self.assertIn(('name', 'tomato'), terms)
+        self.assertIn(('ingredient', 'garlic'), terms)
+        self.pasta.ingredients = 'pasta, basil'
+        self.pasta.save()
+        self.assertFalse(RecipeSearchTerm.objects.filter(recipe=self.pasta, term='garlic').exists())
+    
+    def test_admin_search_uses_word_index(self):
+        """Test every search word must prefix a name or ingredient word"""
+        url = reverse('admin:recipes_recipe_changelist')
+        response = self.client.get(url, {'q': 'tom garl'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.pasta])
+        response = self.client.get(url, {'q': 'cucumber tomato'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+        response = self.client.get(url, {'q': 'boil'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+    
+    def test_changelist_loads_only_listed_columns(self):
+        """Test the changelist defers columns it does not display"""
+        response = self.client.get(reverse('admin:recipes_recipe_changelist'))
+        recipe = response.context['cl'].result_list[0]
+        self.assertIn('ingredients', recipe.get_deferred_fields())
+    
+    def test_estimated_count_for_large_unfiltered_list(self):
+        """Test the paginator uses the row estimate only above the threshold and unfiltered"""
+        with mock.patch('recipes.admin.estimated_row_count', return_value=50000), \
+                override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=10000):
+            self.assertEqual(EstimatedCountPaginator(Recipe.objects.order_by('pk'), 100).count, 50000)
+            filtered = Recipe.objects.filter(difficulty='Easy').order_by('pk')
+            self.assertEqual(EstimatedCountPaginator(filtered, 100).count, 1)
+        with mock.patch('recipes.admin.estimated_row_count', return_value=500):
+            self.assertEqual(EstimatedCountPaginator(Recipe.objects.order_by('pk'), 100).count, 2)
+    
+    def test_recompute_difficulty_action(self):
+        """Test the bulk action fixes stale difficulties and the daily rollup"""
+        Recipe.objects.filter(pk=self.pasta.pk).update(difficulty='Hard')
+        Recipe.objects.filter(pk=self.salad.pk).update(difficulty='Hard')
+        response = self.client.post(reverse('admin:recipes_recipe_changelist'), {
+            'action': 'recompute_difficulty',
+            '_selected_action': [self.pasta.pk, self.salad.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.pasta.refresh_from_db()
+        self.salad.refresh_from_db()
+        self.assertEqual(self.pasta.difficulty, 'Medium')
+        self.assertEqual(self.salad.difficulty, 'Easy')
+        day = RecipeDailyStats.objects.get()
+        self.assertEqual((day.easy_count, day.medium_count, day.hard_count), (1, 1, 0))
+    
+    @override_settings(RECIPE_VIEW_CACHE=True)
+    def test_recompute_difficulty_drops_detail_cache(self):
+        """Test the bulk action drops the cached detail pages it makes stale"""
+        Recipe.objects.filter(pk=self.pasta.pk).update(difficulty='Hard')
+        self.client.get(reverse('recipes:detail', args=[self.pasta.pk]))
+        self.assertIsNotNone(cache.get(detail_cache_key(self.pasta.pk)))
+        self.client.post(reverse('admin:recipes_recipe_changelist'), {
+            'action': 'recompute_difficulty',
+            '_selected_action': [self.pasta.pk],
+        })
+        self.assertIsNone(cache.get(detail_cache_key(self.pasta.pk)))
+    
+    def test_recompute_difficulty_refreshes_neighbours_in_batches(self):
+        """Test the bulk action rescores the changed recipes and the lists holding them"""
+        garlic = Recipe.objects.create(
+            name='Garlic Pasta', ingredients='pasta, garlic', cooking_time=20, description='Boil'
+        )
+        RecipeSimilarity.objects.update(score=0)
+        Recipe.objects.filter(pk__in=[self.pasta.pk, self.salad.pk]).update(difficulty='Hard')
+        with mock.patch('recipes.admin.BULK_ACTION_BATCH', 1):
+            self.client.post(reverse('admin:recipes_recipe_changelist'), {
+                'action': 'recompute_difficulty',
+                '_selected_action': [self.pasta.pk, self.salad.pk],
+            })
+        self.assertEqual(Recipe.objects.get(pk=self.salad.pk).difficulty, 'Easy')
+        self.assertGreater(RecipeSimilarity.objects.get(recipe=self.pasta, similar=garlic).score, 0)
+        self.assertGreater(RecipeSimilarity.objects.get(recipe=garlic, similar=self.pasta).score, 0)
+
+
+class RecipeSimilarityTest(TestCase):
+    """Test the precomputed similar recipes index"""
+    
+    def setUp(self):
+        """Set up a logged-in user and recipes with overlapping ingredients"""
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword123')
+        self.carbonara = Recipe.objects.create(
+            name='Carbonara', ingredients='pasta, egg, bacon, cheese', cooking_time=20, description='Mix'
+        )
+        self.cacio = Recipe.objects.create(
+            name='Cacio e Pepe', ingredients='pasta, cheese, pepper', cooking_time=15, description='Toss'
+        )
+        self.omelette = Recipe.objects.create(
+            name='Omelette', ingredients='egg, cheese', cooking_time=5, description='Fold'
+        )
+        self.salad = Recipe.objects.create(
+            name='Salad', ingredients='lettuce, tomato', cooking_time=5, description='Toss'
+        )
+    
+    def neighbours(self, recipe):
+        """Names of a recipe's stored neighbours, best first"""
+        return [similar.name for similar in similar_recipes(recipe)]
+    
+    def test_neighbours_ranked_by_shared_ingredients(self):
+        """Test neighbours are ordered best first and unrelated recipes are left out"""
+        self.assertEqual(self.neighbours(self.carbonara), ['Omelette', 'Cacio e Pepe'])
+        self.assertEqual(self.neighbours(self.salad), [])
+    
+    def test_incremental_updates_match_full_rebuild(self):
+        """Test saves and deletes leave the same table a full rebuild would"""
+        self.salad.ingredients = 'lettuce, tomato, cheese'
+        self.salad.save()
+        self.omelette.delete()
+        Recipe.objects.create(name='Frittata', ingredients='egg, bacon', cooking_time=25, description='Bake')
+        incremental = set(RecipeSimilarity.objects.values_list('recipe_id', 'similar_id', 'rank'))
+        build_similarity_index()
+        rebuilt = set(RecipeSimilarity.objects.values_list('recipe_id', 'similar_id', 'rank'))
+        self.assertEqual(incremental, rebuilt)
+    
+    def test_save_query_count_independent_of_overlap(self):
+        """Test saving a recipe that shares an ingredient with many others runs a fixed number of queries"""
+        
+        def queries_for_new_recipe(name):
+            with CaptureQueriesContext(connection) as queries:
+                Recipe.objects.create(name=name, ingredients='salt, pepper', cooking_time=10, description='Mix')
+            return len(queries)
+        
+        for index in range(5):
+            Recipe.objects.create(name=f'Salted {index}', ingredients=f'salt, pepper, item{index}', cooking_time=10)
+        few = queries_for_new_recipe('Seasoning')
+        for index in range(5, 40):
+            Recipe.objects.create(name=f'Salted {index}', ingredients=f'salt, pepper, item{index}', cooking_time=10)
+        many = queries_for_new_recipe('More Seasoning')
+        self.assertEqual(few, many)
+        incremental = set(RecipeSimilarity.objects.values_list('recipe_id', 'similar_id', 'rank'))
+        build_similarity_index()
+        self.assertEqual(incremental, set(RecipeSimilarity.objects.values_list('recipe_id', 'similar_id', 'rank')))
+    
+    def test_shared_ingredient_set_compares_bounded_candidates(self):
+        """Test recipes with the same common ingredients are compared with a bounded number of others"""
+        for index in range(3 * BUCKET_WINDOW):
+            Recipe.objects.create(name=f'Seasoning {index}', ingredients='salt, pepper', cooking_time=10)
+        latest = Recipe.objects.latest('pk')
+        self.assertEqual(len(neighbour_scores([latest])[latest.pk]), BUCKET_WINDOW)
+        incremental = set(RecipeSimilarity.objects.values_list('recipe_id', 'similar_id', 'rank'))
+        build_similarity_index()
+        self.assertEqual(incremental, set(RecipeSimilarity.objects.values_list('recipe_id', 'similar_id', 'rank')))
+    
+    def test_score_drop_in_full_lists_matches_rebuild(self):
+        """Test a recipe falling down full lists is replaced by the next best neighbour"""
+        with override_settings(RECIPE_SIMILAR_COUNT=1):
+            build_similarity_index()
+            self.omelette.ingredients = 'egg, milk'
+            self.omelette.save()
+            self.cacio.ingredients = 'pasta, pepper, egg, bacon, cheese'
+            self.cacio.save()
+            incremental = set(RecipeSimilarity.objects.values_list('recipe_id', 'similar_id', 'rank'))
+            build_similarity_index()
+        self.assertEqual(incremental, set(RecipeSimilarity.objects.values_list('recipe_id', 'similar_id', 'rank')))
+    
+    def test_neighbour_count_setting(self):
+        """Test RECIPE_SIMILAR_COUNT caps the stored neighbours"""
+        with override_settings(RECIPE_SIMILAR_COUNT=1):
+            build_similarity_index()
+        self.assertEqual(self.neighbours(self.carbonara), ['Omelette'])
+    
+    def test_detail_page_lists_similar_recipes(self):
+        """Test the detail page shows neighbours with links"""
+        response = self.client.get(reverse('recipes:detail', args=[self.carbonara.pk]))
+        self.assertContains(response, 'You Might Also Like')
+        self.assertContains(response, reverse('recipes:detail', args=[self.cacio.pk]))
+        self.assertEqual([r.name for r in response.context['similar_recipes']], ['Omelette', 'Cacio e Pepe'])
+
+
+class FuzzySearchTest(TestCase):
+    """Test typo-tolerant recipe search through the trigram index"""
+    
+    def setUp(self):
+        """Set up a logged-in user and a few recipes"""
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword123')
+        self.lasagna = Recipe.objects.create(
+            name='Beef Lasagna', ingredients='pasta, beef, tomato', cooking_time=60, description='Bake'
+        )
+        self.curry = Recipe.objects.create(
+            name='Chicken Curry', ingredients='chicken, rice, curry paste', cooking_time=30, description='Simmer'
+        )
+        self.lasagne = Recipe.objects.create(
+            name='Lasagne Verdi', ingredients='pasta, spinach', cooking_time=50, description='Bake'
+        )
+    
+    def test_edit_distance(self):
+        """Test the distance is exact within the limit and capped beyond it"""
+        self.assertEqual(edit_distance('chiken', 'chicken', 2), 1)
+        self.assertEqual(edit_distance('lasagne', 'lasagna', 2), 1)
+        self.assertEqual(edit_distance('beef', 'rice', 1), 2)
+    
+    def test_fuzzy_terms_from_trigram_index(self):
+        """Test misspelt words find the indexed spellings"""
+        self.assertEqual(fuzzy_terms('chiken'), {'chicken': 1})
+        self.assertEqual(fuzzy_terms('lasagne'), {'lasagne': 0, 'lasagna': 1})
+    
+    def test_fuzzy_search_ranks_closest_first(self):
+        """Test fuzzy mode matches typos and orders by edit distance"""
+        response = self.client.get(reverse('recipes:search'), {'recipe_name': 'lasagne', 'fuzzy': 'on'})
+        self.assertEqual([r.name for r in response.context['recipes']], ['Lasagne Verdi', 'Beef Lasagna'])
+        response = self.client.get(reverse('recipes:search'), {'ingredient': 'chiken', 'fuzzy': 'on'})
+        self.assertEqual([r.name for r in response.context['recipes']], ['Chicken Curry'])
+    
+    def test_fuzzy_matches_capped_closest_first(self):
+        """Test a fuzzy word matching many recipes keeps only the closest, in a bounded query"""
+        for i in range(30):
+            Recipe.objects.create(name=f'Saffron Bun {i}', ingredients='saffron', cooking_time=20)
+            Recipe.objects.create(name=f'Saffran Bun {i}', ingredients='saffran', cooking_time=20)
+        with mock.patch('recipes.views.FUZZY_MAX_MATCHES', 40):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('recipes:search'), {'ingredient': 'saffron', 'fuzzy': 'on'})
+        names = [r.name for r in response.context['recipes']]
+        self.assertEqual(len(names), 40)
+        self.assertTrue(all(name.startswith('Saffron') for name in names[:30]))
+        search = [q['sql'] for q in queries.captured_queries if 'ORDER BY CASE' in q['sql']]
+        self.assertEqual(search[0].count('WHEN'), 2)
+
+    def test_exact_mode_unchanged(self):
+        """Test the default partial match does not tolerate typos"""
+        response = self.client.get(reverse('recipes:search'), {'ingredient': 'chiken'})
+        self.assertEqual(response.context['recipes_count'], 0)
+    
+    def test_new_words_indexed_on_save(self):
+        """Test words from a newly saved recipe are found fuzzily"""
+        Recipe.objects.create(name='Goulash', ingredients='paprika, beef', cooking_time=90, description='Stew')
+        self.assertEqual(fuzzy_terms('gulash'), {'goulash': 1})
+
+
+class DuplicateDetectionTest(TestCase):
+    """Test MinHash/LSH duplicate detection, flagging and merging"""
+    
+    def setUp(self):
+        """Set up an original recipe, a near copy and an unrelated recipe"""
+        self.original = Recipe.objects.create(
+            name='Classic Pancakes', ingredients='flour, milk, egg, sugar, butter', cooking_time=20,
+            description='Whisk the flour, milk and eggs into a smooth batter and fry in butter until golden.'
+        )
+        self.copy = Recipe.objects.create(
+            name='Classic Pancakes', ingredients='flour, milk, egg, sugar, butter', cooking_time=20,
+            description='Whisk the flour, milk and eggs into a smooth batter and fry in butter until golden!'
+        )
+        self.other = Recipe.objects.create(
+            name='Green Salad', ingredients='lettuce, cucumber, olive oil', cooking_time=5,
+            description='Chop everything and toss with the oil.'
+        )
+    
+    def test_minhash_estimates_jaccard(self):
+        """Test identical shingle sets get identical signatures and different ones mostly differ"""
+        first, second = minhash(shingles(self.original)), minhash(shingles(self.copy))
+        self.assertTrue((first == second).all())
+        self.assertLess((first == minhash(shingles(self.other))).mean(), 0.2)
+    
+    def test_save_flags_likely_duplicate(self):
+        """Test a near copy is flagged on save and unflagged once it changes"""
+        self.copy.refresh_from_db()
+        self.assertEqual(self.copy.duplicate_of_id, self.original.pk)
+        self.other.refresh_from_db()
+        self.assertIsNone(self.other.duplicate_of_id)
+        self.copy.description = 'Mix everything, rest the batter overnight, then bake it as a dutch baby.'
+        self.copy.save()
+        self.copy.refresh_from_db()
+        self.assertIsNone(self.copy.duplicate_of_id)
+    
+    def test_find_duplicate_clusters(self):
+        """Test clusters hold the near copies and leave unrelated recipes out"""
+        clusters = find_duplicate_clusters(Recipe.objects.all())
+        self.assertEqual(clusters, [[self.original.pk, self.copy.pk]])
+    
+    def test_find_duplicates_command_report_and_merge(self):
+        """Test the command only reports by default and deletes copies with --merge"""
+        out = StringIO()
+        call_command('find_duplicates', stdout=out)
+        self.assertIn(f'duplicate #{self.copy.pk}', out.getvalue())
+        self.assertEqual(Recipe.objects.count(), 3)
+        call_command('find_duplicates', '--merge', stdout=StringIO())
+        self.assertEqual(set(Recipe.objects.values_list('pk', flat=True)), {self.original.pk, self.other.pk})
+    
+    def test_merge_takes_picture_through_save(self):
+        """Test merging moves a duplicate's picture onto the kept recipe and drops its cached page"""
+        Recipe.objects.filter(pk=self.copy.pk).update(pic='recipes/pancakes.jpg')
+        cache.set(detail_cache_key(self.original.pk), 'stale')
+        keep = merge_cluster([self.original.pk, self.copy.pk])
+        self.assertEqual(keep.pk, self.original.pk)
+        self.assertEqual(Recipe.objects.get(pk=keep.pk).pic.name, 'recipes/pancakes.jpg')
+        self.assertIsNone(cache.get(detail_cache_key(keep.pk)))
+
+
+class SearchQueryLanguageTest(TestCase):
+    """Test the boolean search query language"""
+    
+    def setUp(self):
+        """Set up a logged-in user and some recipes"""
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword123')
+        Recipe.objects.create(name='Garlic Chicken', ingredients='chicken, garlic, oil', cooking_time=25)
+        Recipe.objects.create(name='Satay Chicken', ingredients='chicken, garlic, peanuts, nuts', cooking_time=20)
+        Recipe.objects.create(name='Chicken Soup', ingredients='chicken, carrot, celery, onion, garlic', cooking_time=90)
+        Recipe.objects.create(name='Toast', ingredients='bread', cooking_time=3)
+    
+    def names(self, query):
+        """Names of recipes matching a query, sorted"""
+        return sorted(Recipe.objects.filter(compile_query(query)).values_list('name', flat=True))
+    
+    def test_boolean_operators(self):
+        """Test AND, implicit AND, OR, negation and grouping"""
+        self.assertEqual(self.names('ingredient:(chicken AND garlic) -nuts time:<30'), ['Garlic Chicken'])
+        self.assertEqual(self.names('toast OR soup'), ['Chicken Soup', 'Toast'])
+        self.assertEqual(self.names('chicken NOT (satay OR soup)'), ['Garlic Chicken'])
+    
+    def test_field_values(self):
+        """Test difficulty alternatives, time comparisons and phrases"""
+        self.assertEqual(self.names('difficulty:easy|medium'), ['Garlic Chicken', 'Toast'])
+        self.assertEqual(self.names('time:>=25'), ['Chicken Soup', 'Garlic Chicken'])
+        self.assertEqual(self.names('name:"chicken soup"'), ['Chicken Soup'])
+    
+    def test_whole_words_and_prefixes(self):
+        """Test words match whole indexed words unless they end with *"""
+        self.assertEqual(self.names('pean'), [])
+        self.assertEqual(self.names('pean*'), ['Satay Chicken'])
+    
+    def test_single_query(self):
+        """Test a complex query runs as one SQL statement"""
+        q = compile_query('ingredient:(chicken AND garlic) -nuts time:<30 difficulty:Easy|Intermediate')
+        with self.assertNumQueries(1):
+            list(Recipe.objects.filter(q))
+    
+    def test_syntax_errors(self):
+        """Test malformed queries raise QuerySyntaxError"""
+        for query in ('(chicken', 'colour:red', 'time:soon', 'difficulty:extreme', 'chicken AND'):
+            with self.assertRaises(QuerySyntaxError):
+                compile_query(query)
+    
+    def test_search_view_query_and_errors(self):
+        """Test the search page applies the query and shows syntax errors"""
+        response = self.client.get(reverse('recipes:search'), {'q': 'chicken -garlic|toast'})
+        self.assertEqual(response.context['recipes_count'], 0)
+        response = self.client.get(reverse('recipes:search'), {'q': 'chicken time:<=20'})
+        self.assertEqual([r.name for r in response.context['recipes']], ['Satay Chicken'])
+        response = self.client.get(reverse('recipes:search'), {'q': 'time:soon'})
+        self.assertContains(response, 'Cooking time must look like')
+    
+    def test_deep_or_long_queries_rejected(self):
+        """Test deeply nested or over-long queries are syntax errors, not server errors"""
+        for query in ('(' * 300 + 'chicken' + ')' * 300, 'NOT ' * 50 + 'chicken', 'chicken ' * 100):
+            with self.assertRaises(QuerySyntaxError):
+                compile_query(query)
+        self.assertEqual(self.names('(' * 10 + 'toast' + ')' * 10), ['Toast'])
+        response = self.client.get(reverse('recipes:search'), {'q': '(' * 300 + 'chicken' + ')' * 300})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['recipes_count'], 0)
+        self.assertIsNotNone(response.context['query_error'])
+    
+    def test_debug_report_staff_only(self):
+        """Test the query plan is only shown to staff"""
+        params = {'q': 'chicken', 'debug': '1'}
+        response = self.client.get(reverse('recipes:search'), params)
+        self.assertIsNone(response.context['query_report'])
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('recipes:search'), params)
+        self.assertEqual(response.context['query_report']['count'], 3)
+        self.assertContains(response, 'Query plan')
+
+
+class RecipeApiTest(TestCase):
+    """Test the JSON read API"""
+    
+    def setUp(self):
+        """Set up a logged-in user and five recipes"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword123')
+        self.recipes = [
+            Recipe.objects.create(name=f'Recipe {index}', ingredients='salt, pepper', cooking_time=index)
+            for index in range(5)
+        ]
+    
+    def test_requires_login(self):
+        """Test anonymous clients get a JSON 401"""
+        response = Client().get(reverse('recipes:api_list'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['error'], 'Authentication required')
+    
+    def test_cursor_pagination(self):
+        """Test following next links returns every recipe once, in id order"""
+        url = reverse('recipes:api_list') + '?limit=2&fields=name'
+        names = []
+        while url:
+            data = self.client.get(url).json()
+            names += [item['name'] for item in data['results']]
+            url = data['next']
+        self.assertEqual(names, [f'Recipe {index}' for index in range(5)])
+    
+    def test_malformed_cursor_is_bad_request(self):
+        """Test cursors that do not hold an integer id get a JSON 400"""
+        for position in ('abc', '\u00b2', '1.5'):
+            response = self.client.get(reverse('recipes:api_list'), {'cursor': encode_cursor(position)})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'], 'Invalid cursor')
+    
+    def test_sparse_fields_load_only_those_columns(self):
+        """Test ?fields= limits both the payload and the selected columns"""
+        recipe = self.recipes[0]
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(
+                reverse('recipes:api_detail', args=[recipe.pk]), {'fields': 'name,cooking_time'}
+            ).json()
+        self.assertEqual(data, {'name': 'Recipe 0', 'cooking_time': 0})
+        recipe_query = [q['sql'] for q in queries if 'recipes_recipe' in q['sql']][-1]
+        self.assertNotIn('ingredients', recipe_query)
+    
+    def test_batch_get_in_one_query(self):
+        """Test ?ids= resolves in one query and reports missing ids"""
+        ids = [self.recipes[3].pk, self.recipes[1].pk, 9999]
+        url = reverse('recipes:api_batch') + '?ids=' + ','.join(map(str, ids)) + '&fields=id'
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url).json()
+        # The other queries load the session and the user
+        self.assertEqual(len([q for q in queries if 'recipes_recipe' in q['sql']]), 1)
+        self.assertEqual(data['results'], [{'id': ids[0]}, {'id': ids[1]}])
+        self.assertEqual(data['missing'], [9999])
+    
+    def test_bad_parameters(self):
+        """Test invalid fields, cursors and ids give a 400"""
+        self.assertEqual(self.client.get(reverse('recipes:api_list'), {'fields': 'secret'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('recipes:api_list'), {'cursor': '!!'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('recipes:api_batch'), {'ids': '1,x'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('recipes:api_detail', args=[9999])).status_code, 404)
+
+
+class RecipeSyncFeedTest(TestCase):
+    """Test the incremental sync feed and deletion log"""
+    
+    def setUp(self):
+        """Set up a logged-in user and three recipes"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword123')
+        self.recipes = [
+            Recipe.objects.create(name=f'Recipe {index}', ingredients='salt', cooking_time=5)
+            for index in range(3)
+        ]
+    
+    def sync(self, cursor=None, **params):
+        """Fetch every page of changes since a cursor"""
+        changed, deleted = [], []
+        with override_settings(RECIPE_SYNC_SETTLE_SECONDS=0):
+            while True:
+                query = dict(params, **({'cursor': cursor} if cursor else {}))
+                data = self.client.get(reverse('recipes:api_changes'), query).json()
+                changed += [item['name'] for item in data['changed']]
+                deleted += data['deleted']
+                cursor = data['cursor']
+                if not data['has_more']:
+                    return changed, deleted, cursor
+    
+    def test_initial_sync_then_only_changes(self):
+        """Test a second sync returns only what changed since the first"""
+        changed, deleted, cursor = self.sync(limit=2, fields='name')
+        self.assertEqual(changed, ['Recipe 0', 'Recipe 1', 'Recipe 2'])
+        self.assertEqual(deleted, [])
+        
+        self.recipes[1].name = 'Renamed'
+        self.recipes[1].save()
+        gone = self.recipes[2].pk
+        self.recipes[2].delete()
+        changed, deleted, cursor = self.sync(cursor, fields='name')
+        self.assertEqual(changed, ['Renamed'])
+        self.assertEqual(deleted, [gone])
+        self.assertEqual(self.sync(cursor)[:2], ([], []))
+    
+    def test_unsettled_changes_held_back(self):
+        """Test changes inside the settle window are not handed out yet"""
+        with override_settings(RECIPE_SYNC_SETTLE_SECONDS=60):
+            data = self.client.get(reverse('recipes:api_changes')).json()
+        self.assertEqual(data['changed'], [])
+    
+    def test_stream_mode(self):
+        """Test ?stream=1 sends one JSON line per change and a final cursor"""
+        with override_settings(RECIPE_SYNC_SETTLE_SECONDS=0):
+            response = self.client.get(reverse('recipes:api_changes'), {'stream': '1', 'fields': 'id'})
+            lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([line['changed']['id'] for line in lines[:-1]], [r.pk for r in self.recipes])
+        self.assertIn('cursor', lines[-1])
+    
+    def test_pruned_tombstones_force_full_sync(self):
+        """Test a cursor older than the pruned tombstones gets a 410"""
+        cursor = self.sync()[2]
+        self.recipes[0].delete()
+        self.recipes[1].delete()
+        RecipeDeletion.objects.update(deleted_at=timezone.now() - timedelta(days=365))
+        call_command('prune_deletions', stdout=StringIO())
+        self.assertEqual(RecipeDeletion.objects.count(), 0)
+        with override_settings(RECIPE_SYNC_SETTLE_SECONDS=0):
+            response = self.client.get(reverse('recipes:api_changes'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 410)
+            # A fresh sync starts past the pruned tombstones
+            cursor = self.client.get(reverse('recipes:api_changes')).json()['cursor']
+            response = self.client.get(reverse('recipes:api_changes'), {'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+    
+    def test_id_gaps_are_not_pruning(self):
+        """Test a gap in the tombstone ids does not make a current cursor stale"""
+        self.recipes[0].delete()
+        cursor = self.sync()[2]
+        self.recipes[1].delete()
+        self.recipes[2].delete()
+        # Ids skipped by rolled-back inserts leave the log starting past the cursor
+        RecipeDeletion.objects.exclude(pk=RecipeDeletion.objects.order_by('pk').last().pk).delete()
+        with override_settings(RECIPE_SYNC_SETTLE_SECONDS=0):
+            response = self.client.get(reverse('recipes:api_changes'), {'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(RECIPE_VIEW_CACHE=True)
+class SingleFlightTest(TestCase):
+    """Test single-flight recomputation of cached values"""
+    
+    def setUp(self):
+        """Start from an empty cache"""
+        cache.clear()
+    
+    def test_concurrent_misses_compute_once(self):
+        """Test threads missing the same key share one computation"""
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_compute('sf:test', compute, 60)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 8)
+    
+    def test_stale_value_served_during_refresh(self):
+        """Test other threads get the stale value while one thread refreshes"""
+        cache.set('sf:stale', ('old', 0.1, time.time() - 1), 60)
+        started = threading.Event()
+        
+        def slow_compute():
+            started.set()
+            time.sleep(0.3)
+            return 'new'
+        
+        refresher = threading.Thread(target=get_or_compute, args=('sf:stale', slow_compute, 60))
+        refresher.start()
+        started.wait()
+        self.assertEqual(get_or_compute('sf:stale', lambda: 'unexpected', 60), 'old')
+        refresher.join()
+        self.assertEqual(get_or_compute('sf:stale', lambda: 'unexpected', 60), 'new')
+    
+    def test_cross_process_lock_serves_stale(self):
+        """Test a held cache lock makes this process serve the stale value"""
+        cache.set('sf:locked', ('old', 0.1, time.time() - 1), 60)
+        cache.set('sf:locked:lock', 'other-process', 60)
+        with override_settings(SINGLE_FLIGHT_CACHE_LOCK=True):
+            self.assertEqual(get_or_compute('sf:locked', lambda: 'new', 60), 'old')
+        cache.delete('sf:locked:lock')
+        with override_settings(SINGLE_FLIGHT_CACHE_LOCK=True):
+            self.assertEqual(get_or_compute('sf:locked', lambda: 'new', 60), 'new')
+    
+    def test_early_refresh_probability(self):
+        """Test early refresh never fires long before expiry and always after it"""
+        self.assertFalse(any(should_refresh(0.01, 1000, 1.0, 0) for _ in range(100)))
+        self.assertTrue(all(should_refresh(0.01, 1000, 1.0, 1001) for _ in range(100)))
+    
+    def test_detail_cache_dropped_on_save(self):
+        """Test the cached detail page reflects edits immediately"""
+        user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_login(user)
+        recipe = Recipe.objects.create(name='Toast', ingredients='bread', cooking_time=3)
+        url = reverse('recipes:detail', args=[recipe.pk])
+        self.assertContains(self.client.get(url), 'Toast')
+        recipe.name = 'French Toast'
+        recipe.save()
+        self.assertContains(self.client.get(url), 'French Toast')
+    
+    def test_pinned_session_bypasses_detail_cache(self):
+        """Test a session that just wrote reads the recipe from the primary, not the cache"""
+        user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_login(user)
+        recipe = Recipe.objects.create(name='Toast', ingredients='bread', cooking_time=3)
+        url = reverse('recipes:detail', args=[recipe.pk])
+        self.client.get(url)
+        # update() sends no signal, so the cached copy is now stale
+        Recipe.objects.filter(pk=recipe.pk).update(name='French Toast')
+        self.assertNotContains(self.client.get(url), 'French Toast')
+        session = self.client.session
+        session[PIN_SESSION_KEY] = time.time() + 60
+        session.save()
+        self.assertContains(self.client.get(url), 'French Toast')
+    
+    def test_detail_cache_miss_reads_replica(self):
+        """Test a detail cache miss is loaded through the replica like the rest of the view"""
+        user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_login(user)
+        recipe = Recipe.objects.create(name='Toast', ingredients='bread', cooking_time=3)
+        seen = []
+        
+        def record(recipe):
+            seen.append(_use_replica.get())
+            return []
+        
+        with mock.patch('recipes.views.similar_recipes', side_effect=record):
+            self.client.get(reverse('recipes:detail', args=[recipe.pk]))
+        self.assertEqual(seen, [True])
+    
+    def test_nothing_cached_without_shared_cache(self):
+        """Test detail pages, facet counts and charts skip a per-process cache"""
+        user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_login(user)
+        recipe = Recipe.objects.create(name='Toast', ingredients='bread', cooking_time=3)
+        # Saving bumps the facet cache version
+        cache.clear()
+        with override_settings(RECIPE_VIEW_CACHE=False), \
+                mock.patch('recipes.views.get_or_compute') as get_or_compute:
+            self.client.get(reverse('recipes:detail', args=[recipe.pk]))
+            response = self.client.get(reverse('recipes:search'), {'recipe_name': 'toast', 'show_chart': 'on'})
+        self.assertTrue(response.context['chart'])
+        get_or_compute.assert_not_called()
+        self.assertIsNone(cache.get(FACET_CACHE_VERSION_KEY))
+
+
+class SearchSnapshotTest(TestCase):
+    """Test the memory-mapped search snapshot"""
+    
+    def setUp(self):
+        """Set up recipes and a temporary snapshot path"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/search.snapshot'
+        settings_override = override_settings(SEARCH_SNAPSHOT_PATH=self.path, SEARCH_SNAPSHOT_CHECK_SECONDS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.curry = Recipe.objects.create(name='Chicken Curry', ingredients='chicken, rice', cooking_time=30)
+        self.soup = Recipe.objects.create(name='Chicken Soup', ingredients='chicken, carrot', cooking_time=60)
+        self.toast = Recipe.objects.create(name='Toast', ingredients='bread', cooking_time=3)
+    
+    def test_lookup_exact_and_prefix(self):
+        """Test exact and prefix lookups read the right postings"""
+        build_snapshot(self.path)
+        snapshot = SearchSnapshot(self.path)
+        self.assertEqual(snapshot.lookup('ingredient', 'chicken').tolist(), [self.curry.pk, self.soup.pk])
+        self.assertEqual(snapshot.lookup('name', 'chick').tolist(), [])
+        self.assertEqual(snapshot.lookup('name', 'chick', prefix=True).tolist(), [self.curry.pk, self.soup.pk])
+        self.assertEqual(snapshot.matching_ids(['chicken', 'carrot']).tolist(), [self.soup.pk])
+    
+    def test_ids_beyond_32_bits(self):
+        """Test recipe ids past 2**32 survive the round trip through the file"""
+        big = Recipe.objects.create(pk=2**32 + 7, name='Big Toast', ingredients='bread', cooking_time=4)
+        build_snapshot(self.path)
+        self.assertEqual(SearchSnapshot(self.path).lookup('name', 'toast').tolist(), [self.toast.pk, big.pk])
+    
+    def test_fallback_searches_only_changed_recipes(self):
+        """Test the word index is only asked about recipes saved after the build"""
+        call_command('build_search_snapshot', stdout=StringIO())
+        sql = str(Recipe.objects.filter(compile_query('ingredient:chicken')).query)
+        subquery = sql[sql.index('recipes_recipesearchterm'):]
+        self.assertIn('"updated_at" >', subquery)
+    
+    def test_rejects_other_files(self):
+        """Test a file that is not a snapshot raises SnapshotError"""
+        with open(self.path, 'wb') as handle:
+            handle.write(b'not a snapshot at all, just some bytes')
+        with self.assertRaises(SnapshotError):
+            SearchSnapshot(self.path)
+    
+    def test_hot_swap_on_rebuild(self):
+        """Test workers pick up a rebuilt snapshot"""
+        build_snapshot(self.path)
+        first = current_snapshot()
+        self.assertEqual(first.lookup('name', 'toast').tolist(), [self.toast.pk])
+        Recipe.objects.create(name='Cheese Toast', ingredients='bread, cheese', cooking_time=5)
+        build_snapshot(self.path)
+        second = current_snapshot()
+        self.assertIsNot(first, second)
+        self.assertEqual(len(second.lookup('name', 'toast')), 2)
+        # The old mapping stays readable for requests still holding it
+        self.assertEqual(first.lookup('name', 'toast').tolist(), [self.toast.pk])
+    
+    def test_query_sees_changes_made_after_build(self):
+        """Test searches combine the snapshot with recipes saved since it was built"""
+        call_command('build_search_snapshot', stdout=StringIO())
+        self.soup.ingredients = 'leek, potato'
+        self.soup.save()
+        Recipe.objects.create(name='Chicken Pie', ingredients='chicken, pastry', cooking_time=50)
+        names = sorted(Recipe.objects.filter(compile_query('ingredient:chicken')).values_list('name', flat=True))
+        self.assertEqual(names, ['Chicken Curry', 'Chicken Pie'])
+
+
+class SamplingProfilerTest(TestCase):
+    """Test the slow-request sampling profiler and perf_report"""
+    
+    def setUp(self):
+        """Set up a logged-in client and a temporary profile directory"""
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.login(username='testuser', password='testpassword123')
+        Recipe.objects.create(name='Pasta', ingredients='pasta, eggs', cooking_time=20)
+    
+    def profiles(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith('.collapsed'))
+    
+    def test_sampler_records_running_function(self):
+        """Test the sampler sees the function the profiled thread is busy in"""
+        sampler = Sampler(0.001)
+        
+        def busy_loop():
+            deadline = time.perf_counter() + 0.1
+            while time.perf_counter() < deadline:
+                pass
+        
+        sampler.start(threading.get_ident())
+        busy_loop()
+        samples = sampler.stop(threading.get_ident())
+        self.assertTrue(samples)
+        self.assertTrue(any(stack.endswith('busy_loop') for stack in samples))
+    
+    def test_sampled_request_writes_profiles(self):
+        """Test a sampled request is saved in collapsed and speedscope form"""
+        with override_settings(PROFILE_REQUESTS=True, PROFILE_SAMPLE_RATE=1.0, PROFILE_SLOW_REQUEST_SECONDS=0,
+                               PROFILE_INTERVAL_MS=1, PROFILE_DIR=self.directory):
+            response = self.client.get(reverse('recipes:search'), {'show_chart': 'on'})
+        self.assertEqual(response.status_code, 200)
+        profiles = self.profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].endswith('-recipes_search.collapsed'))
+        base = os.path.join(self.directory, profiles[0][:-len('.collapsed')])
+        with open(f'{base}.speedscope.json') as handle:
+            document = json.load(handle)
+        self.assertEqual(document['profiles'][0]['type'], 'sampled')
+        self.assertEqual(len(document['profiles'][0]['samples']), len(document['profiles'][0]['weights']))
+    
+    def test_fast_request_not_saved(self):
+        """Test requests under the threshold are not saved when sampling is off"""
+        with override_settings(PROFILE_REQUESTS=True, PROFILE_SAMPLE_RATE=0.0, PROFILE_SLOW_REQUEST_SECONDS=60,
+                               PROFILE_DIR=self.directory):
+            self.client.get(reverse('recipes:search'))
+        self.assertEqual(self.profiles(), [])
+    
+    def test_perf_report(self):
+        """Test perf_report ranks functions by self time per view"""
+        save_profile(self.directory, 'recipes:search', Counter({
+            'handler;view;render_chart': 6,
+            'handler;view;query': 3,
+            'handler;view': 1,
+        }), 0.5, 0.005)
+        save_profile(self.directory, 'recipes:list', Counter({'handler;list_view': 2}), 0.1, 0.005)
+        output = StringIO()
+        call_command('perf_report', dir=self.directory, view='recipes:search', stdout=output)
+        report = output.getvalue()
+        self.assertIn('recipes_search: 1 profile(s), 10 sample(s)', report)
+        self.assertNotIn('list_view', report)
+        lines = [line.split() for line in report.splitlines()[2:]]
+        self.assertEqual(lines[0], ['60.0%', '60.0%', 'render_chart'])
+        self.assertEqual(lines[2], ['10.0%', '100.0%', 'view'])
+
+
+class MemoryTrackingTest(TestCase):
+    """Test per-view allocation tracking and the memory diagnostics endpoint"""
+    
+    def setUp(self):
+        """Set up users, a recipe and empty allocation statistics"""
+        cache.clear()
+        reset_memory_stats()
+        self.addCleanup(reset_memory_stats)
+        self.addCleanup(lambda: tracemalloc.is_tracing() and tracemalloc.stop())
+        self.client = Client()
+        User.objects.create_user(username='testuser', password='testpassword123')
+        User.objects.create_user(username='staffuser', password='testpassword123', is_staff=True)
+        Recipe.objects.create(name='Pasta', ingredients='pasta, eggs', cooking_time=20)
+    
+    def test_tracks_peak_and_sites_per_view(self):
+        """Test a tracked search records its peak allocation and allocation sites"""
+        self.client.login(username='testuser', password='testpassword123')
+        with override_settings(MEMORY_TRACKING=True, MEMORY_TRACKING_SNAPSHOT_RATE=1.0, MEMORY_TRACKING_FRAMES=5):
+            response = self.client.get(reverse('recipes:search'), {'show_chart': 'on', 'chart_format': 'svg'})
+        self.assertEqual(response.status_code, 200)
+        stats = memory_report()['views']['recipes:search']
+        self.assertEqual(stats['requests'], 1)
+        self.assertGreater(stats['peak_max_bytes'], 0)
+        self.assertGreaterEqual(stats['peak_max_bytes'], stats['retained_mean_bytes'])
+        self.assertLessEqual(len(stats['top_sites']), 10)
+    
+    def test_untracked_by_default(self):
+        """Test nothing is recorded or traced while MEMORY_TRACKING is off"""
+        self.client.login(username='testuser', password='testpassword123')
+        self.client.get(reverse('recipes:search'))
+        self.assertEqual(memory_report()['views'], {})
+        self.assertFalse(tracemalloc.is_tracing())
+    
+    def test_diagnostics_staff_only(self):
+        """Test only staff can read the diagnostics endpoint"""
+        url = reverse('recipes:memory_diagnostics')
+        self.client.login(username='testuser', password='testpassword123')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.login(username='staffuser', password='testpassword123')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertFalse(data['tracking'])
+        self.assertIn('pid', data)
+        self.assertEqual(data['views'], {})
+
+
+class ChartMemorySoakTest(TestCase):
+    """Test charted searches do not leak memory or matplotlib figures"""
+    
+    def run_soak(self, **options):
+        output = StringIO()
+        call_command('soak_chart_memory', stdout=output, **options)
+        return output.getvalue()
+    
+    def test_short_soak(self):
+        """Test a short run of PNG-charted searches stays bounded"""
+        output = self.run_soak(requests=4, warmup=2)
+        self.assertIn('Live matplotlib figures: +0', output)
+        self.assertIn('Memory stayed bounded', output)
+    
+    def test_soak_leaves_site_cache_alone(self):
+        """Test the soak clears its own cache, not the configured one"""
+        cache.set('soak-test-key', 'kept')
+        self.run_soak(requests=1, warmup=1, format='svg')
+        self.assertEqual(cache.get('soak-test-key'), 'kept')
+    
+    def test_full_soak(self):
+        """Test thousands of charted searches stay bounded (set RECIPE_SOAK_TESTS=1; takes minutes)"""
+        if not os.environ.get('RECIPE_SOAK_TESTS'):
+            self.skipTest('set RECIPE_SOAK_TESTS=1 to run the full soak test')
+        self.assertIn('Memory stayed bounded', self.run_soak(requests=2000))
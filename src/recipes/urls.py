@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, api
 
 app_name = 'recipes'
 
@@ -7,9 +7,15 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('login/', views.login_view, name='login'),
     path('signup/', views.signup_view, name='signup'),
+    path('signup/check-username/', views.check_username, name='check_username'),
     path('logout/', views.logout_view, name='logout'),
     path('list/', views.recipe_list, name='list'),
     path('search/', views.recipe_search, name='search'),
     path('detail/<int:pk>/', views.recipe_detail, name='detail'),
     path('about/', views.about_me, name='about'),
+    path('diagnostics/memory/', views.memory_diagnostics, name='memory_diagnostics'),
+    path('api/recipes/', api.recipe_list, name='api_list'),
+    path('api/recipes/batch/', api.recipe_batch, name='api_batch'),
+    path('api/recipes/changes/', api.recipe_changes, name='api_changes'),
+    path('api/recipes/<int:pk>/', api.recipe_detail, name='api_detail'),
 ]
\ No newline at end of file
@@ -1,17 +1,33 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.db.models import Q, Count
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.db.models import Q, Count, Case, When, Value, IntegerField
 from .models import Recipe
 from .forms import LoginForm, SignupForm, RecipeSearchForm
+from .facets import get_facet_counts
+from .stats import get_growth_chart_data
+from .similarity import similar_recipes
+from .search import fuzzy_recipe_distances
+from .query import compile_query, QuerySyntaxError
+from .charts import render_png, render_svg, render_spec
+from .routers import read_from_replica, session_pinned_to_primary
+from .cache import detail_cache_key
+from .streaming import streaming_requested, stream_template
+from .ratelimit import login_throttled, record_login_failure, record_login_success, username_check_throttled
+from .backends import username_cache_key
+from .singleflight import get_or_compute
+from .memory import memory_report
 import pandas as pd
-from io import BytesIO
-import base64
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+import hashlib
+import json
+import time
 
 def home(request):
     """Welcome page for the Recipe application"""
@@ -29,15 +45,25 @@ def login_view(request):
             username = form.cleaned_data.get('username')
             password = form.cleaned_data.get('password')
             
+            # Reject throttled attempts before the password hasher runs
+            if login_throttled(request, username):
+                context = {
+                    'form': form,
+                    'error_message': 'Too many failed login attempts. Please try again later.'
+                }
+                return render(request, 'recipes/login.html', context, status=429)
+            
             # Authenticate user
             user = authenticate(request, username=username, password=password)
             
             if user is not None:
                 # Login successful
+                record_login_success(request, username)
                 login(request, user)
                 # Redirect to recipe list (protected page)
                 return redirect('recipes:list')
             else:
+                record_login_failure(request, username)
                 error_message = 'Invalid username or password'
     
     context = {
@@ -46,23 +72,46 @@ def login_view(request):
     }
     return render(request, 'recipes/login.html', context)
 
+def with_detail_urls(recipes):
+    """Attach detail_url to each recipe, reversing the URL pattern only once"""
+    url_format = reverse('recipes:detail', args=[987654321]).replace('987654321', '{}')
+    for recipe in recipes:
+        recipe.detail_url = url_format.format(recipe.pk)
+        yield recipe
+
 @login_required
+@read_from_replica
 def recipe_list(request):
     """Display all recipes - PROTECTED VIEW"""
     recipes = Recipe.objects.all().order_by('-created_at')
+    if streaming_requested(request):
+        return stream_template(
+            request, 'recipes/recipe_list.html', {},
+            with_detail_urls(recipes.iterator(chunk_size=settings.RECIPE_STREAM_CHUNK_SIZE)),
+            'recipes/_recipe_cards.html',
+        )
     context = {
-        'recipes': recipes
+        'recipes': list(with_detail_urls(recipes))
     }
     return render(request, 'recipes/recipe_list.html', context)
 
 @login_required
+@read_from_replica
 def recipe_detail(request, pk):
     """Display details for a specific recipe - PROTECTED VIEW"""
-    recipe = get_object_or_404(Recipe, pk=pk)
-    context = {
-        'recipe': recipe,
-        'ingredients_list': recipe.get_ingredients_list()
-    }
+    def load():
+        recipe = get_object_or_404(Recipe, pk=pk)
+        return {
+            'recipe': recipe,
+            'ingredients_list': recipe.get_ingredients_list(),
+            'similar_recipes': list(with_detail_urls(similar_recipes(recipe))),
+        }
+    
+    if not settings.RECIPE_VIEW_CACHE or session_pinned_to_primary(request):
+        # A pinned session just wrote: it reads the primary, as the cached copy may be older
+        context = load()
+    else:
+        context = get_or_compute(detail_cache_key(pk), load, settings.RECIPE_DETAIL_CACHE_TIMEOUT)
     return render(request, 'recipes/recipe_detail.html', context)
 
 def logout_view(request):
@@ -79,22 +128,15 @@ def signup_view(request):
         form = SignupForm(data=request.POST)
         
         if form.is_valid():
-            username = form.cleaned_data.get('username')
-            email = form.cleaned_data.get('email')
-            password = form.cleaned_data.get('password1')
-            
-            # Create new user
-            user = User.objects.create_user(
-                username=username,
-                email=email,
-                password=password
-            )
-            
-            # Log the user in automatically
-            login(request, user)
+            # Create new user (None if the username is already taken)
+            user = form.save()
             
-            # Redirect to recipe list
-            return redirect('recipes:list')
+            if user is not None:
+                # Log the user in automatically
+                login(request, user)
+                
+                # Redirect to recipe list
+                return redirect('recipes:list')
     
     context = {
         'form': form,
@@ -102,48 +144,90 @@ def signup_view(request):
     }
     return render(request, 'recipes/signup.html', context)
 
+def check_username(request):
+    """JSON username availability check used by the signup page"""
+    username = request.GET.get('username', '').strip()
+    if not username or len(username) > 150:
+        return JsonResponse({'username': username, 'available': False})
+    if username_check_throttled(request):
+        return JsonResponse({'error': 'Too many requests'}, status=429)
+    
+    key = username_cache_key(username)
+    available = cache.get(key)
+    if available is None:
+        available = not User.objects.filter(username=username).exists()
+        cache.set(key, available, settings.USERNAME_CHECK_CACHE_TIMEOUT)
+    return JsonResponse({'username': username, 'available': available})
+
 def get_chart(chart_type, data, **kwargs):
     """Generate charts and return as base64 encoded image"""
-    plt.switch_backend('AGG')
-    fig = plt.figure(figsize=(10, 6))
-    
-    if chart_type == 'bar':
-        plt.bar(data['labels'], data['values'])
-        plt.xlabel(kwargs.get('xlabel', ''))
-        plt.ylabel(kwargs.get('ylabel', ''))
-        plt.title(kwargs.get('title', ''))
-        plt.xticks(rotation=45, ha='right')
-        
-    elif chart_type == 'pie':
-        plt.pie(data['values'], labels=data['labels'], autopct='%1.1f%%', startangle=90)
-        plt.title(kwargs.get('title', ''))
-        plt.axis('equal')
-        
-    elif chart_type == 'line':
-        plt.plot(data['labels'], data['values'], marker='o', linewidth=2, markersize=8)
-        plt.xlabel(kwargs.get('xlabel', ''))
-        plt.ylabel(kwargs.get('ylabel', ''))
-        plt.title(kwargs.get('title', ''))
-        plt.xticks(rotation=45, ha='right')
-        plt.grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    
-    # Convert plot to base64 string
-    buffer = BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    image_png = buffer.getvalue()
-    buffer.close()
-    
-    graphic = base64.b64encode(image_png)
-    graphic = graphic.decode('utf-8')
-    
-    plt.close()
-    
-    return graphic
+    return render_png(chart_type, data, **kwargs)
+
+CHART_FORMATS = ('png', 'svg', 'json')
+
+# Fuzzy searches show at most this many recipes, the closest first
+FUZZY_MAX_MATCHES = 500
+
+def render_chart(chart_format, chart_type, data, **kwargs):
+    """Render a chart with the requested backend, falling back to matplotlib PNG"""
+    if chart_format == 'svg':
+        return render_svg(chart_type, data, **kwargs)
+    if chart_format == 'json':
+        return render_spec(chart_type, data, **kwargs)
+    return get_chart(chart_type, data, **kwargs)
+
+def cached_chart(chart_format, chart_type, data, **kwargs):
+    """render_chart() through the cache; concurrent misses for the same chart render it once"""
+    if not settings.RECIPE_VIEW_CACHE:
+        return render_chart(chart_format, chart_type, data, **kwargs)
+    description = json.dumps([chart_format, chart_type, data, kwargs], sort_keys=True, default=str)
+    key = 'recipes:chart:' + hashlib.sha256(description.encode()).hexdigest()
+    return get_or_compute(
+        key,
+        lambda: render_chart(chart_format, chart_type, data, **kwargs),
+        settings.RECIPE_CHART_CACHE_TIMEOUT,
+    )
+
+def fuzzy_filter(recipes, recipe_name, ingredient):
+    """Match name and ingredient words allowing typos, ordered by total edit distance"""
+    distances = None
+    for text, field in ((recipe_name, 'name'), (ingredient, 'ingredient')):
+        field_distances = fuzzy_recipe_distances(text, field)
+        if field_distances is None:
+            continue
+        if distances is None:
+            distances = field_distances
+        else:
+            distances = {
+                pk: distance + field_distances[pk]
+                for pk, distance in distances.items() if pk in field_distances
+            }
+    if distances is None:
+        return recipes
+    # Keep only the closest matches so the query has a bounded number of parameters
+    closest = sorted(distances, key=lambda pk: (distances[pk], pk))[:FUZZY_MAX_MATCHES]
+    by_distance = {}
+    for pk in closest:
+        by_distance.setdefault(distances[pk], []).append(pk)
+    ranking = Case(
+        *[When(pk__in=pks, then=Value(distance)) for distance, pks in by_distance.items()],
+        output_field=IntegerField(),
+    ) if by_distance else Value(0)
+    return recipes.filter(pk__in=closest).order_by(ranking, 'name')
+
+def explain_search(recipes):
+    """SQL, database query plan and timing of a search queryset"""
+    start = time.perf_counter()
+    count = recipes.count()
+    return {
+        'sql': str(recipes.query),
+        'plan': recipes.explain(),
+        'count': count,
+        'milliseconds': round((time.perf_counter() - start) * 1000, 2),
+    }
 
 @login_required
+@read_from_replica
 def recipe_search(request):
     """Search recipes with filters and optional data visualization"""
     form = RecipeSearchForm(request.GET or None)
@@ -151,6 +235,8 @@ def recipe_search(request):
     chart = None
     df = None
     search_performed = False
+    query_error = None
+    query_report = None
     
     # Check if search form is submitted   
     if request.GET:
@@ -161,15 +247,42 @@ def recipe_search(request):
         ingredient = request.GET.get('ingredient', '').strip()
         difficulty = request.GET.get('difficulty', '').strip()
         cooking_time = request.GET.get('cooking_time', '').strip()
+        # The form enforces the query's max_length
+        form.is_valid()
+        query = form.cleaned_data.get('q', '')
+        fuzzy = request.GET.get('fuzzy', '') == 'on'
         show_chart = request.GET.get('show_chart', '') == 'on'
+        chart_format = request.GET.get('chart_format', settings.RECIPE_CHART_FORMAT)
+        if chart_format not in CHART_FORMATS:
+            chart_format = 'png'
+        
+        if fuzzy:
+            # Typo-tolerant word match, closest spellings first
+            recipes = fuzzy_filter(recipes, recipe_name, ingredient)
+        else:
+            # Filter by recipe name (partial match)
+            if recipe_name:
+                recipes = recipes.filter(name__icontains=recipe_name)
+            
+            # Filter by ingredient (partial match)
+            if ingredient:
+                recipes = recipes.filter(ingredients__icontains=ingredient)
         
-        # Filter by recipe name (partial match)
-        if recipe_name:
-            recipes = recipes.filter(name__icontains=recipe_name)
+        # Advanced query, compiled into one Q tree
+        if 'q' in form.errors:
+            query_error = form.errors['q'][0]
+            recipes = recipes.none()
+        elif query:
+            try:
+                recipes = recipes.filter(compile_query(query))
+            except QuerySyntaxError as error:
+                query_error = str(error)
+                recipes = recipes.none()
         
-        # Filter by ingredient (partial match)
-        if ingredient:
-            recipes = recipes.filter(ingredients__icontains=ingredient)
+        # Count results per dropdown option before applying those filters
+        form.apply_facet_counts(get_facet_counts(
+            recipes, recipe_name, ingredient, difficulty, cooking_time, fuzzy, query
+        ))
         
         # Filter by difficulty
         if difficulty:
@@ -179,6 +292,10 @@ def recipe_search(request):
         if cooking_time:
             recipes = recipes.filter(cooking_time__lte=int(cooking_time))
         
+        # Staff can see how the search ran with ?debug=1
+        if request.GET.get('debug') == '1' and request.user.is_staff and not query_error:
+            query_report = explain_search(recipes)
+        
         # Convert QuerySet to pandas DataFrame
         if recipes.exists():
             recipe_data = []
@@ -202,14 +319,15 @@ def recipe_search(request):
                     'labels': difficulty_counts.index.tolist(),
                     'values': difficulty_counts.values.tolist()
                 }
-                bar_chart = get_chart(
+                bar_chart = cached_chart(
+                    chart_format,
                     'bar', 
                     bar_data, 
                     title='Recipe Difficulty Distribution',
                     xlabel='Difficulty Level',
                     ylabel='Number of Recipes'
                 )
-                charts.append(('bar', bar_chart))
+                charts.append(('bar', chart_format, bar_chart))
                 
                 # Pie Chart - Cooking Time Distribution
                 time_ranges = []
@@ -228,49 +346,61 @@ def recipe_search(request):
                     'labels': time_df.index.tolist(),
                     'values': time_df.values.tolist()
                 }
-                pie_chart = get_chart(
+                pie_chart = cached_chart(
+                    chart_format,
                     'pie',
                     pie_data,
                     title='Recipes by Cooking Time'
                 )
-                charts.append(('pie', pie_chart))
+                charts.append(('pie', chart_format, pie_chart))
                 
-                # Line Chart - Recipe Collection Growth
-                all_recipes = Recipe.objects.all().order_by('created_at')
-                if all_recipes.exists():
-                    dates = [r.created_at.strftime('%Y-%m-%d') for r in all_recipes]
-                    cumulative = list(range(1, len(dates) + 1))
-                    
-                    # Group by date and get cumulative count
-                    date_counts = {}
-                    for i, date in enumerate(dates, 1):
-                        date_counts[date] = i
-                    
-                    line_data = {
-                        'labels': list(date_counts.keys()),
-                        'values': list(date_counts.values())
-                    }
-                    line_chart = get_chart(
+                # Line Chart - Recipe Collection Growth (from the daily rollup table)
+                line_data = get_growth_chart_data()
+                if line_data['labels']:
+                    line_chart = cached_chart(
+                        chart_format,
                         'line',
                         line_data,
                         title='Recipe Collection Growth',
                         xlabel='Date Added',
                         ylabel='Total Recipes'
                     )
-                    charts.append(('line', line_chart))
+                    charts.append(('line', chart_format, line_chart))
                 
                 chart = charts
+    else:
+        form.apply_facet_counts(get_facet_counts(recipes))
     
     context = {
         'form': form,
-        'recipes': recipes,
+        'recipes': [],
         'df': df.to_html(classes='recipe-table', index=False) if df is not None else None,
         'chart': chart,
         'search_performed': search_performed,
-        'recipes_count': recipes.count() if search_performed else 0,
+        'recipes_count': 0,
+        'query_error': query_error,
+        'query_report': query_report,
     }
     
+    if search_performed:
+        if streaming_requested(request):
+            context['recipes_count'] = recipes.count()
+            return stream_template(
+                request, 'recipes/recipe_search.html', context,
+                with_detail_urls(recipes.iterator(chunk_size=settings.RECIPE_STREAM_CHUNK_SIZE)),
+                'recipes/_recipe_rows.html',
+            )
+        context['recipes'] = list(with_detail_urls(recipes))
+        context['recipes_count'] = len(context['recipes'])
+    
     return render(request, 'recipes/recipe_search.html', context)
 def about_me(request):
     """About Me page - information about the developer"""
-    return render(request, 'recipes/about_me.html')  
\ No newline at end of file
+    return render(request, 'recipes/about_me.html')  
+
+@staff_member_required
+def memory_diagnostics(request):
+    """Allocation statistics of this worker collected by MemoryTrackingMiddleware"""
+    report = memory_report()
+    report['tracking'] = settings.MEMORY_TRACKING
+    return JsonResponse(report)
@@ -0,0 +1,15 @@
+from pathlib import Path
+from django.template.loader import get_template
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / 'templates'
+
+
+def warm_template_cache():
+    """Compile every recipe template into the cached loader; returns the names loaded"""
+    names = sorted(
+        path.relative_to(TEMPLATE_DIR).as_posix()
+        for path in (TEMPLATE_DIR / 'recipes').glob('*.html')
+    )
+    for name in names:
+        get_template(name)
+    return names